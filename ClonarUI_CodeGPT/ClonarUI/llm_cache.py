@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+# Archivo, vigencia (segundos) y tamaño máximo (bytes) de la caché de respuestas de CodeGPT
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', '.llm_cache.db')
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 30 * 24 * 3600))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+"""
+
+def cache_key(endpoint, agent_id, system_prompt, user_content):
+    """Hash de todo lo que determina la respuesta de una llamada a CodeGPT."""
+    payload = json.dumps([endpoint, agent_id, system_prompt or '', user_content], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """Caché persistente de respuestas de CodeGPT con vigencia y expulsión LRU por tamaño.
+
+    Con `bypass=True` no se leen respuestas guardadas pero las nuevas se
+    siguen guardando, lo que sirve para refrescar la caché.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES, bypass=False):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        # Accesos pendientes de escribir: se guardan junto con el próximo put
+        self.touched = {}
+        self.stats = {'hits': 0, 'misses': 0, 'bypassed': 0}
+
+    def get(self, key):
+        if self.bypass:
+            self.stats['bypassed'] += 1
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.stats['misses'] += 1
+                return None
+            self.touched[key] = now
+            self.stats['hits'] += 1
+        return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if old:
+                self.total_bytes -= old[0]
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now))
+            self.total_bytes += size
+            self.flush_touched()
+            self.evict(now)
+            self.conn.commit()
+
+    def flush_touched(self):
+        if self.touched:
+            self.conn.executemany("UPDATE responses SET last_access = ? WHERE key = ?",
+                                  [(t, k) for k, t in self.touched.items()])
+            self.touched.clear()
+
+    def evict(self, now):
+        # Primero las vencidas, después las menos usadas hasta entrar en el límite
+        expired = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses WHERE created < ?",
+                                    (now - self.ttl,)).fetchone()[0]
+        if expired:
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self.total_bytes -= expired
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= size
+
+    def close(self):
+        with self.lock:
+            self.flush_touched()
+            self.conn.commit()
+            self.conn.close()
+
+    def log_stats(self):
+        logging.info(f"LLM cache: {self.stats['hits']} hits, {self.stats['misses']} misses, "
+                     f"{self.stats['bypassed']} bypassed")
@@ -1,6 +1,7 @@
 import asyncio
 import aiohttp
 from bs4 import BeautifulSoup
+from html_backend import make_soup
 import base64
 from urllib.parse import urljoin, urlparse
 import re
@@ -11,6 +12,8 @@ import argparse
 import webbrowser
 import sys
 import json
+from llm_cache import LLMCache, cache_key
+from llm_limiter import limiter, estimate_tokens, parse_retry_after, backoff_delay, THROTTLE_STATUSES
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -28,6 +31,13 @@ if not CODEGPT_API_KEY or not AGENT_ID:
     logger.error("CODEGPT_API_KEY y AGENT_ID deben estar definidos en el archivo .env")
     sys.exit(1)
 
+# Se puede apuntar a un servidor local (por ejemplo codegpt_sim de Escraper_Pagina) con CODEGPT_API_BASE o con la URL completa
+CODEGPT_API_BASE = os.getenv('CODEGPT_API_BASE', "https://api.codegpt.co")
+CODEGPT_API_URL = os.getenv('CODEGPT_API_URL', f"{CODEGPT_API_BASE}/api/v1/chat/completions")
+
+# Caché de respuestas de CodeGPT (USE_LLM_CACHE=0 para desactivarla)
+llm_cache = LLMCache() if os.getenv('USE_LLM_CACHE', '1') != '0' else None
+
 async def fetch_resource(session, url, is_binary=False, timeout=30, max_retries=3):
     for attempt in range(max_retries):
         try:
@@ -96,7 +106,7 @@ async def download_complete_html(session, url, output_file='index.html'):
         logger.error(f"No se pudo obtener el contenido HTML de {url}")
         return None
 
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = make_soup(html_content)
 
     # Inline CSS
     logger.info("Incrustando CSS")
@@ -106,6 +116,7 @@ async def download_complete_html(session, url, output_file='index.html'):
     inlined_css = await asyncio.gather(*css_tasks)
     for link, style in zip(soup.find_all('link', rel='stylesheet'), inlined_css):
         if style:
+            # Fragmento suelto: html.parser no lo envuelve en <html><body> como lxml
             link.replace_with(BeautifulSoup(style, 'html.parser'))
 
     # Inline images
@@ -128,7 +139,7 @@ async def download_complete_html(session, url, output_file='index.html'):
     logger.info(f"HTML completo descargado y guardado como '{output_file}'")
     return final_html
 
-async def analyze_with_codegpt(session, content, system_prompt, max_retries=5, initial_delay=1):
+async def analyze_with_codegpt(session, content, system_prompt, max_retries=5, initial_delay=1, bypass_cache=False):
     headers = {
         "Authorization": f"Bearer {CODEGPT_API_KEY}",
         "Content-Type": "application/json"
@@ -148,15 +159,30 @@ async def analyze_with_codegpt(session, content, system_prompt, max_retries=5, i
             },
             {
                 "role": "user",
-                "content": content[:4000]
+                "content": content
             }
         ]
     }
     
-    api_url = "https://api.codegpt.co/api/v1/chat/completions"
+    api_url = CODEGPT_API_URL
+
+    key = None
+    if llm_cache is not None:
+        key = cache_key(api_url, AGENT_ID, system_prompt, data["messages"][1]["content"])
+        cached = None if bypass_cache else llm_cache.get(key)
+        if cached is not None:
+            logger.info("Respuesta de CodeGPT obtenida de la caché")
+            return cached
     
+    # Concurrencia adaptativa, Retry-After y backoff con jitter a cargo del limitador compartido
+    tokens = estimate_tokens(data)
     delay = initial_delay
     for attempt in range(max_retries):
+        if attempt:
+            await asyncio.sleep(delay)
+        ticket = await limiter.acquire_async(tokens)
+        throttled = False
+        retry_after = None
         try:
             logger.info(f"Haciendo solicitud a CodeGPT API: {api_url} (Intento {attempt + 1})")
             async with session.post(api_url, headers=headers, json=data, timeout=30) as response:
@@ -166,39 +192,35 @@ async def analyze_with_codegpt(session, content, system_prompt, max_retries=5, i
                     logger.info(f"Respuesta completa de CodeGPT: {result}")
                     try:
                         json_result = json.loads(result)
-                        return json_result['choices'][0]['message']['content']
+                        completion = json_result['choices'][0]['message']['content']
+                        if key is not None and completion:
+                            llm_cache.put(key, completion)
+                        return completion
                     except json.JSONDecodeError:
                         logger.error(f"Error al decodificar JSON: {result}")
                         return None
-                elif response.status in [429, 500, 502, 503, 504]:
-                    if attempt < max_retries - 1:
-                        logger.warning(f"Error {response.status}. Reintentando en {delay} segundos...")
-                        await asyncio.sleep(delay)
-                        delay *= 2
-                    else:
-                        logger.error(f"Error {response.status} persistente después de {max_retries} intentos.")
-                        return None
+                elif response.status in THROTTLE_STATUSES:
+                    throttled = True
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    logger.warning(f"Error {response.status} en el intento {attempt + 1} de {max_retries}")
                 else:
                     error_text = await response.text()
                     logger.error(f"Error en la llamada a CodeGPT API: {response.status}")
                     logger.error(f"Respuesta de error: {error_text}")
                     return None
         except asyncio.TimeoutError:
+            throttled = True
             logger.warning(f"Timeout en la solicitud a CodeGPT API. Intento {attempt + 1}")
-            if attempt < max_retries - 1:
-                await asyncio.sleep(delay)
-                delay *= 2
-            else:
-                logger.error("Timeout persistente en la solicitud a CodeGPT API")
-                return None
         except Exception as e:
+            throttled = True
             logger.error(f"Error al comunicarse con CodeGPT API: {e}")
-            if attempt < max_retries - 1:
-                await asyncio.sleep(delay)
-                delay *= 2
-            else:
-                return None
+        finally:
+            limiter.release(ticket, throttled, retry_after)
+        delay = backoff_delay(attempt, retry_after, initial_delay)
+        if attempt < max_retries - 1:
+            logger.warning(f"Reintentando en {delay:.1f} segundos...")
 
+    logger.error(f"CodeGPT no respondió después de {max_retries} intentos")
     return None
 
 def validate_url(url):
@@ -248,7 +270,7 @@ async def modify_html_with_codegpt(session, html_content, modification_prompt):
             cleaned_response = response.strip().lstrip('`').rstrip('`').lstrip('json').strip()
             changes = json.loads(cleaned_response)
             
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = make_soup(html_content)
             
             if changes['type'] == 'style':
                 # Buscar o crear la etiqueta <style>
@@ -314,8 +336,8 @@ async def main(url, output_file):
                 logger.info(f"HTML modificado y guardado en '{output_file}'")
                 
                 # Imprimir un resumen de los cambios
-                soup_original = BeautifulSoup(html_content, 'html.parser')
-                soup_modified = BeautifulSoup(modified_html, 'html.parser')
+                soup_original = make_soup(html_content)
+                soup_modified = make_soup(modified_html)
                 
                 if soup_original.title != soup_modified.title:
                     logger.info(f"Título modificado: '{soup_original.title.string}' -> '{soup_modified.title.string}'")
@@ -328,8 +350,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Descarga, analiza y modifica una página web")
     parser.add_argument("url", help="URL de la página web a descargar y modificar")
     parser.add_argument("-o", "--output", default="index.html", help="Nombre del archivo de salida (por defecto: index.html)")
+    parser.add_argument("--bypass-cache", action="store_true", help="Ignorar las respuestas de CodeGPT guardadas en caché y reemplazarlas")
     args = parser.parse_args()
 
+    if llm_cache is not None and args.bypass_cache:
+        llm_cache.bypass = True
+
     try:
         asyncio.run(main(args.url, args.output))
     except KeyboardInterrupt:
@@ -7,6 +7,8 @@ import json
 import base64
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
+from html_backend import make_soup
+from codegpt_stream import stream_completion_async, StreamMetrics
 
 # Cargar variables de entorno
 load_dotenv()
@@ -14,6 +16,9 @@ load_dotenv()
 CODEGPT_API_KEY = os.getenv("CODEGPT_API_KEY")
 AGENT_ID = os.getenv("AGENT_ID")
 
+# Se puede apuntar a un servidor local (por ejemplo codegpt_sim de Escraper_Pagina)
+CODEGPT_API_BASE = os.getenv("CODEGPT_API_BASE", "https://api.codegpt.co")
+
 # Verificar las claves de API
 if not CODEGPT_API_KEY or not AGENT_ID:
     st.error("CODEGPT_API_KEY y AGENT_ID deben estar definidos en el archivo .env")
@@ -62,7 +67,7 @@ async def download_complete_html(session, url, output_file):
         st.error(f"No se pudo descargar el contenido de {url}")
         return None
 
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = make_soup(html_content)
 
     # Inline CSS
     css_tasks = [inline_css(session, link) for link in soup.find_all('link', rel='stylesheet')]
@@ -84,8 +89,8 @@ async def download_complete_html(session, url, output_file):
 
     return final_html
 
-async def analyze_with_codegpt(session, content, prompt):
-    url = f"https://api.codegpt.co/v1/agent/{AGENT_ID}/completion"
+async def analyze_with_codegpt(session, content, prompt, placeholder=None, metrics=None):
+    url = f"{CODEGPT_API_BASE}/v1/agent/{AGENT_ID}/completion"
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {CODEGPT_API_KEY}"
@@ -97,16 +102,20 @@ async def analyze_with_codegpt(session, content, prompt):
         "temperature": 0.7
     }
 
-    async with session.post(url, json=data, headers=headers) as response:
-        if response.status == 200:
-            result = await response.json()
-            return result.get('choices', [{}])[0].get('text', '').strip()
-        else:
-            st.error(f"Error en la solicitud a CodeGPT: {response.status}")
-            return None
+    # Respuesta en streaming por el limitador compartido; se muestra a medida que llega
+    pieces = []
+    try:
+        async for text in stream_completion_async(session, url, headers, data, label="ClonarUI", metrics=metrics):
+            pieces.append(text)
+            if placeholder is not None:
+                placeholder.code("".join(pieces), language="json")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        st.error(f"Error en la solicitud a CodeGPT: {e}")
+        return None
+    return "".join(pieces).strip()
 
 def apply_modifications(html_content, modifications):
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = make_soup(html_content)
     
     for mod in modifications:
         if mod['action'] == 'change_background':
@@ -153,7 +162,11 @@ async def process_url(url, output_file):
                 {"action": "change_logo", "new_logo_url": "URL_DE_IMAGEN_DE_PERA"}
             ]
             """
-            modifications_json = await analyze_with_codegpt(session, html_content, modifications_prompt)
+            metrics = StreamMetrics("ClonarUI")
+            modifications_json = await analyze_with_codegpt(session, html_content, modifications_prompt,
+                                                            st.empty(), metrics)
+            if modifications_json:
+                st.caption(f"Primer token en {metrics.ttfb:.2f} s, respuesta completa en {metrics.total:.2f} s")
             
             if modifications_json:
                 try:
@@ -2,10 +2,13 @@ import os
 from dotenv import load_dotenv
 import requests
 import re
+from llm_limiter import limiter
 
 load_dotenv()
 
-API_URL = "https://api.codegpt.co/api/v1/chat/completions"
+# Se puede apuntar a un servidor local (por ejemplo codegpt_sim de Escraper_Pagina)
+CODEGPT_API_BASE = os.getenv("CODEGPT_API_BASE", "https://api.codegpt.co")
+API_URL = f"{CODEGPT_API_BASE}/api/v1/chat/completions"
 API_KEY = os.getenv("CODEGPT_API_KEY")
 ORG_ID = os.getenv("CODEGPT_ORG_ID")
 AGENT_ESTRUCTURA_ID = "8b76e008-13f7-46e2-bbd5-f8c879223c84"
@@ -31,7 +34,7 @@ def evaluar_estructura(prompt_agente, respuesta, pregunta):
     }
 
     try:
-        response = requests.post(API_URL, headers=headers, json=payload, timeout=30)
+        response = limiter.post(API_URL, headers=headers, json=payload, timeout=30)
         response.raise_for_status()
 
         # Actualización para manejar el campo 'completion' en lugar de 'content'
@@ -1,10 +1,13 @@
 import os
 import requests
 from dotenv import load_dotenv
+from llm_limiter import limiter
 
 load_dotenv()
 
-API_URL = "https://api.codegpt.co/api/v1/"
+# Se puede apuntar a un servidor local (por ejemplo codegpt_sim de Escraper_Pagina)
+CODEGPT_API_BASE = os.getenv("CODEGPT_API_BASE", "https://api.codegpt.co")
+API_URL = f"{CODEGPT_API_BASE}/api/v1/"
 ANALIZADOR_ID = "ab91b866-da46-480b-9d17-19d7d4c6d208"  # ID del agente analizador
 
 API_KEY = os.getenv("CODEGPT_API_KEY")
@@ -19,7 +22,7 @@ headers = {
 
 def obtener_prompt_agente(agent_id):
     try:
-        response = requests.get(f"{API_URL}agent/{agent_id}", headers=headers)
+        response = limiter.get(f"{API_URL}agent/{agent_id}", headers=headers)
         response.raise_for_status()
         agent_data = response.json()
         return agent_data.get('prompt', "No se encontró el prompt del agente.")
@@ -41,7 +44,7 @@ def analizar_prompt(prompt):
     }
     
     try:
-        response = requests.post(f"{API_URL}chat/completions", headers=headers, json=payload)
+        response = limiter.post(f"{API_URL}chat/completions", headers=headers, json=payload)
         response.raise_for_status()
 
         # Obtener el JSON de la respuesta
@@ -1,8 +1,12 @@
 # Lista_Agentes.py
 
+import os
 import requests
+from llm_limiter import limiter
 
-API_URL = "https://api.codegpt.co/api/v1/agent"
+# Se puede apuntar a un servidor local (por ejemplo codegpt_sim de Escraper_Pagina)
+CODEGPT_API_BASE = os.getenv("CODEGPT_API_BASE", "https://api.codegpt.co")
+API_URL = f"{CODEGPT_API_BASE}/api/v1/agent"
 
 def obtener_agentes(api_key, org_id):
     headers = {
@@ -12,7 +16,7 @@ def obtener_agentes(api_key, org_id):
     }
 
     try:
-        response = requests.get(API_URL, headers=headers)
+        response = limiter.get(API_URL, headers=headers)
         response.raise_for_status()
         return response.json()
     except requests.RequestException as e:
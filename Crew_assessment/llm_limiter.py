@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+
+# Llamadas simultáneas a CodeGPT: el límite arranca en LLM_START_CONCURRENCY y se
+# ajusta solo (AIMD) entre 1 y LLM_MAX_CONCURRENCY
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 16))
+LLM_START_CONCURRENCY = int(os.getenv('LLM_START_CONCURRENCY', 4))
+
+# Presupuesto opcional de tokens por minuto (0 = sin límite)
+LLM_TPM = int(os.getenv('LLM_TPM', 0))
+
+# Reintentos y backoff exponencial con jitter (segundos)
+LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', 5))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', 1.0))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', 60.0))
+
+# Tiempo máximo de lectura de una respuesta de CodeGPT (segundos)
+LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', 120))
+
+# Respuestas que indican sobrecarga: se reintentan y reducen la concurrencia
+THROTTLE_STATUSES = (429, 500, 502, 503, 504)
+
+DECREASE_FACTOR = 0.5
+CHARS_PER_TOKEN = 4
+ASYNC_POLL = 0.05
+
+def estimate_tokens(payload):
+    """Tokens aproximados de una solicitud (~4 caracteres por token)."""
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def parse_retry_after(value):
+    """Segundos indicados por Retry-After (número o fecha HTTP); None si no hay."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, retry_after=None, base=None):
+    """Espera antes del reintento `attempt` (desde 0), partiendo de `base` segundos.
+
+    Con Retry-After se espera lo pedido más hasta un segundo al azar; si no,
+    "full jitter": un valor al azar entre 0 y el backoff exponencial.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 1)
+    return random.uniform(0, min(LLM_BACKOFF_MAX, (base or LLM_BACKOFF_BASE) * 2 ** attempt))
+
+class AIMDLimiter:
+    """Controla cuántas llamadas a CodeGPT hay en curso y cuántos tokens se mandan por minuto.
+
+    Cada respuesta correcta sube el límite en 1/límite (≈ +1 por ventana
+    completa de llamadas) y cada 429/5xx o error de red lo divide a la mitad,
+    una sola vez por ventana: las llamadas que ya estaban en curso cuando se
+    redujo no vuelven a reducirlo. Un Retry-After pausa a todos los
+    llamadores, no solo al que lo recibió.
+
+    Sirve desde hilos (`acquire`, `request`) y desde asyncio (`acquire_async`);
+    en ambos casos cada lugar tomado se devuelve con `release`.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, start_concurrency=LLM_START_CONCURRENCY,
+                 tpm=LLM_TPM, min_concurrency=1):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max(min_concurrency, min(start_concurrency, max_concurrency)))
+        self.tpm = tpm
+        self.tokens = float(tpm)
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.condition = threading.Condition()
+        self.stats = {'requests': 0, 'throttled': 0, 'retries': 0, 'waited': 0.0}
+
+    def _try_acquire(self, tokens, now):
+        """(True, ticket) si se tomó un lugar; si no (False, segundos a esperar o None hasta un release)."""
+        if now < self.paused_until:
+            return False, self.paused_until - now
+        if self.in_flight >= int(self.limit):
+            return False, None
+        if self.tpm:
+            self.tokens = min(self.tpm, self.tokens + (now - self.refilled_at) * self.tpm / 60)
+            self.refilled_at = now
+            # Una solicitud más grande que el presupuesto pasa con el balde lleno
+            needed = min(tokens, self.tpm)
+            if self.tokens < needed:
+                return False, (needed - self.tokens) * 60 / self.tpm
+            self.tokens -= needed
+        self.in_flight += 1
+        self.stats['requests'] += 1
+        return True, now
+
+    def acquire(self, tokens=0):
+        """Esperar un lugar (bloqueando el hilo); devuelve el ticket para `release`."""
+        start = time.monotonic()
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                acquired, result = self._try_acquire(tokens, now)
+                if acquired:
+                    self.stats['waited'] += now - start
+                    return result
+                self.condition.wait(result)
+
+    async def acquire_async(self, tokens=0):
+        """Igual que `acquire` pero cediendo el event loop mientras espera."""
+        start = time.monotonic()
+        while True:
+            with self.condition:
+                now = time.monotonic()
+                acquired, result = self._try_acquire(tokens, now)
+                if acquired:
+                    self.stats['waited'] += now - start
+                    return result
+            await asyncio.sleep(ASYNC_POLL if result is None else result)
+
+    def release(self, ticket, throttled=False, retry_after=None):
+        """Devolver el lugar e informar si la llamada fue rechazada por sobrecarga."""
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.stats['throttled'] += 1
+                if ticket >= self.decreased_at:
+                    self.limit = max(self.min_concurrency, self.limit * DECREASE_FACTOR)
+                    self.decreased_at = now
+                    logging.warning(f"CodeGPT throttled, concurrency limit lowered to {int(self.limit)}")
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    def request(self, method, url, tokens=None, max_attempts=None, **kwargs):
+        """Solicitud a CodeGPT por la sesión compartida sin reintentos de urllib3, con lugar en el limitador y reintentos.
+
+        `tokens` se estima del cuerpo JSON si no se indica. Devuelve la última
+        respuesta (el llamador decide con raise_for_status) o relanza el último
+        error de red.
+        """
+        # Importados acá para que los llamadores asíncronos (aiohttp) no necesiten requests
+        import requests
+        from http_session import get_session, DEFAULT_TIMEOUT
+
+        if tokens is None:
+            tokens = estimate_tokens(kwargs.get('json') or '')
+        kwargs.setdefault('timeout', (DEFAULT_TIMEOUT[0], LLM_READ_TIMEOUT))
+        attempts = max_attempts or LLM_MAX_ATTEMPTS
+        for attempt in range(attempts):
+            if attempt:
+                self.stats['retries'] += 1
+            ticket = self.acquire(tokens)
+            try:
+                response = get_session(retries=False).request(method, url, **kwargs)
+            except requests.RequestException as e:
+                self.release(ticket, throttled=True)
+                if attempt == attempts - 1:
+                    raise
+                delay = backoff_delay(attempt)
+                logging.warning(f"CodeGPT request failed ({e}), retrying in {delay:.1f} s")
+                time.sleep(delay)
+                continue
+            if response.status_code not in THROTTLE_STATUSES:
+                self.release(ticket)
+                return response
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.release(ticket, throttled=True, retry_after=retry_after)
+            if attempt == attempts - 1:
+                return response
+            delay = backoff_delay(attempt, retry_after)
+            logging.warning(f"CodeGPT returned {response.status_code}, retrying in {delay:.1f} s")
+            response.close()
+            time.sleep(delay)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def log_stats(self):
+        logging.info(f"CodeGPT limiter: {self.stats['requests']} requests, {self.stats['throttled']} throttled, "
+                     f"{self.stats['retries']} retries, {self.stats['waited']:.1f} s waiting, "
+                     f"final concurrency limit {int(self.limit)}")
+
+# Limitador compartido por todo el proceso
+limiter = AIMDLimiter()
+
+def configure(max_concurrency=None, tpm=None):
+    """Cambiar el techo de concurrencia o el presupuesto de tokens del limitador compartido."""
+    with limiter.condition:
+        if max_concurrency:
+            limiter.max_concurrency = max_concurrency
+            limiter.limit = min(limiter.limit, max_concurrency)
+        if tpm is not None:
+            limiter.tpm = tpm
+            limiter.tokens = float(tpm)
+            limiter.refilled_at = time.monotonic()
+        limiter.condition.notify_all()
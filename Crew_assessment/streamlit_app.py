@@ -2,8 +2,10 @@ import streamlit as st
 import os
 import requests
 import re
-from bs4 import BeautifulSoup
-import time
+from html_backend import make_soup
+from http_session import get_session
+from llm_limiter import limiter
+from codegpt_stream import stream_completion, StreamMetrics
 from urllib.parse import urljoin, urlparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from Lista_Agentes import obtener_agentes, obtener_nombre_agente
@@ -19,7 +21,8 @@ from sklearn.metrics.pairwise import cosine_similarity
 load_dotenv()
 
 # Configuración de la API
-API_URL = "https://api.codegpt.co/api/v1/chat/completions"
+CODEGPT_API_BASE = os.getenv("CODEGPT_API_BASE", "https://api.codegpt.co")
+API_URL = f"{CODEGPT_API_BASE}/api/v1/chat/completions"
 API_KEY = None  
 ORG_ID = None    # Inicializar como None
 AGENT_PREGUNTA_ID = os.getenv("CODEGPT_AGENT_PREGUNTA_ID")
@@ -34,9 +37,9 @@ headers = {
 @st.cache_data
 def scrape_content(url):
     try:
-        response = requests.get(url, timeout=10)
+        response = get_session().get(url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = make_soup(response.content)
         return soup.get_text(separator='\n')
     except Exception as e:
         st.error(f"Error scraping the content from {url}: {e}")
@@ -45,9 +48,9 @@ def scrape_content(url):
 @st.cache_data
 def extract_links(url):
     try:
-        response = requests.get(url, timeout=10)
+        response = get_session().get(url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = make_soup(response.content)
         links = [urljoin(url, a['href']) for a in soup.find_all('a', href=True)]
         return [link for link in links if es_enlace_relevante(link, url)]
     except Exception as e:
@@ -56,7 +59,7 @@ def extract_links(url):
 
 def verificar_enlace(url):
     try:
-        response = requests.head(url, allow_redirects=True, timeout=10)
+        response = get_session().head(url, allow_redirects=True, timeout=10)
         return response.status_code == 200
     except requests.RequestException:
         return False
@@ -94,30 +97,28 @@ def generar_pregunta(content, max_retries=10):
         ]
     }
 
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(API_URL, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            content = response.json()['choices'][0]['message']['content']
-            
-            match = re.search(r'\d+\.\s*(.+?)\s*\((https?://[^\s]+)\)', content)
-            if match:
-                return match.groups()
-            else:
-                return None
+    try:
+        # El limitador compartido reintenta con backoff y respeta Retry-After
+        response = limiter.post(API_URL, headers=headers, json=payload, timeout=30, max_attempts=max_retries)
+        response.raise_for_status()
+        content = response.json()['choices'][0]['message']['content']
+        
+        match = re.search(r'\d+\.\s*(.+?)\s*\((https?://[^\s]+)\)', content)
+        if match:
+            return match.groups()
+        else:
+            return None
 
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                time.sleep(2)
-            else:
-                st.error(f"Error generating question: {e}")
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error generating question: {e}")
 
     return None
 
-def obtener_respuesta(agent_id, pregunta, max_retries=3):
+def obtener_respuesta(agent_id, pregunta, max_retries=3, placeholder=None):
+    """Respuesta del agente en streaming (se va mostrando en `placeholder`) y sus tiempos."""
     payload = {
         "agentId": agent_id,
-        "stream": False,
+        "stream": True,
         "format": "json",
         "messages": [
             {
@@ -127,19 +128,16 @@ def obtener_respuesta(agent_id, pregunta, max_retries=3):
         ]
     }
 
-    for attempt in range(max_retries):
-        try:
-            start_time = time.time()
-            response = requests.post(API_URL, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            end_time = time.time()
-            response_time = end_time - start_time
-            return response.json()['choices'][0]['message']['content'], response_time
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                time.sleep(2)
-            else:
-                st.error(f"Error obtaining response: {e}")
+    metrics = StreamMetrics(agent_id)
+    respuesta = ""
+    try:
+        for text in stream_completion(API_URL, headers, payload, max_attempts=max_retries, metrics=metrics):
+            respuesta += text
+            if placeholder is not None:
+                placeholder.markdown(respuesta)
+        return respuesta, metrics
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error obtaining response: {e}")
 
     return None, None
 
@@ -302,9 +300,12 @@ def main():
                     with st.expander(f"Question {len(preguntas_generadas)}"):
                         st.write(f"**Question:** {pregunta}")
                         st.write(f"**Link:** {enlace_corregido}")
-                        respuesta, response_time = obtener_respuesta(agent_id, pregunta)
-                        st.write(f"**Answer ({agent_name}):** {respuesta}")
-                        st.write(f"**Time, Evaluation of Response:** {response_time:.2f} s")
+                        st.write(f"**Answer ({agent_name}):**")
+                        respuesta, metrics = obtener_respuesta(agent_id, pregunta, placeholder=st.empty())
+                        response_time = metrics.total if metrics else None
+                        if metrics:
+                            st.write(f"**Time to first token:** {metrics.ttfb:.2f} s")
+                            st.write(f"**Time, Evaluation of Response:** {response_time:.2f} s")
                         
                         evaluacion_estructura = evaluar_estructura(prompt, respuesta, pregunta)
                         if evaluacion_estructura:
@@ -338,6 +339,7 @@ def main():
                             "Question": pregunta,
                             "Link": enlace_corregido,
                             "Answer": respuesta,
+                            "Time to First Token (s)": metrics.ttfb if metrics else None,
                             "Response Time (s)": response_time,
                             "Structure Score": f"{estructura_yes_count}/{estructura_total}" if 'estructura_yes_count' in locals() else "N/A",
                             "Role": resultados_estructura.get('Role', 'N/A') if resultados_estructura else 'N/A',
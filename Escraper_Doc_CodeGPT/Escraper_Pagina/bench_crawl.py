@@ -0,0 +1,122 @@
+"""Benchmark del crawl completo sin red ni API: sitio generado y CodeGPT simulado.
+
+Se levanta un sitio de documentación local (fixture_site) y un simulador
+de la API de completions (codegpt_sim), y se corre `documentacion.main`
+contra ellos en un proceso aparte por modo (sync, async) para medir la
+memoria pico por separado. Se informa páginas por minuto, latencia p95 por
+página y de CodeGPT, 429 recibidos y memoria pico:
+
+    python bench_crawl.py
+    python bench_crawl.py --pages 500 --fanout 6 --page_bytes 20000 --tables 3 --latency 1.5 --throttle_rate 0.05
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+from fixture_site import FixtureSite
+from codegpt_sim import CodeGPTSimulator
+
+MODES = ('sync', 'async')
+COMPANY_NAME = 'Bench'
+
+def max_rss_mb():
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_worker(args):
+    import documentacion
+
+    documentacion.MAX_DEPTH = args.max_depth
+    documentacion.REQUEST_DELAY = 0
+    output_dir = tempfile.mkdtemp(prefix='bench_crawl_')
+    try:
+        start = time.perf_counter()
+        documentacion.main(args.base_url, output_dir, COMPANY_NAME, async_crawl=args.worker == 'async',
+                           fetch_workers=args.fetch_workers, llm_workers=args.llm_workers, rate_limit=args.rate_limit,
+                           http_cache_dir=None, llm_cache_path=None, output_format=args.output_format,
+                           use_sitemap=False, parse_workers=args.parse_workers)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    print(json.dumps({
+        'mode': args.worker,
+        'seconds': elapsed,
+        'peak_rss_mb': max_rss_mb(),
+        'stages': documentacion.metrics.snapshot()['stages'],
+    }))
+
+def run_mode(mode, args, base_url, api_url):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', mode, '--base_url', base_url,
+               '--max_depth', str(args.max_depth), '--fetch_workers', str(args.fetch_workers),
+               '--llm_workers', str(args.llm_workers), '--rate_limit', str(args.rate_limit),
+               '--parse_workers', str(args.parse_workers),
+               '--output_format', args.output_format]
+    env = dict(os.environ, CODEGPT_API_URL=api_url, CODEGPT_API_KEY='bench', AGENT_ID='bench')
+    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=None if args.log else subprocess.DEVNULL,
+                            text=True, check=True, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the documentation crawl against a local site and a fake CodeGPT")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES), help="Crawl modes to run")
+    parser.add_argument("--pages", type=int, default=200, help="Pages in the generated site")
+    parser.add_argument("--fanout", type=int, default=4, help="Child pages linked from each page")
+    parser.add_argument("--cross_links", type=int, default=2, help="Extra links from each page to random pages")
+    parser.add_argument("--page_bytes", type=int, default=6000, help="Approximate HTML size of each page")
+    parser.add_argument("--tables", type=int, default=1, help="Tables per page")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated site and the simulator")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated CodeGPT latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency jitter as a fraction of --latency")
+    parser.add_argument("--throttle_rate", type=float, default=0.0, help="Fraction of CodeGPT calls answered with 429")
+    parser.add_argument("--retry_after", type=int, default=1, help="Retry-After seconds sent with each 429")
+    parser.add_argument("--max_depth", type=int, default=100, help="Crawl depth limit")
+    parser.add_argument("--fetch_workers", type=int, default=8, help="Download workers in async mode")
+    parser.add_argument("--llm_workers", type=int, default=4, help="CodeGPT workers in async mode")
+    parser.add_argument("--rate_limit", type=float, default=1000.0, help="Requests per second per host in async mode")
+    parser.add_argument("--parse_workers", type=int, default=0, help="HTML parsing processes in async mode")
+    parser.add_argument("--output_format", choices=['text', 'jsonl'], default='text', help="Crawl output format")
+    parser.add_argument("--log", action="store_true", help="Show the crawler log")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--base_url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    site = FixtureSite(args.pages, args.fanout, args.page_bytes, args.tables, args.cross_links, args.seed)
+    site_server = site.serve()
+    results = []
+    try:
+        for mode in args.modes:
+            # Un simulador nuevo por modo para que las cuentas de 429 no se mezclen
+            sim = CodeGPTSimulator(args.latency, args.jitter, args.throttle_rate, args.retry_after, args.seed)
+            sim_server = sim.serve()
+            try:
+                result = run_mode(mode, args, site.base_url + site.path(0), sim.url)
+            finally:
+                sim_server.shutdown()
+            result['api'] = dict(sim.stats)
+            results.append(result)
+    finally:
+        site_server.shutdown()
+
+    print(f"\n{args.pages} pages, fan-out {args.fanout}, ~{args.page_bytes} bytes, {args.tables} tables per page; "
+          f"CodeGPT {args.latency:.2f} s ±{args.jitter:.0%}, {args.throttle_rate:.0%} 429s\n")
+    print(f"{'mode':<6} {'pages':>6} {'pages/min':>10} {'p95 page s':>11} {'p95 llm s':>10} "
+          f"{'429s':>5} {'peak RSS MB':>12}")
+    for result in results:
+        page = result['stages'].get('page', {})
+        llm = result['stages'].get('llm', {})
+        pages = page.get('count', 0)
+        print(f"{result['mode']:<6} {pages:>6} {pages / result['seconds'] * 60:>10.1f} {page.get('p95', 0):>11.3f} "
+              f"{llm.get('p95', 0):>10.3f} {result['api']['throttled']:>5} {result['peak_rss_mb']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Benchmark de los backends de parseo sobre un corpus de páginas guardadas.
+
+Cada backend corre en su propio proceso para medir la memoria pico por
+separado. Se informa páginas por segundo, memoria pico y si la extracción
+(contenido, endpoints, tablas y enlaces) coincide con la de html.parser.
+
+Por defecto el corpus son los cuerpos guardados en la caché HTTP del crawler;
+si todavía está vacía, se generan páginas con fixture_site:
+
+    python bench_parsers.py
+    python bench_parsers.py --fixture_pages 200
+    python bench_parsers.py paginas/ --backends html.parser lxml selectolax --repeat 3
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+from http_cache import HTTP_CACHE_DIR
+from html_backend import BACKEND_MODULES, available_backends
+
+REFERENCE_BACKEND = 'html.parser'
+BASE_URL = 'https://example.com/docs/'
+
+def corpus_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names) if not name.endswith('.tmp'))
+        elif os.path.isfile(path):
+            files.append(path)
+    return sorted(files)
+
+def fixture_corpus(pages):
+    """Directorio temporal con `pages` páginas de fixture_site, para correr sin una caché HTTP llena."""
+    from fixture_site import FixtureSite
+
+    directory = tempfile.mkdtemp(prefix='bench_parsers_')
+    site = FixtureSite(pages, page_bytes=12000, tables=2)
+    for n in range(pages):
+        with open(os.path.join(directory, f"page-{n:05d}.html"), 'w', encoding='utf-8') as f:
+            f.write(site.page(n))
+    return directory
+
+def max_rss_mb():
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_worker(backend, files, repeat):
+    from extraction import extract_all
+
+    pages = [open(path, 'rb').read().decode('utf-8', errors='replace') for path in files]
+    baseline_rss = max_rss_mb()
+    digests = []
+    start = time.perf_counter()
+    for i in range(repeat):
+        for html_content in pages:
+            result = extract_all(html_content, BASE_URL, backend=backend)
+            if i == 0:
+                digests.append(hashlib.sha1(json.dumps(result).encode('utf-8')).hexdigest())
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'backend': backend,
+        'pages': len(pages) * repeat,
+        'seconds': elapsed,
+        'peak_rss_mb': max_rss_mb(),
+        'rss_growth_mb': max_rss_mb() - baseline_rss,
+        'digests': digests,
+    }))
+
+def run_backend(backend, files, repeat):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', backend, '--repeat', str(repeat), *files]
+    output = subprocess.run(command, capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends over saved pages")
+    parser.add_argument("paths", nargs="*", default=None,
+                        help="HTML files or directories (default: the HTTP cache bodies, or generated pages if it is empty)")
+    parser.add_argument("--fixture_pages", type=int, default=100,
+                        help="Pages to generate when the default corpus is empty")
+    parser.add_argument("--backends", nargs="+", default=None, help=f"Backends to compare ({', '.join(BACKEND_MODULES)})")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the corpus per backend")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    files = corpus_files(args.paths or [os.path.join(HTTP_CACHE_DIR, 'objects')])
+    if args.worker:
+        run_worker(args.worker, files, args.repeat)
+        return
+    generated = None
+    if not files and not args.paths:
+        generated = fixture_corpus(args.fixture_pages)
+        files = corpus_files([generated])
+        print(f"The HTTP cache is empty, using {len(files)} pages generated with fixture_site")
+    if not files:
+        print("No pages found in the corpus")
+        sys.exit(1)
+    try:
+        compare_backends(args, files)
+    finally:
+        if generated is not None:
+            shutil.rmtree(generated, ignore_errors=True)
+
+def compare_backends(args, files):
+
+    backends = args.backends or available_backends()
+    missing = [backend for backend in backends if backend not in available_backends()]
+    if missing:
+        print(f"Skipping backends that are not installed: {', '.join(missing)}")
+    backends = [backend for backend in backends if backend not in missing]
+    if REFERENCE_BACKEND not in backends:
+        backends.insert(0, REFERENCE_BACKEND)
+
+    results = {backend: run_backend(backend, files, args.repeat) for backend in backends}
+    reference = results[REFERENCE_BACKEND]['digests']
+
+    print(f"\n{len(files)} pages x {args.repeat} passes\n")
+    print(f"{'backend':<12} {'pages/s':>10} {'peak RSS MB':>12} {'growth MB':>10} {'same output':>12}")
+    for backend, result in results.items():
+        mismatches = [path for path, a, b in zip(files, result['digests'], reference) if a != b]
+        print(f"{backend:<12} {result['pages'] / result['seconds']:>10.1f} {result['peak_rss_mb']:>12.1f} "
+              f"{result['rss_growth_mb']:>10.1f} {len(files) - len(mismatches):>7}/{len(files)}")
+        for path in mismatches[:5]:
+            print(f"    differs: {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import os
+import re
+import hashlib
+import logging
+from collections import Counter
+from chunking import estimate_tokens
+
+# Un bloque es boilerplate si aparece en al menos BOILERPLATE_MIN_PAGES páginas
+# y en al menos BOILERPLATE_MIN_RATIO de las páginas vistas hasta el momento
+BOILERPLATE_MIN_PAGES = int(os.getenv('BOILERPLATE_MIN_PAGES', 5))
+BOILERPLATE_MIN_RATIO = float(os.getenv('BOILERPLATE_MIN_RATIO', 0.3))
+
+FINGERPRINT_BYTES = 8
+
+# Los encabezados se conservan siempre: dan la jerarquía que CodeGPT tiene que respetar
+HEADING_RE = re.compile(r'^\s*#{1,6} ')
+
+def fingerprint(block):
+    """Huella de un bloque sin importar espacios ni mayúsculas."""
+    normalized = ' '.join(block.split()).lower()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=FINGERPRINT_BYTES).digest()
+
+def split_fingerprints(blob):
+    return [blob[i:i + FINGERPRINT_BYTES] for i in range(0, len(blob), FINGERPRINT_BYTES)]
+
+class BoilerplateLearner:
+    """Aprende qué bloques de texto se repiten en muchas páginas del sitio y los quita.
+
+    Las cuentas se actualizan con cada página (la actual incluida), así que
+    un bloque pasa a descartarse en cuanto alcanza los umbrales. `filter`
+    devuelve también las huellas de la página para guardarlas en el
+    checkpoint y volver a contarlas con `replay` al reanudar.
+    """
+
+    def __init__(self, min_pages=BOILERPLATE_MIN_PAGES, min_ratio=BOILERPLATE_MIN_RATIO):
+        self.min_pages = min_pages
+        self.min_ratio = min_ratio
+        self.counts = Counter()
+        self.pages = 0
+        self.stats = {'pages': 0, 'blocks_removed': 0, 'tokens_removed': 0, 'tokens_kept': 0}
+
+    def observe(self, fingerprints):
+        self.pages += 1
+        self.counts.update(set(fingerprints))
+
+    def replay(self, blob):
+        """Volver a contar una página ya procesada a partir de sus huellas guardadas."""
+        self.observe(split_fingerprints(blob))
+
+    def is_boilerplate(self, block_fingerprint):
+        count = self.counts[block_fingerprint]
+        return count >= self.min_pages and count >= self.min_ratio * self.pages
+
+    def filter(self, blocks):
+        """Contar los bloques de la página y devolver (bloques que quedan, huellas de la página)."""
+        fingerprints = [fingerprint(block) for block in blocks]
+        self.observe(fingerprints)
+        kept = []
+        for block, block_fingerprint in zip(blocks, fingerprints):
+            if block.strip() and not HEADING_RE.match(block) and self.is_boilerplate(block_fingerprint):
+                self.stats['blocks_removed'] += 1
+                self.stats['tokens_removed'] += estimate_tokens(block)
+            else:
+                kept.append(block)
+                self.stats['tokens_kept'] += estimate_tokens(block)
+        self.stats['pages'] += 1
+        return kept, b''.join(sorted(set(fingerprints)))
+
+    def log_stats(self):
+        pages = self.stats['pages'] or 1
+        learned = sum(1 for block_fingerprint in self.counts if self.is_boilerplate(block_fingerprint))
+        before = (self.stats['tokens_kept'] + self.stats['tokens_removed']) / pages
+        after = self.stats['tokens_kept'] / pages
+        logging.info(f"Boilerplate: {self.stats['blocks_removed']} blocks removed from {self.stats['pages']} pages, "
+                     f"~{before:.0f} -> ~{after:.0f} prompt tokens per page, {learned} repeated blocks learned")
@@ -0,0 +1,339 @@
+"""Servidor local que imita la API de CodeGPT que usan las apps del repo, con fallas inyectables.
+
+Rutas simuladas:
+
+- `POST /api/v1/chat/completions`: el mensaje trae `content` y `completion`
+  (Crew_assessment lee uno, los scrapers el otro); con `"stream": true`
+  responde server-sent events con deltas y `[DONE]`.
+- `GET /api/v1/agent` y `GET /api/v1/agent/{id}`: lista de agentes y un
+  agente con su prompt (Lista_Agentes, Agente_Prompt).
+- `POST /v1/agent/{id}/completion`: la ruta que usa ClonarUI en Streamlit.
+
+Cada llamada sigue un `FaultPlan`: latencia (número fijo o distribución),
+429 con Retry-After, 5xx, ráfagas de un mismo status y cuelgues que nunca
+responden. Con `phases` el plan cambia a lo largo de la corrida (por
+ejemplo 200 llamadas sanas y después una ráfaga de 429). Las apps se
+apuntan al simulador con CODEGPT_API_BASE:
+
+    python codegpt_sim.py --port 8787 --latency lognormal:0.8,0.5 --throttle_rate 0.05
+    CODEGPT_API_BASE=http://127.0.0.1:8787 streamlit run streamlit_app.py
+
+    sim = CodeGPTSimulator(latency='uniform:0.1,0.4', error_rate=0.02)
+    server = sim.serve()
+    os.environ['CODEGPT_API_BASE'] = sim.base_url
+"""
+import re
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+COMPLETIONS_PATH = '/api/v1/chat/completions'
+AGENTS_PATH = '/api/v1/agent'
+AGENT_COMPLETION_RE = re.compile(r'^/v1/agent/([^/]+)/completion$')
+ERROR_STATUSES = (500, 502, 503)
+
+AGENT_COUNT = 3
+
+def parse_distribution(spec):
+    """Función rng -> segundos a partir de un número o de `nombre:parámetros`.
+
+    constant:s, uniform:a,b, normal:media,desvío, lognormal:mediana,sigma,
+    exponential:media. Los valores negativos se llevan a cero.
+    """
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    name, _, params = str(spec).partition(':')
+    if not params:
+        value = float(name)
+        return lambda rng: value
+    values = [float(value) for value in params.split(',')]
+    if name == 'constant':
+        return lambda rng: values[0]
+    if name == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if name == 'normal':
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if name == 'lognormal':
+        return lambda rng: values[0] * rng.lognormvariate(0, values[1])
+    if name == 'exponential':
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] else 0.0
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+class FaultPlan:
+    """Latencia y fallas de las llamadas de una fase.
+
+    `latency` es el tiempo hasta la respuesta (o hasta el primer trozo en
+    streaming) y acepta lo mismo que `parse_distribution`; `jitter` lo
+    multiplica por 1 ± jitter. Las tasas son fracciones de llamadas. Con
+    `burst_every` las llamadas n donde n % burst_every < burst_length
+    responden `burst_status`. Un cuelgue (`timeout_rate`) no responde
+    nada durante `hang` segundos y corta la conexión. `requests` es
+    cuántas llamadas dura la fase (None: hasta el final).
+    """
+
+    def __init__(self, latency=0.2, jitter=0.0, throttle_rate=0.0, error_rate=0.0, timeout_rate=0.0,
+                 burst_every=0, burst_length=0, burst_status=429, retry_after=1, hang=60.0,
+                 token_delay=0.02, piece_chars=40, requests=None):
+        self.latency = latency
+        self.sample_latency = parse_distribution(latency)
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.burst_status = burst_status
+        self.retry_after = retry_after
+        self.hang = hang
+        self.token_delay = token_delay
+        self.piece_chars = piece_chars
+        self.requests = requests
+
+    def settings(self):
+        return {name: value for name, value in vars(self).items() if name != 'sample_latency'}
+
+    def with_changes(self, changes):
+        return FaultPlan(**dict(self.settings(), **changes))
+
+    def decide(self, n, rng):
+        """(resultado, segundos) para la llamada n: resultado es 'ok', 'hang' o un status HTTP."""
+        delay = max(0.0, self.sample_latency(rng) * (1 + rng.uniform(-self.jitter, self.jitter)))
+        if self.burst_every and n % self.burst_every < self.burst_length:
+            return self.burst_status, delay
+        roll = rng.random()
+        if roll < self.timeout_rate:
+            return 'hang', self.hang
+        roll -= self.timeout_rate
+        if roll < self.throttle_rate:
+            return 429, 0.0
+        roll -= self.throttle_rate
+        if roll < self.error_rate:
+            return rng.choice(ERROR_STATUSES), delay
+        return 'ok', delay
+
+class CodeGPTSimulator:
+    """Fake de la API de CodeGPT con un plan de fallas por fases y estadísticas por ruta.
+
+    Las decisiones al azar salen de un generador con semilla, así que dos
+    corridas con los mismos parámetros fallan en las mismas llamadas (con
+    concurrencia el orden de llegada puede variar).
+    """
+
+    def __init__(self, latency=0.2, jitter=0.0, throttle_rate=0.0, retry_after=1, seed=0, phases=None, **faults):
+        self.plan = FaultPlan(latency=latency, jitter=jitter, throttle_rate=throttle_rate,
+                              retry_after=retry_after, **faults)
+        self.phases = [self.plan.with_changes(phase) for phase in phases or []]
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'completed': 0, 'streamed': 0, 'throttled': 0, 'errors': 0,
+                      'timeouts': 0, 'bad_requests': 0, 'routes': {}}
+        self.agents = [{'id': f"agent-{i}", 'name': f"Simulated agent {i}", 'agent_type': 'assistant',
+                        'model': 'simulated', 'is_public': False, 'created_at': '2024-01-01T00:00:00Z',
+                        'welcome': f"Hi, I am simulated agent {i}",
+                        'prompt': f"You are simulated agent {i}. Answer with the documentation provided."}
+                       for i in range(AGENT_COUNT)]
+        self.base_url = None
+        self.url = None
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def phase(self, n):
+        """Plan de la llamada n: la fase en curso, o el plan base si no hay fases."""
+        for plan in self.phases:
+            if plan.requests is None or n < plan.requests:
+                return plan
+            n -= plan.requests
+        return self.phases[-1] if self.phases else self.plan
+
+    def decide(self, route):
+        with self.lock:
+            n = self.stats['requests']
+            self.stats['requests'] += 1
+            self.stats['routes'][route] = self.stats['routes'].get(route, 0) + 1
+            plan = self.phase(n)
+            outcome, delay = plan.decide(n, self.random)
+        return plan, outcome, delay
+
+    def completion_text(self, payload):
+        """Texto de la respuesta: el último mensaje sin la instrucción del prompt (o el contenido en ClonarUI)."""
+        if payload.get('messages'):
+            content = payload['messages'][-1]['content']
+        else:
+            content = payload.get('content') or payload.get('prompt') or ''
+        # Los prompts de las apps son una instrucción, una línea en blanco y el texto a procesar
+        _, _, text = content.partition("\n\n")
+        return text or content
+
+    def agent(self, agent_id):
+        for agent in self.agents:
+            if agent['id'] == agent_id:
+                return agent
+        return dict(self.agents[0], id=agent_id)
+
+    def serve(self, port=0, host='127.0.0.1'):
+        """Servir el simulador en un hilo aparte; devuelve el servidor (cerrarlo con shutdown())."""
+        sim = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def reply(self, status, body, headers=()):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def stream(self, plan, text):
+                # Sin Content-Length: el fin de la respuesta lo marca el cierre de la conexión
+                self.close_connection = True
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                step = max(1, plan.piece_chars)
+                for i in range(0, len(text), step):
+                    if i:
+                        time.sleep(plan.token_delay)
+                    event = {'choices': [{'index': 0, 'delta': {'content': text[i:i + step]}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def fault(self, plan, outcome, delay):
+                """Responder la falla decidida; devuelve False si la llamada sigue normalmente."""
+                if outcome == 'ok':
+                    return False
+                if outcome == 'hang':
+                    sim.count('timeouts')
+                    time.sleep(delay)
+                    self.close_connection = True
+                    return True
+                time.sleep(delay)
+                if outcome == 429:
+                    sim.count('throttled')
+                    self.reply(429, {'error': 'rate limit exceeded'}, [('Retry-After', str(plan.retry_after))])
+                else:
+                    sim.count('errors')
+                    self.reply(outcome, {'error': 'simulated server error'})
+                return True
+
+            def do_GET(self):
+                path = self.path.split('?')[0].rstrip('/')
+                if path != AGENTS_PATH and not path.startswith(AGENTS_PATH + '/'):
+                    self.reply(404, {'error': 'not found'})
+                    return
+                plan, outcome, delay = sim.decide('agent' if path == AGENTS_PATH else 'agent/{id}')
+                if self.fault(plan, outcome, delay):
+                    return
+                time.sleep(delay)
+                sim.count('completed')
+                if path == AGENTS_PATH:
+                    self.reply(200, [{k: v for k, v in agent.items() if k != 'prompt'} for agent in sim.agents])
+                else:
+                    self.reply(200, sim.agent(path.rsplit('/', 1)[1]))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                path = self.path.split('?')[0].rstrip('/')
+                if path == COMPLETIONS_PATH:
+                    route = 'chat/completions'
+                elif AGENT_COMPLETION_RE.match(path):
+                    route = 'agent/{id}/completion'
+                else:
+                    self.reply(404, {'error': 'not found'})
+                    return
+                plan, outcome, delay = sim.decide(route)
+                if self.fault(plan, outcome, delay):
+                    return
+                try:
+                    payload = json.loads(body)
+                    text = sim.completion_text(payload)
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                    sim.count('bad_requests')
+                    self.reply(400, {'error': 'invalid request'})
+                    return
+                time.sleep(delay)
+                if payload.get('stream'):
+                    sim.count('streamed')
+                    self.stream(plan, text)
+                else:
+                    self.reply(200, {'object': 'chat.completion', 'choices': [{
+                        'index': 0, 'finish_reason': 'stop',
+                        'message': {'role': 'assistant', 'content': text, 'completion': text}}]})
+                sim.count('completed')
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        self.base_url = f"http://{host}:{server.server_port}"
+        self.url = self.base_url + COMPLETIONS_PATH
+        threading.Thread(target=server.serve_forever, daemon=True, name="codegpt-sim").start()
+        logging.info(f"Serving a simulated CodeGPT API on {self.base_url}")
+        return server
+
+def add_fault_arguments(parser):
+    """Flags del plan de fallas, compartidos por este script y load_codegpt.py."""
+    parser.add_argument("--latency", default='0.2',
+                        help="Seconds until the response: a number or constant:s, uniform:a,b, normal:mean,sd, "
+                             "lognormal:median,sigma, exponential:mean")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency jitter as a fraction")
+    parser.add_argument("--throttle_rate", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of calls answered with 500/502/503")
+    parser.add_argument("--timeout_rate", type=float, default=0.0, help="Fraction of calls that hang without answering")
+    parser.add_argument("--hang", type=float, default=60.0, help="Seconds a hanging call waits before dropping the connection")
+    parser.add_argument("--burst_every", type=int, default=0, help="Start a burst of --burst_status every N calls")
+    parser.add_argument("--burst_length", type=int, default=0, help="Calls in each burst")
+    parser.add_argument("--burst_status", type=int, default=429, help="Status returned during bursts")
+    parser.add_argument("--retry_after", type=int, default=1, help="Retry-After seconds sent with each 429")
+    parser.add_argument("--token_delay", type=float, default=0.02, help="Seconds between streamed pieces")
+    parser.add_argument("--piece_chars", type=int, default=40, help="Characters per streamed piece")
+    parser.add_argument("--script", help="JSON file with a list of phases, each overriding these flags for 'requests' calls")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the simulated faults")
+
+def simulator_from_args(args):
+    phases = None
+    if args.script:
+        with open(args.script, encoding='utf-8') as f:
+            phases = json.load(f)
+    return CodeGPTSimulator(latency=args.latency, jitter=args.jitter, throttle_rate=args.throttle_rate,
+                            retry_after=args.retry_after, seed=args.seed, phases=phases,
+                            error_rate=args.error_rate, timeout_rate=args.timeout_rate, hang=args.hang,
+                            burst_every=args.burst_every, burst_length=args.burst_length,
+                            burst_status=args.burst_status, token_delay=args.token_delay,
+                            piece_chars=args.piece_chars)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a simulated CodeGPT API with injectable faults")
+    parser.add_argument("--host", default='127.0.0.1', help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8787, help="Port to listen on")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sim = simulator_from_args(args)
+    server = sim.serve(args.port, args.host)
+    logging.info(f"Point the apps at it with CODEGPT_API_BASE={sim.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        logging.info(f"Simulator stats: {json.dumps(sim.stats)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Intervalo (segundos) entre snapshots JSON de las métricas
+METRICS_INTERVAL = float(os.getenv('METRICS_INTERVAL', 10))
+
+# Límites superiores (segundos) de los buckets del histograma de latencias
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+
+PREFIX = 'crawler'
+
+class StageStats:
+    """Histograma de latencias, bytes y errores de una etapa del crawl."""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.errors = 0
+
+    def observe(self, seconds, size=0):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.bytes += size
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+    def quantile(self, q):
+        """Cuantil aproximado, interpolando dentro del bucket donde cae (acotado por el máximo observado)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            if count and seen + count >= target:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+    def as_dict(self):
+        return {'count': self.count, 'errors': self.errors, 'seconds': round(self.total, 3),
+                'max': round(self.max, 3), 'p50': round(self.quantile(0.5), 3), 'p95': round(self.quantile(0.95), 3),
+                'bytes': self.bytes,
+                'buckets': {str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.buckets)}}
+
+class Timer:
+    """Lo que devuelve `CrawlMetrics.timer`: se le pueden anotar los bytes procesados."""
+
+    def __init__(self):
+        self.bytes = 0
+
+class CrawlMetrics:
+    """Métricas de un crawl por etapa (fetch, extract, llm, write...): latencias, bytes, errores y colas.
+
+    Las colas se registran como funciones que se leen al exportar, así que
+    no hace falta actualizarlas en cada put/get. Se exporta en formato de
+    texto de Prometheus (`serve`), como snapshots JSON periódicos
+    (`write_snapshots`) y como tabla de resumen al terminar (`summary`).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.gauges = {}
+        self.started = time.monotonic()
+
+    def stage(self, name):
+        # Se llama con el lock tomado
+        if name not in self.stages:
+            self.stages[name] = StageStats()
+        return self.stages[name]
+
+    def observe(self, name, seconds, size=0):
+        with self.lock:
+            self.stage(name).observe(seconds, size)
+
+    def error(self, name):
+        with self.lock:
+            self.stage(name).errors += 1
+
+    @contextmanager
+    def timer(self, name):
+        """Medir un bloque como una llamada de la etapa; una excepción cuenta como error."""
+        timer = Timer()
+        start = time.monotonic()
+        try:
+            yield timer
+        except BaseException:
+            self.error(name)
+            raise
+        finally:
+            self.observe(name, time.monotonic() - start, timer.bytes)
+
+    def gauge(self, name, read):
+        """Registrar un valor instantáneo (por ejemplo el largo de una cola) que se lee con `read()`."""
+        with self.lock:
+            self.gauges[name] = read
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+            self.gauges = {}
+            self.started = time.monotonic()
+
+    def snapshot(self):
+        with self.lock:
+            stages = {name: stats.as_dict() for name, stats in self.stages.items()}
+            gauges = dict(self.gauges)
+        values = {}
+        for name, read in gauges.items():
+            try:
+                values[name] = read()
+            except Exception:
+                values[name] = None
+        return {'time': time.time(), 'uptime': round(time.monotonic() - self.started, 3),
+                'stages': stages, 'gauges': values}
+
+    def prometheus(self):
+        """Métricas en el formato de texto de Prometheus."""
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {PREFIX}_stage_seconds histogram"]
+        for name, stats in snapshot['stages'].items():
+            cumulative = 0
+            for bound, count in stats['buckets'].items():
+                cumulative += count
+                le = '+Inf' if bound == 'inf' else bound
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{name}"}} {stats["seconds"]}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines.append(f"# TYPE {PREFIX}_stage_bytes_total counter")
+        for name, stats in snapshot['stages'].items():
+            lines.append(f'{PREFIX}_stage_bytes_total{{stage="{name}"}} {stats["bytes"]}')
+        lines.append(f"# TYPE {PREFIX}_stage_errors_total counter")
+        for name, stats in snapshot['stages'].items():
+            lines.append(f'{PREFIX}_stage_errors_total{{stage="{name}"}} {stats["errors"]}')
+        lines.append(f"# TYPE {PREFIX}_gauge gauge")
+        for name, value in snapshot['gauges'].items():
+            if value is not None:
+                lines.append(f'{PREFIX}_gauge{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host='127.0.0.1'):
+        """Servir /metrics en un hilo aparte; devuelve el servidor para cerrarlo con shutdown()."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.prometheus().encode('utf-8')
+                self.send_response(200 if self.path.split('?')[0] in ('/', '/metrics') else 404)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+        logging.info(f"Serving crawl metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+    def write_snapshot(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def write_snapshots(self, path, interval=None):
+        """Escribir un snapshot JSON en `path` cada `interval` segundos; devuelve el Event que los detiene."""
+        interval = interval or METRICS_INTERVAL
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.write_snapshot(path)
+                except OSError as e:
+                    logging.warning(f"Could not write metrics snapshot: {e}")
+
+        threading.Thread(target=loop, daemon=True, name="metrics-snapshot").start()
+        return stop
+
+    def summary(self):
+        """Tabla con llamadas, errores, latencias y throughput por etapa."""
+        snapshot = self.snapshot()
+        header = ('stage', 'calls', 'errors', 'p50 s', 'p95 s', 'max s', 'total s', 'MB', 'MB/s')
+        rows = [header]
+        for name, stats in snapshot['stages'].items():
+            mb = stats['bytes'] / (1024 * 1024)
+            rate = mb / stats['seconds'] if stats['seconds'] else 0.0
+            rows.append((name, str(stats['count']), str(stats['errors']), f"{stats['p50']:.3f}",
+                         f"{stats['p95']:.3f}", f"{stats['max']:.3f}", f"{stats['seconds']:.1f}",
+                         f"{mb:.2f}", f"{rate:.2f}"))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+        lines = ["  ".join(cell.ljust(width) if i == 0 else cell.rjust(width)
+                           for i, (cell, width) in enumerate(zip(row, widths))) for row in rows]
+        lines.insert(1, "  ".join('-' * width for width in widths))
+        lines.append(f"wall time {snapshot['uptime']:.1f} s")
+        return "\n".join(lines)
+
+# Métricas compartidas por todo el proceso
+metrics = CrawlMetrics()
@@ -0,0 +1,197 @@
+import json
+import sqlite3
+
+# Páginas terminadas entre cada commit a la base
+CHECKPOINT_BATCH = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT UNIQUE NOT NULL,
+    depth INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    reason TEXT
+);
+CREATE TABLE IF NOT EXISTS content_hashes (
+    hash TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS signatures (
+    url TEXT PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS page_blocks (
+    url TEXT PRIMARY KEY,
+    fingerprints BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS page_endpoints (
+    url TEXT PRIMARY KEY,
+    routes TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS page_sections (
+    url TEXT PRIMARY KEY,
+    sections TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS saved_pages (
+    url TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class CrawlState:
+    """Checkpoints de un crawl en SQLite: frontera, estado por URL, hashes, firmas, bloques, endpoints y rotación de salida.
+
+    Los cambios se acumulan en una transacción que se confirma cada
+    `batch_size` páginas terminadas (y al cerrar). Junto con cada commit se
+    guarda la posición de la salida (archivo y manifiesto) tras la última
+    página terminada, de modo que al reanudar se descarta lo escrito después.
+    """
+
+    def __init__(self, path, batch_size=CHECKPOINT_BATCH):
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        try:
+            # Bases creadas antes de guardar el motivo de las páginas descartadas
+            self.conn.execute("ALTER TABLE urls ADD COLUMN reason TEXT")
+        except sqlite3.OperationalError:
+            pass
+        self.conn.commit()
+        self.pages_since_commit = 0
+        self.output = None
+        # Sidecar de tablas (tables.TableSink), si lo hay: su posición se guarda junto con la de la salida
+        self.tables = None
+
+    def reset(self, base_url, keep_output=False):
+        """Empezar un crawl nuevo descartando cualquier estado anterior.
+
+        Con `keep_output` (recrawl incremental) se conservan la posición de la
+        salida, los hashes del contenido guardado y las secciones de cada
+        página, porque la corrida nueva sigue escribiendo sobre esa salida.
+        """
+        self.conn.execute("DELETE FROM urls")
+        self.conn.execute("DELETE FROM signatures")
+        self.conn.execute("DELETE FROM page_blocks")
+        self.conn.execute("DELETE FROM page_endpoints")
+        self.conn.execute("DELETE FROM saved_pages")
+        if not keep_output:
+            self.conn.execute("DELETE FROM content_hashes")
+            self.conn.execute("DELETE FROM page_sections")
+            self.conn.execute("DELETE FROM meta")
+        self.set_meta('base_url', base_url)
+        self.conn.commit()
+
+    def has_checkpoint(self):
+        return self.conn.execute("SELECT 1 FROM urls LIMIT 1").fetchone() is not None
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def add_url(self, url, depth):
+        self.conn.execute("INSERT OR IGNORE INTO urls (url, depth) VALUES (?, ?)", (url, depth))
+
+    def page_done(self, url, output, content_md5=None, status='done', reason=None, signature=None,
+                  fingerprints=None, endpoints=None, sections=None, saved=False):
+        """Marcar una URL como terminada (done, failed o skipped) y registrar el estado de salida resultante.
+
+        `signature` es la firma MinHash con la que la página quedó en el índice de
+        casi duplicados, `fingerprints` las huellas de sus bloques de texto y
+        `endpoints` las rutas que sumó al índice de endpoints. `sections` son
+        las huellas y resultados por sección para el próximo recrawl incremental.
+        `saved` indica que en esta corrida se escribió un registro nuevo de la
+        página (no es un duplicado ni quedó igual que en la corrida anterior).
+        """
+        self.conn.execute("UPDATE urls SET status = ?, reason = ? WHERE url = ?", (status, reason, url))
+        if content_md5:
+            self.conn.execute("INSERT OR IGNORE INTO content_hashes (hash) VALUES (?)", (content_md5,))
+        if signature is not None:
+            self.conn.execute("INSERT OR REPLACE INTO signatures (url, signature) VALUES (?, ?)",
+                              (url, bytes(signature)))
+        if fingerprints is not None:
+            self.conn.execute("INSERT OR REPLACE INTO page_blocks (url, fingerprints) VALUES (?, ?)",
+                              (url, fingerprints))
+        if endpoints is not None:
+            self.conn.execute("INSERT OR REPLACE INTO page_endpoints (url, routes) VALUES (?, ?)",
+                              (url, json.dumps(endpoints)))
+        if sections is not None:
+            self.conn.execute("INSERT OR REPLACE INTO page_sections (url, sections) VALUES (?, ?)",
+                              (url, json.dumps(sections, ensure_ascii=False)))
+        if saved:
+            self.conn.execute("INSERT OR IGNORE INTO saved_pages (url) VALUES (?)", (url,))
+        self.output = output
+        self.pages_since_commit += 1
+        if self.pages_since_commit >= self.batch_size:
+            self.commit()
+
+    def commit(self):
+        if self.output is not None:
+            # Posición de la salida tras la última página terminada: lo que se
+            # escriba después pertenece a páginas que todavía no están confirmadas.
+            # Tiene que estar en disco antes de confirmarla.
+            self.output.flush()
+            for key, value in self.output.position().items():
+                self.set_meta(key, value)
+        if self.tables is not None:
+            self.tables.flush()
+            for key, value in self.tables.position().items():
+                self.set_meta(key, value)
+        self.conn.commit()
+        self.pages_since_commit = 0
+
+    def load(self):
+        """Leer el último checkpoint: URLs pendientes en orden, URLs vistas, hashes, firmas, bloques, endpoints y rotación."""
+        queued = self.conn.execute(
+            "SELECT url, depth FROM urls WHERE status = 'queued' ORDER BY id").fetchall()
+        seen = {row[0] for row in self.conn.execute("SELECT url FROM urls")}
+        hashes = {row[0] for row in self.conn.execute("SELECT hash FROM content_hashes")}
+        signatures = self.conn.execute("SELECT url, signature FROM signatures ORDER BY rowid").fetchall()
+        fingerprints = [row[0] for row in
+                        self.conn.execute("SELECT fingerprints FROM page_blocks ORDER BY rowid")]
+        endpoints = [(url, json.loads(routes)) for url, routes in
+                     self.conn.execute("SELECT url, routes FROM page_endpoints ORDER BY rowid")]
+        counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status").fetchall())
+        return {
+            'queued': queued,
+            'seen': seen,
+            'content_hash': hashes,
+            'signatures': signatures,
+            'fingerprints': fingerprints,
+            'endpoints': endpoints,
+            'file_counter': int(self.get_meta('file_counter', 1)),
+            'file_bytes': int(self.get_meta('file_bytes', 0)),
+            'manifest_bytes': int(self.get_meta('manifest_bytes', 0)),
+            'tables_bytes': int(self.get_meta('tables_bytes', 0)),
+            'tables_run_start': int(self.get_meta('tables_run_start', 0)),
+            'counts': counts,
+        }
+
+    def restore_output(self, output, checkpoint):
+        """Volver la salida (ShardWriter o RecordWriter) al punto del checkpoint truncando lo escrito después."""
+        output.restore(checkpoint['file_counter'], checkpoint['file_bytes'], checkpoint['manifest_bytes'])
+        output.content_hash = set(checkpoint['content_hash'])
+        if self.tables is not None:
+            self.tables.restore(checkpoint['tables_bytes'], checkpoint['tables_run_start'])
+
+    def page_sections(self, url):
+        """Secciones guardadas de la página en la corrida anterior (o antes en esta), o None."""
+        row = self.conn.execute("SELECT sections FROM page_sections WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def saved_urls(self):
+        """URLs con un registro nuevo en esta corrida: sus registros de corridas anteriores quedan reemplazados."""
+        return {row[0] for row in self.conn.execute("SELECT url FROM saved_pages")}
+
+    def skipped(self):
+        """URLs descartadas (por tipo, tamaño o casi duplicadas) con su motivo."""
+        return self.conn.execute("SELECT url, reason FROM urls WHERE status = 'skipped' ORDER BY id").fetchall()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
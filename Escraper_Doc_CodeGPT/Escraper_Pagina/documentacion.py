@@ -2,13 +2,38 @@ import os
 import logging
 import requests
 import time
-from bs4 import BeautifulSoup
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import argparse
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import json
-import re
 from dotenv import load_dotenv
 import hashlib
+from frontier import Frontier, canonicalize_url
+from crawl_state import CrawlState
+from shard_writer import ShardWriter
+import record_store
+from record_store import RecordWriter, record_path, page_record, timed
+from http_cache import HTTPCache, HTTP_CACHE_DIR
+import page_fetch
+import http_session
+from page_fetch import SkipPage, fetch_text
+from chunking import chunk_markdown, split_sections, CHUNK_WORKERS
+from section_diff import plan_units, unit_records, extras_digest
+from llm_cache import LLMCache, LLM_CACHE_PATH, cache_key
+from near_dup import NearDuplicateIndex, NEAR_DUP_THRESHOLD
+from boilerplate import BoilerplateLearner, BOILERPLATE_MIN_PAGES, BOILERPLATE_MIN_RATIO
+from sitemap import discover
+from content_filter import ContentFilter, load_rules, FILTER_RULES
+from endpoint_index import EndpointIndex
+from tables import TableSink, table_rows, TABLE_SIDECAR, SIDECAR_FORMATS
+from crawl_metrics import metrics, METRICS_INTERVAL
+import llm_limiter
+from llm_limiter import limiter
+import html_backend
+from extraction import (parse_html, run_extractors, extract_all,
+                        ContentExtractor, EndpointExtractor, TableExtractor, LinkExtractor)
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -20,89 +45,103 @@ load_dotenv()
 CODEGPT_API_KEY = os.getenv('CODEGPT_API_KEY')
 AGENT_ID = os.getenv('AGENT_ID')
 
+# Se puede apuntar a un servidor local (por ejemplo codegpt_sim) con CODEGPT_API_BASE o con la URL completa
+CODEGPT_API_BASE = os.getenv('CODEGPT_API_BASE', "https://api.codegpt.co")
+CODEGPT_API_URL = os.getenv('CODEGPT_API_URL', f"{CODEGPT_API_BASE}/api/v1/chat/completions")
+
 # Tamaño máximo de archivo en bytes (1.2 MB)
-MAX_FILE_SIZE = 1.2 * 1024 * 1024
+MAX_FILE_SIZE = int(1.2 * 1024 * 1024)
+
+# Formato de salida: archivos de texto rotados (text) o un registro JSONL comprimido por página (jsonl)
+OUTPUT_FORMAT = os.getenv('OUTPUT_FORMAT', 'text')
 
 # Profundidad máxima de crawling
 MAX_DEPTH = 3
 
-# Lista de frases o palabras clave a filtrar
-phrases_to_filter = [
-    "usamos cookies",
-    "mejorar tu experiencia",
-    "centro de privacidad",
-    "política de privacidad",
-    "términos y condiciones",
-    "aviso legal",
-]
+# Modo asíncrono: cantidad de workers de descarga y de CodeGPT
+FETCH_WORKERS = 8
+LLM_WORKERS = 4
+
+# Procesos que parsean el HTML en modo asíncrono (0: se parsea en los hilos de descarga)
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', 0))
+
+# Solicitudes por segundo permitidas a cada host
+RATE_LIMIT = 1.0
+
+# Espera entre páginas del crawl secuencial (segundos)
+REQUEST_DELAY = float(os.getenv('REQUEST_DELAY', 1.0))
+
+# Profundidad con la que entran al crawl las URLs sembradas desde el sitemap
+SITEMAP_DEPTH = 1
+
+# Frases que descartan elementos de la página, compiladas para el sitio del crawl
+# (main lo reemplaza por el de las reglas de FILTER_RULES o --filter_rules)
+content_filter = ContentFilter()
+
+# Hilos para mandar en paralelo los trozos de una página grande
+chunk_executor = ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="chunk")
+
+# Índice de páginas ya analizadas para no mandar casi duplicados a CodeGPT (lo crea main)
+near_duplicates = None
+
+# Bloques de texto repetidos en el sitio que se quitan antes del prompt (lo crea main)
+boilerplate = None
+
+# lastmod del sitemap por URL canónica y Crawl-delay de robots.txt por host (los llena seed_from_sitemaps)
+sitemap_lastmods = {}
+crawl_delays = {}
+
+# Caché HTTP en disco usada por scrape_url y caché de respuestas de CodeGPT (se configuran en main)
+http_cache = None
+llm_cache = None
+
+# Sidecar con las celdas de las tablas de cada página guardada (lo crea main según --table_sidecar)
+table_sink = None
+
+# Rutas de la API encontradas en todo el crawl, con métodos y páginas (lo crea main; se escribe al final)
+endpoint_index = None
 
 # Palabras clave válidas para URLs
 VALID_KEYWORDS = ['api', 'reference', 'documentation', 'endpoint', 'integration']
 
 def should_filter_text(text):
     """Verificar si el texto contiene alguna de las frases a filtrar."""
-    return any(phrase.lower() in text.lower() for phrase in phrases_to_filter)
+    return content_filter(text)
 
-def clean_text(text):
-    # Eliminar espacios en blanco extra al principio y al final
-    text = text.strip()
-    # Reemplazar múltiples espacios en blanco con un solo espacio
-    text = re.sub(r'\s+', ' ', text)
-    return text
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
 
-def scrape_url(url):
+def fetch_page(url):
+    """Descargar una página. Devuelve (html, skip) donde skip es el SkipPage si se descartó."""
+    start = time.monotonic()
     try:
         logging.info(f"Scraping URL: {url}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+        text = fetch_text(url, REQUEST_HEADERS, http_cache, modified_at=sitemap_lastmods.get(url))
+        metrics.observe('fetch', time.monotonic() - start, len(text.encode('utf-8')))
         logging.info("Successfully scraped URL")
-        return response.text
+        return text, None
+    except SkipPage as e:
+        # Un descarte no es un error: cuenta solo como llamada
+        metrics.observe('fetch', time.monotonic() - start)
+        logging.warning(f"Skipping {url}: {e.reason}")
+        return "", e
     except requests.exceptions.RequestException as e:
+        metrics.observe('fetch', time.monotonic() - start)
+        metrics.error('fetch')
         logging.error(f"Error scraping URL: {e}")
-        return ""
+        return "", None
+
+def scrape_url(url):
+    return fetch_page(url)[0]
 
 def extract_api_endpoints(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    endpoints = []
-
-    # Buscar endpoints en elementos <strong>
-    strong_tags = soup.find_all('strong')
-    for tag in strong_tags:
-        if re.search(r'https?://api\.', tag.text):
-            endpoints.append(tag.text.strip())
-
-    # Buscar endpoints en celdas de tabla
-    tables = soup.find_all('table')
-    for table in tables:
-        rows = table.find_all('tr')
-        for row in rows:
-            cells = row.find_all('td')
-            for cell in cells:
-                if re.search(r'/[a-zA-Z0-9_/]+', cell.text):
-                    endpoints.append(cell.text.strip())
-
-    return endpoints
+    return run_extractors(parse_html(html_content), [EndpointExtractor()])[0]
 
 def extract_tables(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    tables = soup.find_all('table')
-    extracted_tables = []
-
-    for table in tables:
-        table_data = []
-        rows = table.find_all('tr')
-        for row in rows:
-            cells = row.find_all(['th', 'td'])
-            row_data = [cell.text.strip() for cell in cells]
-            table_data.append(row_data)
-        extracted_tables.append(table_data)
-
-    return extracted_tables
-
-def analyze_with_codegpt(content):
+    return run_extractors(parse_html(html_content), [TableExtractor()])[0]
+
+def analyze_chunk_with_codegpt(content, bypass_cache=False):
     headers = {
         "Authorization": f"Bearer {CODEGPT_API_KEY}",
         "Content-Type": "application/json"
@@ -116,12 +155,22 @@ def analyze_with_codegpt(content):
         "Do not summarize, translate, or alter any information, including headings and code examples:\n\n" 
         + content
     )
+
+    key = None
+    if llm_cache is not None:
+        key = cache_key(CODEGPT_API_URL, AGENT_ID, None, prompt)
+        cached = None if bypass_cache else llm_cache.get(key)
+        if cached is not None:
+            logging.info("CodeGPT response served from cache")
+            metrics.observe('llm_cache_hit', 0, len(cached.encode('utf-8')))
+            return cached
     
-    for attempt in range(3):
-        try:
-            logging.info(f"Attempt {attempt + 1} to analyze with CodeGPT")
-            response = requests.post(
-                "https://api.codegpt.co/api/v1/chat/completions",
+    try:
+        logging.info("Analyzing with CodeGPT")
+        with metrics.timer('llm') as timer:
+            # Reintentos, backoff y concurrencia quedan a cargo del limitador compartido
+            response = limiter.post(
+                CODEGPT_API_URL,
                 headers=headers,
                 json={
                     "agent": AGENT_ID,
@@ -130,68 +179,84 @@ def analyze_with_codegpt(content):
                     ]
                 }
             )
-            
+
             response.raise_for_status()
-            
+            timer.bytes = len(response.content)
+
             if not response.text.strip():
                 return ""
-            
+
             try:
                 json_response = response.json()
                 analyzed_content = json_response['choices'][0]['message']['content']
             except json.JSONDecodeError:
                 analyzed_content = response.text
-            
-            if not analyzed_content.strip():
-                return ""
-            
-            return analyzed_content
-        
-        except requests.exceptions.RequestException:
-            if attempt < 2:
-                time.sleep(2)
-            else:
-                return ""
-        except KeyError:
+
+        if not analyzed_content.strip():
             return ""
+
+        if key is not None:
+            llm_cache.put(key, analyzed_content)
+        return analyzed_content
     
-    return ""
+    except requests.exceptions.RequestException:
+        return ""
+    except KeyError:
+        return ""
+
+def analyze_with_codegpt(content, bypass_cache=False):
+    """Analizar el contenido con CodeGPT, por secciones y en paralelo si no entra en una llamada."""
+    return analyze_sections(content, bypass_cache=bypass_cache)[0]
+
+def analyze_sections(content, previous=None, bypass_cache=False):
+    """Analizar el contenido mandando a CodeGPT solo las secciones que cambiaron.
+
+    `previous` son las unidades guardadas para la página en la corrida
+    anterior (de section_diff.unit_records): las secuencias de secciones
+    que siguen iguales se reusan y el resto se agrupa y se manda en trozos
+    de chunk_markdown, en paralelo. Sin `previous` se manda todo. Devuelve
+    el texto analizado y las unidades para guardar (None si ninguna
+    llamada funcionó).
+    """
+    sections = split_sections(content)
+    fingerprints, units = plan_units(sections, previous)
+    chunks = [(index, chunk) for index, (start, end, analyzed) in enumerate(units) if analyzed is None
+              for chunk in chunk_markdown("\n".join(sections[start:end]))]
+    reused = sum(end - start for start, end, analyzed in units if analyzed is not None)
+    if reused:
+        logging.info(f"{reused} of {len(sections)} sections unchanged, {len(chunks)} chunks sent to CodeGPT")
+    if len(chunks) == 1:
+        answers = [analyze_chunk_with_codegpt(chunks[0][1], bypass_cache)]
+    else:
+        if chunks:
+            logging.info(f"Content split into {len(chunks)} chunks for CodeGPT")
+        answers = list(chunk_executor.map(lambda item: analyze_chunk_with_codegpt(item[1], bypass_cache), chunks))
+    if not reused and not any(answers):
+        return "", None
+
+    pieces = {}
+    failed = set()
+    for i, ((index, chunk), answer) in enumerate(zip(chunks, answers), 1):
+        if not answer:
+            if len(chunks) > 1 or reused:
+                logging.warning(f"Chunk {i}/{len(chunks)} could not be analyzed, keeping its original text")
+            failed.add(index)
+            answer = chunk
+        pieces.setdefault(index, []).append(answer)
+    results = [analyzed if analyzed is not None else "\n\n".join(pieces[index])
+               for index, (start, end, analyzed) in enumerate(units)]
+    records = unit_records(sections, fingerprints, units,
+                           [None if index in failed else result for index, result in enumerate(results)])
+    return "\n\n".join(results), records
 
 def analyze_content(html_content):
     logging.info("Analyzing HTML content")
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    for tag in soup(['header', 'footer', 'nav', 'script', 'style', 'meta', 'link', 'noscript', 'iframe', 'object', 'embed']):
-        tag.decompose()
-
-    content = []
-    for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'pre', 'code']):
-        text = element.text.strip()
-        if should_filter_text(text):
-            continue  # Omitir el texto si contiene alguna frase a filtrar
-        if element.name.startswith('h'):
-            level = int(element.name[1])
-            prefix = '#' * level
-            content.append(f"\n{prefix} {text}\n")
-        elif element.name in ['pre', 'code']:
-            code_content = element.text.strip()
-            content.append(f"\n```\n{code_content}\n```\n")
-        else:
-            content.append(clean_text(text))
-    
-    text_content = "\n".join(content)
-    
+    with metrics.timer('extract') as timer:
+        timer.bytes = len(html_content.encode('utf-8'))
+        text_content = run_extractors(parse_html(html_content), [ContentExtractor(content_filter)])[0]
     logging.info("Finished analyzing HTML content")
     return text_content
 
-def save_to_file(content, filename):
-    try:
-        with open(filename, "a", encoding="utf-8") as file:
-            file.write(content + "\n\n")
-        logging.info(f"Content saved to {filename}")
-    except IOError as e:
-        logging.error(f"Error saving to file: {e}")
-
 def is_valid_url(url, base_domain):
     parsed_url = urlparse(url)
     return (parsed_url.netloc == base_domain and 
@@ -202,106 +267,692 @@ def is_valid_url(url, base_domain):
 def contains_valid_keyword(url):
     return any(keyword in url.lower() for keyword in VALID_KEYWORDS)
 
+def is_crawlable(url, base_domain):
+    return is_valid_url(url, base_domain) and contains_valid_keyword(url)
+
 def get_links(html_content, base_url, base_domain):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    links = []
-    for a in soup.find_all('a', href=True):
-        full_url = urljoin(base_url, a['href'])
-        if is_valid_url(full_url, base_domain) and contains_valid_keyword(full_url):
-            links.append(full_url)
-    return links
-
-def crawl_and_save(base_url, output_dir, company_name, depth=0):
-    if depth > MAX_DEPTH:
-        return
-
-    visited = set()
-    to_visit = [base_url]
+    extractor = LinkExtractor(base_url, lambda url: is_crawlable(url, base_domain))
+    return run_extractors(parse_html(html_content), [extractor])[0]
+
+def format_endpoints(api_endpoints):
+    return "API Endpoints:\n" + "\n".join(api_endpoints) + "\n\n"
+
+def format_tables(tables):
+    content = "Tables:\n"
+    for i, table in enumerate(tables, 1):
+        content += f"\nTable {i}:\n"
+        for row in table_rows(table):
+            content += " | ".join(row) + "\n"
+        content += "\n"
+    return content
+
+def content_digest(text):
+    return hashlib.md5(text.encode()).hexdigest()
+
+def open_output(output_dir, company_name):
+    """Writer de la salida del crawl según OUTPUT_FORMAT."""
+    if OUTPUT_FORMAT == 'jsonl':
+        return RecordWriter(record_path(output_dir, company_name))
+    return ShardWriter(output_dir, company_name, MAX_FILE_SIZE)
+
+def save_page_output(output, url, analyzed_content, api_endpoints, tables, info=None, replaces=None):
+    """Guardar el resultado de una página como un único registro del writer.
+
+    `info` lleva el texto mandado a CodeGPT (`source`) y las duraciones por
+    etapa (`timings`), que solo se guardan en la salida JSONL. `replaces` es
+    el hash del registro anterior de la misma URL en un recrawl incremental:
+    el registro nuevo lo reemplaza (en el manifiesto o índice gana el
+    último) y no cuenta como duplicado de sí mismo. Devuelve False si el
+    contenido analizado ya había sido guardado.
+    """
+    parts = []
+    if analyzed_content:
+        # Verificar si el contenido ya ha sido guardado
+        content_md5 = content_digest(analyzed_content)
+        if content_md5 in output.content_hash and content_md5 != replaces:
+            return False
+        output.content_hash.add(content_md5)
+        parts.append(analyzed_content)
+
+    if tables and table_sink is not None:
+        with metrics.timer('tables') as timer:
+            timer.bytes = table_sink.write(url, tables)
+
+    if isinstance(output, RecordWriter):
+        with metrics.timer('write') as timer:
+            timer.bytes = output.write(url, page_record(url, analyzed_content, api_endpoints, tables, **(info or {})))
+        return True
+
+    # Guardar los endpoints y tablas solo si no están vacíos
+    if api_endpoints:
+        parts.append(format_endpoints(api_endpoints))
+    if tables:
+        parts.append(format_tables(tables))
+
+    if parts:
+        with metrics.timer('write') as timer:
+            timer.bytes = output.write(url, "".join(part + "\n\n" for part in parts))
+    return True
+
+def extract_page(html_content, url, base_domain):
+    """Todo el trabajo de CPU sobre una página descargada, con un único parseo del HTML.
+
+    El contenido sale como lista de bloques para que `strip_boilerplate` pueda quitar los repetidos.
+    """
+    logging.info("Analyzing HTML content")
+    with metrics.timer('extract') as timer:
+        timer.bytes = len(html_content.encode('utf-8'))
+        content_blocks, api_endpoints, tables, links = extract_all(
+            html_content, url, lambda link: is_crawlable(link, base_domain), content_filter, as_blocks=True,
+            structured_tables=True)
+    logging.info("Finished analyzing HTML content")
+    return content_blocks, api_endpoints, tables, links
+
+def init_parse_worker(html_parser, page_filter):
+    # Los procesos del pool arrancan de cero (spawn): hay que pasarles la configuración de main
+    global content_filter
+    html_backend.HTML_PARSER = html_parser
+    content_filter = page_filter
+
+def parse_page(data, url, base_domain):
+    """Versión de `extract_page` para el pool de procesos.
+
+    Recibe el HTML como bytes UTF-8 y devuelve solo listas y strings (nada de
+    objetos de BeautifulSoup), más los segundos que tomó, porque las métricas
+    del proceso hijo no llegan al crawl.
+    """
+    start = time.monotonic()
+    result = extract_all(data.decode('utf-8'), url, lambda link: is_crawlable(link, base_domain),
+                         content_filter, as_blocks=True, structured_tables=True)
+    return result, time.monotonic() - start
+
+def page_sections(analyzed_content, units, api_endpoints, tables):
+    """Lo que se guarda de la página para el próximo recrawl incremental (None si CodeGPT falló)."""
+    if units is None:
+        return None
+    return {'content_md5': content_digest(analyzed_content), 'extras': extras_digest(api_endpoints, tables),
+            'units': units}
+
+def unchanged_page(url, previous, sections):
+    """True si el registro de la corrida anterior sigue valiendo y no hay que reescribirlo."""
+    if previous is None:
+        return False
+    if sections is None:
+        logging.warning(f"Could not analyze {url} again, keeping its previous record")
+        return True
+    return sections['content_md5'] == previous['content_md5'] and sections['extras'] == previous['extras']
+
+def strip_boilerplate(content_blocks):
+    """Texto de la página sin los bloques aprendidos como boilerplate, y las huellas de sus bloques."""
+    if boilerplate is None:
+        return "\n".join(content_blocks), None
+    kept, fingerprints = boilerplate.filter(content_blocks)
+    return "\n".join(kept), fingerprints
+
+def index_endpoints(url, api_endpoints, tables):
+    """Sumar las rutas de la página al índice de endpoints; devuelve las que se guardan en el checkpoint."""
+    if endpoint_index is None:
+        return None
+    with metrics.timer('endpoints'):
+        routes = endpoint_index.parse(api_endpoints, tables)
+        endpoint_index.add(url, routes)
+    return routes
+
+def page_signature(filtered_content):
+    """Firma MinHash del texto de la página (None si no se buscan casi duplicados)."""
+    if near_duplicates is None:
+        return None
+    with metrics.timer('dedup') as timer:
+        timer.bytes = len(filtered_content.encode('utf-8'))
+        return near_duplicates.signature(filtered_content)
+
+def find_near_duplicate(url, signature):
+    """URL ya analizada casi igual a esta página; si no hay, la página queda indexada y se devuelve None."""
+    if near_duplicates is None:
+        return None
+    return near_duplicates.check(url, signature)
+
+def new_crawl_stats():
+    return {'fetched': 0, 'failed': 0, 'unchanged': 0, 'skipped': {}}
+
+def record_skip(stats, skip):
+    stats['skipped'][skip.kind] = stats['skipped'].get(skip.kind, 0) + 1
+
+def record_fetch(stats, html_content, skip):
+    stats['fetched'] += 1
+    if skip is not None:
+        record_skip(stats, skip)
+    elif not html_content:
+        stats['failed'] += 1
+
+def near_duplicate_skip(stats, match):
+    skip = SkipPage('near-duplicate', f"similar to {match}")
+    record_skip(stats, skip)
+    return skip
+
+def log_crawl_stats(stats, frontier):
+    skipped = ", ".join(f"{kind}={count}" for kind, count in sorted(stats['skipped'].items())) or "none"
+    logging.info(f"Crawl finished: {stats['fetched']} URLs fetched, {stats['failed']} failed, "
+                 f"{stats['unchanged']} unchanged since the last run, "
+                 f"skipped: {skipped}, {frontier.duplicates} duplicate links skipped")
+
+def seed_from_sitemaps(base_url, sitemap_urls=None):
+    """URLs del sitemap que pasan los filtros del crawl, anotando su lastmod y el Crawl-delay del host."""
+    base_domain = urlparse(base_url).netloc
+    urls, lastmods, crawl_delay = discover(
+        base_url, lambda url: is_crawlable(url, base_domain), REQUEST_HEADERS, sitemap_urls)
+    if crawl_delay:
+        crawl_delays[base_domain] = crawl_delay
+    for url, lastmod in lastmods.items():
+        if lastmod:
+            sitemap_lastmods[canonicalize_url(url)] = lastmod
+    return urls
+
+def crawl_delay(url):
+    """Espera mínima entre solicitudes al host de `url` pedida por robots.txt (0 si no pide nada)."""
+    return crawl_delays.get(urlparse(url).netloc, 0)
+
+def open_crawl_state(base_url, output_dir, company_name, frontier, output, resume=False, seeds=(),
+                     incremental=False):
+    """Abrir el checkpoint del crawl. Devuelve el estado y las URLs (canónicas) con las que arrancar.
+
+    En un crawl nuevo se arranca por `base_url` y después las URLs sembradas
+    desde el sitemap; al reanudar, la frontera sale del checkpoint. Un crawl
+    `incremental` arranca igual que uno nuevo pero sigue escribiendo al final
+    de la salida de la corrida anterior y conserva sus secciones por página.
+    """
+    state = CrawlState(os.path.join(output_dir, f"{company_name}_crawl_state.db"))
+    state.tables = table_sink
+    if resume and state.has_checkpoint():
+        checkpoint = state.load()
+        frontier.seen.update(checkpoint['seen'])
+        state.restore_output(output, checkpoint)
+        if near_duplicates is not None:
+            for url, signature in checkpoint['signatures']:
+                near_duplicates.add(url, signature)
+        if boilerplate is not None:
+            for fingerprints in checkpoint['fingerprints']:
+                boilerplate.replay(fingerprints)
+        if endpoint_index is not None:
+            for url, routes in checkpoint['endpoints']:
+                endpoint_index.add(url, routes)
+        logging.info(f"Resuming crawl: {len(checkpoint['queued'])} URLs pending, "
+                     f"{checkpoint['counts'].get('done', 0)} already done")
+        return state, checkpoint['queued']
+
+    if incremental and state.get_meta('file_counter') is not None:
+        state.restore_output(output, state.load())
+        # Lo que haya quedado sin compactar de una corrida interrumpida se compacta antes de empezar otra
+        finish_output(state, output)
+        state.reset(base_url, keep_output=True)
+        if table_sink is not None:
+            table_sink.start_run()
+            state.commit()
+        logging.info("Incremental crawl: only changed sections go to CodeGPT and only changed pages are rewritten")
+    else:
+        state.reset(base_url)
+        # Un crawl nuevo no sigue escribiendo en los archivos de una corrida anterior
+        output.restore(1, 0, 0)
+        if table_sink is not None:
+            table_sink.restore(0)
+    canonical = frontier.mark(base_url, 0)
+    state.add_url(canonical, 0)
+    start = [(canonical, 0)]
+    for url in seeds:
+        canonical = frontier.mark(url, SITEMAP_DEPTH)
+        if canonical:
+            state.add_url(canonical, SITEMAP_DEPTH)
+            start.append((canonical, SITEMAP_DEPTH))
+    return state, start
+
+def finish_output(state, output):
+    """Al terminar el crawl, quitar de la salida y del sidecar las versiones viejas de las páginas reescritas.
+
+    Solo un recrawl incremental deja versiones viejas: la nueva de cada
+    página cambiada se agrega al final.
+    """
+    changed = output.compact()
+    if table_sink is not None and table_sink.compact(state.saved_urls()):
+        changed = True
+    if changed:
+        state.output = output
+        state.commit()
+
+def crawl_and_save(base_url, output_dir, company_name, resume=False, seeds=(), incremental=False):
+    """Crawl secuencial en anchura con una única frontera para todo el sitio."""
+    frontier = Frontier(MAX_DEPTH)
+    base_domain = urlparse(base_url).netloc
+    output = open_output(output_dir, company_name)
+    state, start = open_crawl_state(base_url, output_dir, company_name, frontier, output, resume, seeds, incremental)
+    frontier.queue.extend(start)
+    stats = new_crawl_stats()
+    metrics.gauge('frontier', lambda: len(frontier))
+
+    try:
+        while frontier:
+            url, depth = frontier.pop()
+            with metrics.timer('page'):
+                timings = {}
+                html_content, skip = timed(timings, 'fetch', fetch_page, url)
+                record_fetch(stats, html_content, skip)
+
+                if skip is not None:
+                    state.page_done(url, output, status='skipped', reason=skip.reason)
+                    continue
+                if not html_content:
+                    state.page_done(url, output, status='failed')
+                    continue
+
+                content_blocks, api_endpoints, tables, links = timed(
+                    timings, 'extract', extract_page, html_content, url, base_domain)
+                filtered_content, fingerprints = strip_boilerplate(content_blocks)
+                routes = index_endpoints(url, api_endpoints, tables)
+                # Los casi duplicados no llegan a CodeGPT, pero sus enlaces sí se siguen
+                signature = page_signature(filtered_content)
+                match = find_near_duplicate(url, signature)
+                if match is None:
+                    previous = state.page_sections(url)
+                    analyzed_content, units = timed(timings, 'llm', analyze_sections, filtered_content,
+                                                    previous and previous['units'])
+                    sections = page_sections(analyzed_content, units, api_endpoints, tables)
+
+                    content_md5 = content_digest(analyzed_content) if analyzed_content else None
+                    info = {'source': filtered_content, 'timings': timings}
+                    saved = False
+                    if unchanged_page(url, previous, sections):
+                        stats['unchanged'] += 1
+                    else:
+                        # Un duplicado exacto no se guarda de nuevo, pero sus enlaces se siguen igual que en modo asíncrono
+                        saved = save_page_output(output, url, analyzed_content, api_endpoints, tables, info,
+                                                 previous and previous['content_md5'])
+
+                for link in links:
+                    canonical = frontier.add(link, depth + 1)
+                    if canonical:
+                        state.add_url(canonical, depth + 1)
+                if match is None:
+                    state.page_done(url, output, content_md5, signature=signature, fingerprints=fingerprints,
+                                    endpoints=routes, sections=sections, saved=saved)
+                else:
+                    skip = near_duplicate_skip(stats, match)
+                    state.page_done(url, output, status='skipped', reason=skip.reason, fingerprints=fingerprints,
+                                    endpoints=routes)
+
+            # Retraso entre solicitudes: REQUEST_DELAY o el Crawl-delay de robots.txt si es mayor
+            time.sleep(max(REQUEST_DELAY, crawl_delay(url)))
+        finish_output(state, output)
+    finally:
+        state.close()
+        output.close()
+
+    log_crawl_stats(stats, frontier)
+
+class HostRateLimiter:
+    """Reparte los turnos de descarga para no superar `rate` solicitudes por segundo en cada host.
+
+    Si robots.txt pide un Crawl-delay más largo para el host, se respeta ese.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = {}
+
+    async def wait(self, url):
+        host = urlparse(url).netloc
+        now = time.monotonic()
+        slot = max(now, self.next_slot.get(host, now))
+        self.next_slot[host] = slot + max(self.interval, crawl_delay(url))
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+async def crawl_and_save_async(base_url, output_dir, company_name, resume=False,
+                               fetch_workers=FETCH_WORKERS, llm_workers=LLM_WORKERS, rate_limit=RATE_LIMIT,
+                               seeds=(), parse_workers=PARSE_WORKERS, incremental=False):
+    """Crawl concurrente: un pool de descargas y otro de CodeGPT unidos por colas.
+
+    Las llamadas bloqueantes (requests, BeautifulSoup) corren en executors propios
+    de cada pool. Las páginas pasan a CodeGPT y se escriben en el orden en que se
+    descubrieron las URLs, así que los casi duplicados y la salida son los mismos
+    que en el modo secuencial.
+
+    Con `parse_workers` el parseo y la extracción pasan a un pool de procesos
+    para usar más de un núcleo. Como mucho hay dos páginas por proceso en
+    espera; si el pool no da abasto, las descargas se frenan antes de tomar
+    otra URL de la cola.
+    """
+    loop = asyncio.get_running_loop()
     base_domain = urlparse(base_url).netloc
-    current_file_size = 0
-    file_counter = 1
-    current_file = os.path.join(output_dir, f"{company_name}_{file_counter}.txt")
-    content_hash = set()
-
-    while to_visit:
-        url = to_visit.pop(0)
-        if url in visited:
-            continue
-
-        visited.add(url)
-        html_content = scrape_url(url)
-        
-        if not html_content:
-            continue
-
-        filtered_content = analyze_content(html_content)
-        analyzed_content = analyze_with_codegpt(filtered_content)
-
-        if analyzed_content:
-            # Verificar si el contenido ya ha sido guardado
-            content_md5 = hashlib.md5(analyzed_content.encode()).hexdigest()
-            if content_md5 in content_hash:
-                continue
-            content_hash.add(content_md5)
-
-            content_size = len(analyzed_content.encode('utf-8'))
-            
-            if current_file_size + content_size > MAX_FILE_SIZE:
-                file_counter += 1
-                current_file = os.path.join(output_dir, f"{company_name}_{file_counter}.txt")
-                current_file_size = 0
-
-            save_to_file(analyzed_content, current_file)
-            current_file_size += content_size
-
-        api_endpoints = extract_api_endpoints(html_content)
-        tables = extract_tables(html_content)
-
-        # Guardar los endpoints y tablas solo si no están vacíos
-        if api_endpoints:
-            content = "API Endpoints:\n" + "\n".join(api_endpoints) + "\n\n"
-            save_to_file(content, current_file)
-            current_file_size += len(content.encode('utf-8'))
-
-        if tables:
-            content = "Tables:\n"
-            for i, table in enumerate(tables, 1):
-                content += f"\nTable {i}:\n"
-                for row in table:
-                    content += " | ".join(row) + "\n"
-                content += "\n"
-            save_to_file(content, current_file)
-            current_file_size += len(content.encode('utf-8'))
-
-        # Verificar si es necesario crear un nuevo archivo
-        if current_file_size > MAX_FILE_SIZE:
-            file_counter += 1
-            current_file = os.path.join(output_dir, f"{company_name}_{file_counter}.txt")
-            current_file_size = 0
-
-        links = get_links(html_content, url, base_domain)
-        for link in links:
-            if link not in visited:
-                crawl_and_save(link, output_dir, company_name, depth + 1)
-
-        time.sleep(1)  # Añadir un retraso de 1 segundo entre solicitudes
-
-def main(base_url, output_dir, company_name):
+    fetch_executor = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="fetch")
+    llm_executor = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="llm")
+    parse_executor = None
+    parse_slots = None
+    if parse_workers:
+        # spawn: hacer fork con los hilos de descarga andando no es seguro
+        parse_executor = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=init_parse_worker, initargs=(html_backend.HTML_PARSER, content_filter))
+        parse_slots = asyncio.Semaphore(parse_workers * 2)
+    parsing = {'in_flight': 0}
+    limiter = HostRateLimiter(rate_limit)
+    url_queue = asyncio.Queue()
+    # Cola acotada: si CodeGPT se atrasa, las descargas esperan
+    llm_queue = asyncio.Queue(maxsize=llm_workers * 2)
+    output = open_output(output_dir, company_name)
+    frontier = Frontier(MAX_DEPTH)
+    state, start = open_crawl_state(base_url, output_dir, company_name, frontier, output, resume, seeds, incremental)
+    stats = new_crawl_stats()
+    pending = {}
+    sequence = {'next': 0, 'write': 0}
+    # Páginas extraídas esperando su turno para la búsqueda de casi duplicados
+    extracted = {}
+    dispatched = {'next': 0}
+    # Inicio de cada página (después de la espera del rate limit) para la métrica 'page'
+    started = {}
+    handoff = asyncio.Condition()
+    metrics.gauge('url_queue', url_queue.qsize)
+    metrics.gauge('llm_queue', llm_queue.qsize)
+    metrics.gauge('waiting_dedup', lambda: len(extracted))
+    metrics.gauge('waiting_write', lambda: len(pending))
+    if parse_executor is not None:
+        metrics.gauge('parse_in_flight', lambda: parsing['in_flight'])
+
+    def dispatch(url, depth):
+        url_queue.put_nowait((sequence['next'], url, depth))
+        sequence['next'] += 1
+
+    def enqueue(url, depth):
+        canonical = frontier.mark(url, depth)
+        if canonical is None:
+            return
+        state.add_url(canonical, depth)
+        dispatch(canonical, depth)
+
+    def complete(seq, url, page, skip=None, learned=None, previous=None):
+        # Escribir en orden de descubrimiento todas las páginas ya resueltas;
+        # `learned` lleva la firma, las huellas de bloques, las rutas y las
+        # secciones para el checkpoint; `previous`, las secciones de la corrida anterior
+        pending[seq] = (url, page, skip, learned or {}, previous)
+        while sequence['write'] in pending:
+            url, page, skip, learned, previous = pending.pop(sequence['write'])
+            start_time = started.pop(sequence['write'], None)
+            if page:
+                saved = False
+                if unchanged_page(url, previous, learned.get('sections')):
+                    stats['unchanged'] += 1
+                else:
+                    saved = save_page_output(output, url, *page, replaces=previous and previous['content_md5'])
+                content_md5 = content_digest(page[0]) if page[0] else None
+                state.page_done(url, output, content_md5, saved=saved, **learned)
+            elif skip is not None:
+                state.page_done(url, output, status='skipped', reason=skip.reason, **learned)
+            else:
+                state.page_done(url, output, status='failed')
+            if start_time is not None:
+                metrics.observe('page', time.monotonic() - start_time)
+            sequence['write'] += 1
+
+    async def hand_off(seq, page):
+        async with handoff:
+            # La página que sigue en orden entra siempre; el resto espera si ya hay
+            # muchas acumuladas (así un CodeGPT lento frena las descargas)
+            await handoff.wait_for(lambda: seq == dispatched['next'] or len(extracted) < llm_workers * 2)
+            extracted[seq] = page
+            handoff.notify_all()
+
+    async def dispatcher():
+        # Una sola tarea aprende el boilerplate y decide qué páginas son casi
+        # duplicadas, en orden, como el modo secuencial
+        while True:
+            async with handoff:
+                await handoff.wait_for(lambda: dispatched['next'] in extracted)
+                seq = dispatched['next']
+                page = extracted.pop(seq)
+            if page is not None:
+                url, content_blocks, api_endpoints, tables, timings = page
+                filtered_content, fingerprints = strip_boilerplate(content_blocks)
+                routes = index_endpoints(url, api_endpoints, tables)
+                signature = await loop.run_in_executor(fetch_executor, page_signature, filtered_content)
+                match = find_near_duplicate(url, signature)
+                if match is not None:
+                    complete(seq, url, None, near_duplicate_skip(stats, match),
+                             {'fingerprints': fingerprints, 'endpoints': routes})
+                else:
+                    learned = {'signature': signature, 'fingerprints': fingerprints, 'endpoints': routes}
+                    info = {'source': filtered_content, 'timings': timings}
+                    previous = state.page_sections(url)
+                    await llm_queue.put((seq, url, filtered_content, api_endpoints, tables, info, learned, previous))
+            async with handoff:
+                dispatched['next'] += 1
+                handoff.notify_all()
+
+    async def extract(html_content, url, timings):
+        if parse_executor is None:
+            return await loop.run_in_executor(
+                fetch_executor, timed, timings, 'extract', extract_page, html_content, url, base_domain)
+        data = html_content.encode('utf-8')
+        # Sin lugar en el pool este worker espera con la página en la mano y no descarga otra
+        async with parse_slots:
+            start = time.monotonic()
+            parsing['in_flight'] += 1
+            try:
+                result, seconds = await loop.run_in_executor(parse_executor, parse_page, data, url, base_domain)
+            except Exception:
+                metrics.error('extract')
+                raise
+            finally:
+                parsing['in_flight'] -= 1
+                timings['extract'] = round(time.monotonic() - start, 3)
+        metrics.observe('extract', seconds, len(data))
+        return result
+
+    async def fetch_worker():
+        while True:
+            seq, url, depth = await url_queue.get()
+            page = None
+            timings = {}
+            try:
+                await limiter.wait(url)
+                started[seq] = time.monotonic()
+                html_content, skip = await loop.run_in_executor(fetch_executor, timed, timings, 'fetch', fetch_page, url)
+                record_fetch(stats, html_content, skip)
+                if not html_content:
+                    complete(seq, url, None, skip)
+                    continue
+                content_blocks, api_endpoints, tables, links = await extract(html_content, url, timings)
+                for link in links:
+                    enqueue(link, depth + 1)
+                page = (url, content_blocks, api_endpoints, tables, timings)
+            except Exception as e:
+                logging.error(f"Error processing {url}: {e}")
+                complete(seq, url, None)
+            finally:
+                await hand_off(seq, page)
+                url_queue.task_done()
+
+    async def llm_worker():
+        while True:
+            seq, url, filtered_content, api_endpoints, tables, info, learned, previous = await llm_queue.get()
+            try:
+                analyzed_content, units = await loop.run_in_executor(
+                    llm_executor, timed, info['timings'], 'llm', analyze_sections, filtered_content,
+                    previous and previous['units'])
+                learned['sections'] = page_sections(analyzed_content, units, api_endpoints, tables)
+                complete(seq, url, (analyzed_content, api_endpoints, tables, info), learned=learned, previous=previous)
+            except Exception as e:
+                logging.error(f"Error analyzing {url}: {e}")
+                complete(seq, url, None)
+            finally:
+                llm_queue.task_done()
+
+    for url, depth in start:
+        dispatch(url, depth)
+    workers = [asyncio.create_task(fetch_worker()) for _ in range(fetch_workers)]
+    workers += [asyncio.create_task(llm_worker()) for _ in range(llm_workers)]
+    workers.append(asyncio.create_task(dispatcher()))
+    try:
+        await url_queue.join()
+        async with handoff:
+            await handoff.wait_for(lambda: dispatched['next'] == sequence['next'])
+        await llm_queue.join()
+        finish_output(state, output)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        fetch_executor.shutdown(wait=False, cancel_futures=True)
+        llm_executor.shutdown(wait=False, cancel_futures=True)
+        if parse_executor is not None:
+            parse_executor.shutdown(wait=True, cancel_futures=True)
+        state.close()
+        output.close()
+    log_crawl_stats(stats, frontier)
+
+def main(base_url, output_dir, company_name, async_crawl=False, resume=False,
+         fetch_workers=FETCH_WORKERS, llm_workers=LLM_WORKERS, rate_limit=RATE_LIMIT,
+         http_cache_dir=HTTP_CACHE_DIR, llm_cache_path=LLM_CACHE_PATH, bypass_llm_cache=False,
+         html_parser=None, max_body_bytes=None, pool_size=None, llm_concurrency=None, llm_tpm=None,
+         near_dup_threshold=NEAR_DUP_THRESHOLD, boilerplate_min_pages=BOILERPLATE_MIN_PAGES,
+         boilerplate_min_ratio=BOILERPLATE_MIN_RATIO, output_format=None, output_compression=None,
+         use_sitemap=True, sitemap_urls=None, metrics_port=None, metrics_json=None,
+         metrics_interval=METRICS_INTERVAL, parse_workers=PARSE_WORKERS, filter_rules=None,
+         table_sidecar=TABLE_SIDECAR, build_endpoint_index=True, incremental=False):
+    global http_cache, llm_cache, near_duplicates, boilerplate, content_filter, table_sink, endpoint_index
+    global OUTPUT_FORMAT
+    # Conexiones keep-alive por host: al menos una por worker en modo asíncrono
+    http_session.configure(pool_maxsize=pool_size or max(http_session.HTTP_POOL_MAXSIZE, fetch_workers, llm_workers))
+    if html_parser:
+        html_backend.HTML_PARSER = html_parser
+    if max_body_bytes:
+        page_fetch.MAX_BODY_BYTES = max_body_bytes
+    if output_format:
+        OUTPUT_FORMAT = output_format
+    if output_compression:
+        record_store.OUTPUT_COMPRESSION = output_compression
+    llm_limiter.configure(max_concurrency=llm_concurrency, tpm=llm_tpm)
+    metrics.reset()
+    metrics.gauge('llm_in_flight', lambda: limiter.in_flight)
+    metrics.gauge('llm_concurrency_limit', lambda: int(limiter.limit))
+    metrics_server = metrics.serve(metrics_port) if metrics_port else None
+    stop_snapshots = metrics.write_snapshots(metrics_json, metrics_interval) if metrics_json else None
     try:
         os.makedirs(output_dir, exist_ok=True)
         if not os.access(output_dir, os.W_OK):
             return
 
-        crawl_and_save(base_url, output_dir, company_name)
+        http_cache = HTTPCache(http_cache_dir) if http_cache_dir else None
+        llm_cache = LLMCache(llm_cache_path, bypass=bypass_llm_cache) if llm_cache_path else None
+        near_duplicates = NearDuplicateIndex(near_dup_threshold) if near_dup_threshold else None
+        content_filter = load_rules(filter_rules).for_url(base_url)
+        boilerplate = BoilerplateLearner(boilerplate_min_pages, boilerplate_min_ratio) if boilerplate_min_pages else None
+        if table_sidecar != 'none':
+            table_sink = TableSink(output_dir, f"{company_name}_tables", table_sidecar)
+        endpoint_index = EndpointIndex() if build_endpoint_index else None
+
+        # Al reanudar el sitemap solo aporta los lastmod y el Crawl-delay
+        seeds = seed_from_sitemaps(base_url, sitemap_urls) if use_sitemap else []
+
+        if async_crawl:
+            asyncio.run(crawl_and_save_async(base_url, output_dir, company_name, resume,
+                                             fetch_workers, llm_workers, rate_limit, seeds, parse_workers,
+                                             incremental))
+        else:
+            crawl_and_save(base_url, output_dir, company_name, resume, seeds, incremental)
+
+        if http_cache is not None:
+            http_cache.log_stats()
+        if llm_cache is not None:
+            llm_cache.log_stats()
+        if near_duplicates is not None:
+            near_duplicates.log_stats()
+        if boilerplate is not None:
+            boilerplate.log_stats()
+        if endpoint_index is not None:
+            endpoint_index.save(os.path.join(output_dir, f"{company_name}_endpoints.json"))
+            endpoint_index.log_stats()
+        limiter.log_stats()
+        logging.info("Crawl stage metrics:\n" + metrics.summary())
 
     except Exception as e:
         logging.critical(f"An unexpected error occurred: {e}")
+    finally:
+        # Aunque el crawl falle, las respuestas de CodeGPT ya recibidas quedan guardadas
+        if llm_cache is not None:
+            llm_cache.close()
+            llm_cache = None
+        if table_sink is not None:
+            table_sink.close()
+            table_sink = None
+        if stop_snapshots is not None:
+            stop_snapshots.set()
+            metrics.write_snapshot(metrics_json)
+        if metrics_server is not None:
+            metrics_server.shutdown()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Web scraper and content analyzer")
     parser.add_argument("--url", default="https://www.mercadopago.com.ar/developers/es/docs", help="Base URL to start scraping")
     parser.add_argument("--output_dir", default="output", help="Directory to save the output files")
     parser.add_argument("--company_name", default="MercadoPago", help="Name of the company for file naming")
+    parser.add_argument("--output_format", choices=['text', 'jsonl'], default=None,
+                        help="Rotated text files or one compressed JSONL record per page (default: OUTPUT_FORMAT env or text)")
+    parser.add_argument("--output_compression", choices=list(record_store.EXTENSIONS), default=None,
+                        help="Compression of the JSONL output; zstd needs the zstandard package (default: OUTPUT_COMPRESSION env or gzip)")
+    parser.add_argument("--no_sitemap", action="store_true",
+                        help="Do not read robots.txt and sitemaps; discover pages only through links")
+    parser.add_argument("--sitemap_url", action="append", default=None,
+                        help="Sitemap (or sitemap index) to seed from instead of the ones in robots.txt; repeatable")
+    parser.add_argument("--resume", action="store_true", help="Continue the crawl from the last checkpoint in output_dir")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Recrawl the site keeping the previous output: only changed sections go to CodeGPT "
+                             "and only changed pages are appended as new records")
+    parser.add_argument("--http_cache_dir", default=HTTP_CACHE_DIR, help="Directory of the on-disk HTTP cache")
+    parser.add_argument("--no_http_cache", action="store_true", help="Always download pages without revalidating against the cache")
+    parser.add_argument("--llm_cache_path", default=LLM_CACHE_PATH, help="SQLite file caching CodeGPT responses")
+    parser.add_argument("--no_llm_cache", action="store_true", help="Do not read or store cached CodeGPT responses")
+    parser.add_argument("--bypass_llm_cache", action="store_true", help="Ignore cached CodeGPT responses and overwrite them with fresh ones")
+    parser.add_argument("--html_parser", choices=list(html_backend.BACKEND_MODULES), default=None,
+                        help="HTML parser backend for extraction (default: HTML_PARSER env or html.parser)")
+    parser.add_argument("--max_body_bytes", type=int, default=None,
+                        help="Abort downloads larger than this many bytes (default: MAX_BODY_BYTES env or 5 MB)")
+    parser.add_argument("--pool_size", type=int, default=None,
+                        help="Keep-alive connections per host (default: enough for the async workers)")
+    parser.add_argument("--near_dup_threshold", type=float, default=NEAR_DUP_THRESHOLD,
+                        help="Estimated similarity above which a page is skipped as a near-duplicate before CodeGPT")
+    parser.add_argument("--no_near_dup", action="store_true", help="Send every page to CodeGPT, even near-duplicates")
+    parser.add_argument("--boilerplate_min_pages", type=int, default=BOILERPLATE_MIN_PAGES,
+                        help="Pages a text block must repeat on before it is removed from prompts")
+    parser.add_argument("--boilerplate_min_ratio", type=float, default=BOILERPLATE_MIN_RATIO,
+                        help="Minimum share of the pages seen so far a block must repeat on to be removed")
+    parser.add_argument("--no_boilerplate", action="store_true", help="Send page text to CodeGPT without removing repeated blocks")
+    parser.add_argument("--filter_rules", default=None,
+                        help=f"JSON file with the per-site phrases that drop page elements (default: FILTER_RULES env or {FILTER_RULES})")
+    parser.add_argument("--table_sidecar", choices=list(SIDECAR_FORMATS), default=TABLE_SIDECAR,
+                        help="File with every table cell of the crawl keyed by URL and table number; parquet also "
+                             "needs pyarrow (default: TABLE_SIDECAR env or csv)")
+    parser.add_argument("--no_endpoint_index", action="store_true",
+                        help="Do not build the crawl-wide endpoint index (<company>_endpoints.json)")
+    parser.add_argument("--llm_concurrency", type=int, default=None,
+                        help="Upper bound for the adaptive number of in-flight CodeGPT calls (default: LLM_MAX_CONCURRENCY env or 16)")
+    parser.add_argument("--llm_tpm", type=int, default=None,
+                        help="Estimated tokens per minute sent to CodeGPT, 0 for no limit (default: LLM_TPM env or 0)")
+    parser.add_argument("--metrics_port", type=int, default=None,
+                        help="Serve Prometheus metrics for the run on this port (http://127.0.0.1:PORT/metrics)")
+    parser.add_argument("--metrics_json", default=None, help="Write a JSON snapshot of the run metrics to this file periodically")
+    parser.add_argument("--metrics_interval", type=float, default=METRICS_INTERVAL, help="Seconds between JSON metric snapshots")
+    parser.add_argument("--async_crawl", action="store_true", help="Fetch pages and call CodeGPT concurrently")
+    parser.add_argument("--fetch_workers", type=int, default=FETCH_WORKERS, help="Concurrent page downloads in async mode")
+    parser.add_argument("--llm_workers", type=int, default=LLM_WORKERS, help="Concurrent CodeGPT calls in async mode")
+    parser.add_argument("--rate_limit", type=float, default=RATE_LIMIT, help="Maximum requests per second to each host in async mode")
+    parser.add_argument("--parse_workers", type=int, default=PARSE_WORKERS,
+                        help="Processes that parse HTML in async mode, 0 to parse in the download threads (default: PARSE_WORKERS env or 0)")
     
     args = parser.parse_args()
-    main(args.url, args.output_dir, args.company_name)
+    main(args.url, args.output_dir, args.company_name, args.async_crawl, args.resume,
+         args.fetch_workers, args.llm_workers, args.rate_limit,
+         None if args.no_http_cache else args.http_cache_dir,
+         None if args.no_llm_cache else args.llm_cache_path, args.bypass_llm_cache,
+         args.html_parser, args.max_body_bytes, args.pool_size, args.llm_concurrency, args.llm_tpm,
+         None if args.no_near_dup else args.near_dup_threshold,
+         None if args.no_boilerplate else args.boilerplate_min_pages, args.boilerplate_min_ratio,
+         args.output_format, args.output_compression, not args.no_sitemap, args.sitemap_url,
+         args.metrics_port, args.metrics_json, args.metrics_interval, args.parse_workers, args.filter_rules,
+         args.table_sidecar, not args.no_endpoint_index, args.incremental)
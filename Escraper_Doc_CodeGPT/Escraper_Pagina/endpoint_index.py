@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import logging
+import argparse
+from tables import table_rows
+
+# Métodos HTTP que se reconocen delante de una ruta o en otra celda de la misma fila de una tabla
+HTTP_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS')
+
+# Ruta con método y host opcionales. Sin host, la ruta tiene que empezar una
+# palabra: así "and/or" o "1/2" en una celda no cuentan como endpoints.
+ENDPOINT_RE = re.compile(
+    r'(?:\b(?P<method>' + '|'.join(HTTP_METHODS) + r')\s+)?'
+    r'(?:(?P<host>https?://[\w.\-]+(?::\d+)?)|(?<![\w/.:\-]))'
+    r'(?P<path>/[\w\-.~{}:<>%$/]*)')
+
+# Segmentos que son parámetros: {id}, :id, <id>, <int:id>, ${id}
+PARAM_RE = re.compile(r'^(?:\{(\w+)\}|:(\w+)|<(?:\w+:)?(\w+)>|\$\{?(\w+)\}?)$')
+# Segmentos con un valor concreto en vez del nombre del parámetro: números, hashes y UUID
+ID_RE = re.compile(r'^(?:\d+|[0-9a-fA-F]{16,}|[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12})$')
+
+def template_segments(path):
+    """Segmentos de la plantilla de una ruta, con los parámetros como {nombre} (o {id})."""
+    segments = []
+    for segment in path.rstrip('.,:;').strip('/').split('/'):
+        if not segment:
+            continue
+        match = PARAM_RE.match(segment)
+        if match:
+            segments.append('{%s}' % next(group for group in match.groups() if group))
+        elif ID_RE.match(segment):
+            segments.append('{id}')
+        else:
+            segments.append(segment)
+    return segments
+
+def parse_routes(text, method=''):
+    """(método, host, plantilla) de cada ruta que aparece en el texto."""
+    routes = []
+    for match in ENDPOINT_RE.finditer(text):
+        segments = template_segments(match.group('path'))
+        # Al menos un segmento con letras: "/" o "/2024" solos no son endpoints
+        if not any(re.search(r'[A-Za-z]', segment) for segment in segments if segment[0] != '{'):
+            continue
+        routes.append((match.group('method') or method, match.group('host') or '', '/' + '/'.join(segments)))
+    return routes
+
+class RouteNode:
+    __slots__ = ('children', 'methods', 'hosts', 'sources')
+
+    def __init__(self):
+        self.children = {}
+        # Solo los nodos donde termina una ruta tienen métodos, hosts y páginas
+        self.methods = None
+        self.hosts = None
+        self.sources = None
+
+class EndpointIndex:
+    """Índice de los endpoints de todo el crawl: un trie de plantillas de ruta por segmento.
+
+    Cada ruta guarda los métodos HTTP, los hosts y las páginas donde
+    apareció. Se actualiza página por página con `add` y se escribe una
+    sola vez al final con `save`; `lookup` devuelve las rutas bajo un
+    prefijo recorriendo solo esa rama.
+    """
+
+    def __init__(self):
+        self.root = RouteNode()
+        self.routes = 0
+        self.pages = 0
+
+    @staticmethod
+    def parse(endpoints, tables=()):
+        """Rutas de una página a partir de sus endpoints y tablas, sin repetir.
+
+        En las tablas, una celda que es solo un método HTTP se lo asigna a las
+        rutas de su fila. Una ruta que aparece con método o host no se guarda
+        además sin ellos.
+        """
+        routes = set()
+        for text in endpoints:
+            routes.update(parse_routes(text))
+        for table in tables:
+            for row in table_rows(table):
+                methods = [cell.strip().upper() for cell in row if cell.strip().upper() in HTTP_METHODS]
+                for cell in row:
+                    for method in methods or ['']:
+                        routes.update(parse_routes(cell, method))
+        detailed = {route for method, host, route in routes if method or host}
+        return sorted([method, host, route] for method, host, route in routes
+                      if method or host or route not in detailed)
+
+    def node(self, segments, create=False):
+        node = self.root
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[segment] = RouteNode()
+            node = child
+        return node
+
+    def add(self, url, routes):
+        """Sumar las rutas (de `parse`) encontradas en la página `url`."""
+        self.pages += 1
+        for method, host, route in routes:
+            node = self.node(template_segments(route), create=True)
+            if node.sources is None:
+                node.methods, node.hosts, node.sources = set(), set(), {}
+                self.routes += 1
+            if method:
+                node.methods.add(method)
+            if host:
+                node.hosts.add(host)
+            node.sources[url] = None
+
+    def entries(self, node, path):
+        # Recorrido en orden de segmento para que la salida sea estable
+        stack = [(node, path)]
+        while stack:
+            node, path = stack.pop()
+            if node.sources is not None:
+                yield {'route': path or '/', 'methods': sorted(node.methods), 'hosts': sorted(node.hosts),
+                       'sources': list(node.sources)}
+            for segment in sorted(node.children, reverse=True):
+                stack.append((node.children[segment], f"{path}/{segment}"))
+
+    def lookup(self, prefix='/'):
+        """Rutas cuya plantilla empieza con `prefix`; el último segmento puede estar incompleto."""
+        segments = template_segments(prefix)
+        partial = segments and not prefix.endswith('/')
+        parent = self.node(segments[:-1] if partial else segments)
+        if parent is None:
+            return []
+        base = ''.join(f"/{segment}" for segment in (segments[:-1] if partial else segments))
+        if not partial:
+            return list(self.entries(parent, base))
+        found = []
+        for segment in sorted(parent.children):
+            if segment.startswith(segments[-1]):
+                found.extend(self.entries(parent.children[segment], f"{base}/{segment}"))
+        return found
+
+    def to_dict(self):
+        return {'pages': self.pages, 'routes': list(self.entries(self.root, ''))}
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+        logging.info(f"Endpoint index written to {path}")
+
+    @classmethod
+    def load(cls, path):
+        """Índice a partir del JSON de `save`."""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls()
+        for entry in data['routes']:
+            node = index.node(template_segments(entry['route']), create=True)
+            node.methods, node.hosts = set(entry['methods']), set(entry['hosts'])
+            node.sources = dict.fromkeys(entry['sources'])
+            index.routes += 1
+        index.pages = data.get('pages', 0)
+        return index
+
+    def log_stats(self):
+        logging.info(f"Endpoint index: {self.routes} routes from {self.pages} pages")
+
+def main():
+    parser = argparse.ArgumentParser(description="Browse the endpoint index written by the documentation crawl")
+    parser.add_argument("index", help="JSON file written by the crawl (<company>_endpoints.json)")
+    parser.add_argument("prefix", nargs="?", default="/", help="Route prefix to list, e.g. /v1/payments")
+    parser.add_argument("--sources", action="store_true", help="Also list the pages each route was found on")
+    args = parser.parse_args()
+
+    for entry in EndpointIndex.load(args.index).lookup(args.prefix):
+        methods = ",".join(entry['methods']) or "-"
+        print(f"{methods:<12} {entry['route']}  ({len(entry['sources'])} pages)")
+        if args.sources:
+            for url in entry['sources']:
+                print(f"{'':<12}   {url}")
+
+if __name__ == "__main__":
+    main()
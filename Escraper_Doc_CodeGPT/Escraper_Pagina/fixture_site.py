@@ -0,0 +1,119 @@
+"""Sitio de documentación generado para correr el crawler sin salir de la máquina.
+
+Las páginas se generan de forma determinista a partir de una semilla: cada
+página enlaza a sus hijas en un árbol (`fanout` por página) y a algunas
+páginas al azar, repite el menú y el pie de página como un sitio real, y
+trae párrafos, bloques de código con endpoints y tablas. Las URLs tienen la
+forma `/developers/es/docs/api/page-<n>`, así que pasan los filtros de
+`documentacion.is_crawlable`.
+
+    site = FixtureSite(pages=200, fanout=4, page_bytes=8000, tables=2)
+    server = site.serve()
+    ... crawl de site.base_url ...
+    server.shutdown()
+"""
+import random
+import logging
+import threading
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DOCS_PATH = '/developers/es/docs/api'
+
+WORDS = ('payment', 'order', 'customer', 'token', 'refund', 'webhook', 'request', 'response',
+         'status', 'amount', 'currency', 'account', 'integration', 'checkout', 'card', 'merchant',
+         'field', 'header', 'error', 'limit', 'version', 'notification', 'subscription', 'invoice')
+RESOURCES = ('payments', 'orders', 'customers', 'refunds', 'subscriptions', 'invoices', 'cards')
+METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+class FixtureSite:
+    """Genera y sirve el sitio; `page(n)` devuelve el HTML de la página n."""
+
+    def __init__(self, pages=100, fanout=4, page_bytes=6000, tables=1, cross_links=2, seed=0):
+        self.pages = pages
+        self.fanout = fanout
+        self.page_bytes = page_bytes
+        self.tables = tables
+        self.cross_links = cross_links
+        self.seed = seed
+        self.base_url = None
+
+    def path(self, n):
+        return f"{DOCS_PATH}/page-{n}"
+
+    def links(self, n):
+        """Hijas en el árbol y enlaces cruzados (deterministas) de la página n."""
+        rng = random.Random(f"{self.seed}-links-{n}")
+        children = range(n * self.fanout + 1, min(self.pages, n * self.fanout + self.fanout + 1))
+        cross = [rng.randrange(self.pages) for _ in range(self.cross_links)] if self.pages else []
+        return list(children) + cross
+
+    def sentence(self, rng, words=12):
+        return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+    def table(self, rng, n, i):
+        rows = ''.join(f"<tr><td>{rng.choice(WORDS)}_{j}</td><td>{rng.choice(('string', 'integer', 'boolean'))}</td>"
+                       f"<td>{escape(self.sentence(rng, 6))}</td></tr>" for j in range(rng.randint(3, 8)))
+        return (f"<h3>Table {n}.{i}</h3><table><thead><tr><th>Field</th><th>Type</th><th>Description</th></tr></thead>"
+                f"<tbody>{rows}</tbody></table>")
+
+    def page(self, n):
+        rng = random.Random(f"{self.seed}-page-{n}")
+        nav = ''.join(f'<li><a href="{self.path(i)}">Section {i}</a></li>' for i in range(min(5, self.pages)))
+        links = ''.join(f'<li><a href="{self.path(i)}">Page {i}</a></li>' for i in self.links(n))
+        parts = [f"<h1>API page {n}</h1>"]
+        for i in range(self.tables):
+            parts.append(self.table(rng, n, i))
+        size = sum(len(part) for part in parts)
+        section = 0
+        while size < self.page_bytes:
+            section += 1
+            resource = rng.choice(RESOURCES)
+            block = (f"<h2>{resource.capitalize()} {section}</h2>"
+                     f"<p>{escape(' '.join(self.sentence(rng) for _ in range(4)))}</p>"
+                     f"<pre><code>curl -X {rng.choice(METHODS)} https://api.example.com/v1/{resource}/{n}-{section}"
+                     f"</code></pre>")
+            parts.append(block)
+            size += len(block)
+        return (f"<!DOCTYPE html><html><head><title>API page {n}</title></head><body>"
+                f"<nav><ul>{nav}</ul></nav><main>{''.join(parts)}<ul>{links}</ul></main>"
+                f"<footer><p>Need help? Contact the developer support team.</p></footer></body></html>")
+
+    def sitemap(self):
+        urls = ''.join(f"<url><loc>{self.base_url}{self.path(n)}</loc></url>" for n in range(self.pages))
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+    def serve(self, port=0, host='127.0.0.1', sitemap=False):
+        """Servir el sitio en un hilo aparte; devuelve el servidor (cerrarlo con shutdown())."""
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = self.path.split('?')[0].rstrip('/')
+                status, content_type, body = 404, 'text/plain', 'Not found'
+                if path == '/robots.txt':
+                    status, body = 200, f"User-agent: *\n{f'Sitemap: {site.base_url}/sitemap.xml' if sitemap else ''}\n"
+                elif path == '/sitemap.xml' and sitemap:
+                    status, content_type, body = 200, 'application/xml', site.sitemap()
+                elif path.startswith(f"{DOCS_PATH}/page-"):
+                    n = path.rsplit('-', 1)[1]
+                    if n.isdigit() and int(n) < site.pages:
+                        status, content_type, body = 200, 'text/html; charset=utf-8', site.page(int(n))
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        self.base_url = f"http://{host}:{server.server_port}"
+        threading.Thread(target=server.serve_forever, daemon=True, name="fixture-site").start()
+        logging.info(f"Serving {self.pages} fixture pages on {self.base_url}{DOCS_PATH}/page-0")
+        return server
@@ -0,0 +1,66 @@
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import re
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def canonicalize_url(url, lowercase_path=False):
+    """Forma canónica de una URL para detectar páginas repetidas.
+
+    Quita el fragmento, ordena la query, pasa esquema y host a minúsculas,
+    elimina el puerto por defecto y la barra final (salvo en la raíz).
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r'/{2,}', '/', parts.path) or '/'
+    # Normalizar los escapes %xx a mayúsculas
+    path = re.sub(r'%[0-9a-fA-F]{2}', lambda m: m.group(0).upper(), path)
+    if lowercase_path:
+        path = path.lower()
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+class Frontier:
+    """Cola FIFO de URLs por visitar con un índice de URLs ya vistas.
+
+    Cada entrada guarda su profundidad, así que una URL se encola una sola vez
+    en todo el crawl aunque aparezca enlazada desde muchas páginas.
+    """
+
+    def __init__(self, max_depth, lowercase_path=False):
+        self.max_depth = max_depth
+        self.lowercase_path = lowercase_path
+        self.queue = deque()
+        self.seen = set()
+        self.duplicates = 0
+
+    def mark(self, url, depth):
+        """Registrar la URL en el índice. Devuelve su forma canónica o None si no corresponde visitarla."""
+        if depth > self.max_depth:
+            return None
+        canonical = canonicalize_url(url, self.lowercase_path)
+        if canonical in self.seen:
+            self.duplicates += 1
+            return None
+        self.seen.add(canonical)
+        return canonical
+
+    def add(self, url, depth):
+        """Encolar la URL si no fue vista. Devuelve su forma canónica o None."""
+        canonical = self.mark(url, depth)
+        if canonical is not None:
+            self.queue.append((canonical, depth))
+        return canonical
+
+    def pop(self):
+        return self.queue.popleft()
+
+    def __len__(self):
+        return len(self.queue)
@@ -0,0 +1,205 @@
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+import time
+
+# Directorio y tamaño máximo (bytes) de la caché HTTP en disco
+HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', '.http_cache')
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash TEXT NOT NULL,
+    encoding TEXT,
+    fetched_at REAL
+);
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+class HTTPCache:
+    """Caché HTTP en disco con revalidación por ETag / Last-Modified.
+
+    Los cuerpos se guardan por su hash SHA-256 (varias URLs con el mismo
+    contenido comparten un único archivo) y se expulsan por LRU cuando el
+    total supera `max_bytes`. Un 304 del servidor se sirve desde disco, y
+    `get_text` con `modified_at` (el lastmod del sitemap) ni siquiera hace la
+    solicitud si la copia se bajó o revalidó después de ese momento.
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        # Se comparte entre los hilos de descarga
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        try:
+            # Cachés creadas antes de guardar cuándo se bajó cada entrada
+            self.conn.execute("ALTER TABLE entries ADD COLUMN fetched_at REAL")
+        except sqlite3.OperationalError:
+            pass
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        self.stats = {'hits': 0, 'misses': 0, 'unchanged': 0, 'bytes_saved': 0, 'bytes_downloaded': 0}
+
+    def object_path(self, body_hash):
+        return os.path.join(self.cache_dir, 'objects', body_hash[:2], body_hash)
+
+    def lookup(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, body_hash, encoding, fetched_at FROM entries WHERE url = ?",
+                (url,)).fetchone()
+        if row and os.path.exists(self.object_path(row[2])):
+            return {'etag': row[0], 'last_modified': row[1], 'body_hash': row[2], 'encoding': row[3],
+                    'fetched_at': row[4]}
+        return None
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, entry):
+        """Cuerpo guardado de la entrada, o None si el archivo ya no está.
+
+        Entre `lookup` y la lectura otro hilo puede haberlo expulsado por LRU
+        (o alguien borró el directorio): la entrada se descarta y cuenta como
+        fallo de caché.
+        """
+        try:
+            with open(self.object_path(entry['body_hash']), 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            with self.lock:
+                self.drop(entry['body_hash'])
+                self.conn.commit()
+            return None
+        with self.lock:
+            self.conn.execute("UPDATE objects SET last_access = ? WHERE hash = ?", (time.time(), entry['body_hash']))
+            self.conn.commit()
+        return body
+
+    def store(self, url, headers, body, encoding):
+        """Guardar una respuesta 200 si trae algún validador para revalidarla después."""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not (etag or last_modified) or 'no-store' in headers.get('Cache-Control', ''):
+            return
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self.object_path(body_hash)
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            known = self.conn.execute("SELECT 1 FROM objects WHERE hash = ?", (body_hash,)).fetchone()
+            if not known:
+                self.total_bytes += len(body)
+            self.conn.execute("INSERT OR REPLACE INTO objects (hash, size, last_access) VALUES (?, ?, ?)",
+                              (body_hash, len(body), time.time()))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (url, etag, last_modified, body_hash, encoding, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body_hash, encoding, time.time()))
+            self.evict()
+            self.conn.commit()
+
+    def drop(self, body_hash):
+        # Se llama con el lock tomado: olvidar el objeto y las entradas que lo usan
+        row = self.conn.execute("SELECT size FROM objects WHERE hash = ?", (body_hash,)).fetchone()
+        self.conn.execute("DELETE FROM objects WHERE hash = ?", (body_hash,))
+        self.conn.execute("DELETE FROM entries WHERE body_hash = ?", (body_hash,))
+        if row:
+            self.total_bytes -= row[0]
+
+    def evict(self):
+        # Se llama con el lock tomado
+        while self.total_bytes > self.max_bytes:
+            row = self.conn.execute("SELECT hash FROM objects ORDER BY last_access LIMIT 1").fetchone()
+            if not row:
+                break
+            self.drop(row[0])
+            try:
+                os.remove(self.object_path(row[0]))
+            except OSError:
+                pass
+
+    def record(self, **amounts):
+        with self.lock:
+            for name, amount in amounts.items():
+                self.stats[name] += amount
+                self.conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+            self.conn.commit()
+
+    def touch(self, url):
+        """Anotar que la copia de `url` se acaba de revalidar."""
+        with self.lock:
+            self.conn.execute("UPDATE entries SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+
+    def get_text(self, url, headers, get, read=None, modified_at=None):
+        """Descargar `url` con `get(url, headers=...)` revalidando contra la copia en disco.
+
+        `read(response)` devuelve el cuerpo en bytes (por defecto `response.content`).
+        Si la página no cambió desde `modified_at` (timestamp) según la copia,
+        se devuelve la copia sin hacer la solicitud.
+        """
+        entry = self.lookup(url)
+        if entry and modified_at and entry['fetched_at'] and entry['fetched_at'] >= modified_at:
+            body = self.read(entry)
+            if body is not None:
+                self.record(unchanged=1, bytes_saved=len(body))
+                return body.decode(entry['encoding'] or 'utf-8', errors='replace')
+            entry = None
+        response = get(url, headers={**headers, **self.conditional_headers(entry)})
+        if response.status_code == 304 and entry:
+            body = self.read(entry)
+            response.close()
+            if body is not None:
+                self.touch(url)
+                self.record(hits=1, bytes_saved=len(body))
+                return body.decode(entry['encoding'] or 'utf-8', errors='replace')
+            # La copia desapareció después de revalidarla: se pide entera, sin validadores
+            response = get(url, headers=headers)
+        try:
+            response.raise_for_status()
+            body = read(response) if read else response.content
+            self.record(misses=1, bytes_downloaded=len(body))
+            self.store(url, response.headers, body, response.encoding)
+            return body.decode(response.encoding or 'utf-8', errors='replace')
+        finally:
+            response.close()
+
+    def totals(self):
+        """Contadores acumulados de todas las corridas."""
+        with self.lock:
+            return dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+
+    def log_stats(self):
+        logging.info(f"HTTP cache: {self.stats['hits']} hits, {self.stats['misses']} misses, "
+                     f"{self.stats['unchanged']} not requested (unchanged since sitemap lastmod), "
+                     f"{self.stats['bytes_saved']} bytes served from disk, "
+                     f"{self.stats['bytes_downloaded']} bytes downloaded")
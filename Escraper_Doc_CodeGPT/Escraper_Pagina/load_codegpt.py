@@ -0,0 +1,209 @@
+"""Prueba de carga de las llamadas a CodeGPT de todas las apps contra codegpt_sim.
+
+Cada app corre en su propio proceso, desde su carpeta (así importa sus
+propias copias de llm_limiter, codegpt_stream, etc.), y llama a sus
+funciones reales con `concurrency` llamadas en vuelo:
+
+- crew: Lista_Agentes.obtener_agentes, Agente_Prompt.obtener_prompt_agente
+  y analizar_prompt, Agente_Estructura.evaluar_estructura y la respuesta
+  en streaming de streamlit_app (por codegpt_stream, con el mismo payload).
+- clonarui: original_script.analyze_with_codegpt y el streaming a
+  /v1/agent/{id}/completion de streamlit_app (por codegpt_stream).
+- scraper: escrapeador.analyze_chunk_with_codegpt y stream_chunk_with_codegpt.
+- docs: documentacion.analyze_chunk_with_codegpt.
+
+Las páginas de Streamlit no se pueden importar sin su runtime, por eso
+se reproduce su llamada con el mismo cliente compartido. Se informa
+throughput, latencia p50/p95 y errores por operación, y lo que vio el
+simulador (429, 5xx, cuelgues). Los flags del plan de fallas son los de
+codegpt_sim:
+
+    python load_codegpt.py
+    python load_codegpt.py --apps crew scraper --concurrency 1 8 32 --requests 200 --latency lognormal:0.5,0.4 --throttle_rate 0.1
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from codegpt_sim import add_fault_arguments, simulator_from_args
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+APP_DIRS = {
+    'crew': os.path.join(REPO_ROOT, 'Crew_assessment'),
+    'clonarui': os.path.join(REPO_ROOT, 'ClonarUI_CodeGPT', 'ClonarUI'),
+    'scraper': os.path.join(REPO_ROOT, 'Escraper_Solo1Pag_CodeGPT', 'Agente_Scrap'),
+    'docs': os.path.join(REPO_ROOT, 'Escraper_Doc_CodeGPT', 'Escraper_Pagina'),
+}
+AGENT_ID = 'agent-1'
+
+def sample_content(chars):
+    section = ("## Payments\n\nPOST https://api.example.com/v1/payments creates a payment. "
+               "Send the amount, the currency and the card token.\n\n")
+    return ("# API reference\n\n" + section * (chars // len(section) + 1))[:chars]
+
+def quantile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def crew_operations(content):
+    import requests
+    import Lista_Agentes
+    import Agente_Prompt
+    import Agente_Estructura
+    from codegpt_stream import stream_completion
+
+    def answer_stream():
+        # Lo mismo que streamlit_app.obtener_respuesta
+        payload = {"agentId": AGENT_ID, "stream": True, "format": "json",
+                   "messages": [{"content": content, "role": "user"}]}
+        try:
+            return "".join(stream_completion(Agente_Estructura.API_URL, Agente_Estructura.headers, payload,
+                                             max_attempts=3))
+        except requests.RequestException:
+            return None
+
+    def completion(result):
+        return result if result and not result.startswith("No se encontró") else None
+
+    return {
+        'list_agents': lambda: Lista_Agentes.obtener_agentes(os.getenv("CODEGPT_API_KEY"), os.getenv("CODEGPT_ORG_ID")),
+        'agent_prompt': lambda: Agente_Prompt.obtener_prompt_agente(AGENT_ID),
+        'analyze_prompt': lambda: completion(Agente_Prompt.analizar_prompt(content)),
+        'evaluate': lambda: completion(Agente_Estructura.evaluar_estructura(content, content, "What does it do?")),
+        'answer_stream': answer_stream,
+    }
+
+def clonarui_operations(content):
+    import asyncio
+    import aiohttp
+    import original_script
+    from codegpt_stream import stream_completion_async
+
+    async def clone_stream(session):
+        # Lo mismo que streamlit_app.analyze_with_codegpt
+        url = f"{original_script.CODEGPT_API_BASE}/v1/agent/{original_script.AGENT_ID}/completion"
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {original_script.CODEGPT_API_KEY}"}
+        data = {"prompt": "Generate a list of modifications", "content": content, "max_tokens": 500, "temperature": 0.7}
+        try:
+            return "".join([text async for text in stream_completion_async(session, url, headers, data, label="ClonarUI")])
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+
+    return {
+        'analyze': lambda session: original_script.analyze_with_codegpt(
+            session, content, "Return the main content.", bypass_cache=True),
+        'clone_stream': clone_stream,
+    }
+
+def scraper_operations(content):
+    import escrapeador
+
+    return {
+        'analyze': lambda: escrapeador.analyze_chunk_with_codegpt(content, bypass_cache=True),
+        'stream': lambda: "".join(escrapeador.stream_chunk_with_codegpt(content, bypass_cache=True)),
+    }
+
+def docs_operations(content):
+    import documentacion
+
+    return {'analyze': lambda: documentacion.analyze_chunk_with_codegpt(content, bypass_cache=True)}
+
+OPERATIONS = {'crew': crew_operations, 'clonarui': clonarui_operations,
+              'scraper': scraper_operations, 'docs': docs_operations}
+ASYNC_APPS = {'clonarui'}
+
+def timed_call(name, operation):
+    start = time.monotonic()
+    try:
+        ok = bool(operation())
+    except Exception:
+        ok = False
+    return name, time.monotonic() - start, ok
+
+async def timed_call_async(name, operation, session, semaphore):
+    async with semaphore:
+        start = time.monotonic()
+        try:
+            ok = bool(await operation(session))
+        except Exception:
+            ok = False
+        return name, time.monotonic() - start, ok
+
+def run_calls(app, operations, requests, concurrency):
+    calls = [list(operations.items())[i % len(operations)] for i in range(requests)]
+    if app in ASYNC_APPS:
+        import asyncio
+        import aiohttp
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+            async with aiohttp.ClientSession() as session:
+                return await asyncio.gather(*(timed_call_async(name, operation, session, semaphore)
+                                              for name, operation in calls))
+        return asyncio.run(run())
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda call: timed_call(*call), calls))
+
+def run_worker(args):
+    sys.path.insert(0, APP_DIRS[args.worker])
+    operations = OPERATIONS[args.worker](sample_content(args.content_chars))
+    start = time.monotonic()
+    results = run_calls(args.worker, operations, args.requests, args.concurrency[0])
+    elapsed = time.monotonic() - start
+    summary = {}
+    for name in operations:
+        latencies = [seconds for op, seconds, _ in results if op == name]
+        summary[name] = {'calls': len(latencies), 'errors': sum(1 for op, _, ok in results if op == name and not ok),
+                         'p50': quantile(latencies, 0.5), 'p95': quantile(latencies, 0.95)}
+    print(json.dumps({'app': args.worker, 'seconds': elapsed, 'operations': summary}))
+
+def run_app(app, concurrency, args, base_url):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', app, '--concurrency', str(concurrency),
+               '--requests', str(args.requests), '--content_chars', str(args.content_chars)]
+    env = dict(os.environ, CODEGPT_API_BASE=base_url, CODEGPT_API_KEY='load-test', AGENT_ID=AGENT_ID,
+               CODEGPT_ORG_ID='load-test', USE_LLM_CACHE='0', USE_HTTP_CACHE='0')
+    env.pop('CODEGPT_API_URL', None)
+    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=None if args.log else subprocess.DEVNULL,
+                            text=True, check=True, env=env, cwd=APP_DIRS[app]).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the CodeGPT calls of every app against the local simulator")
+    parser.add_argument("--apps", nargs="+", choices=list(APP_DIRS), default=list(APP_DIRS), help="Apps to drive")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16], help="Calls in flight to try")
+    parser.add_argument("--requests", type=int, default=40, help="Calls per app and concurrency level")
+    parser.add_argument("--content_chars", type=int, default=2000, help="Size of the text sent in each call")
+    parser.add_argument("--log", action="store_true", help="Show the apps' log")
+    parser.add_argument("--worker", choices=list(APP_DIRS), help=argparse.SUPPRESS)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    print(f"{'app':<9} {'conc':>5} {'operation':<15} {'calls':>6} {'errors':>7} {'calls/s':>8} "
+          f"{'p50 s':>7} {'p95 s':>7}   simulator")
+    for app in args.apps:
+        for concurrency in args.concurrency:
+            # Un simulador nuevo por corrida: las fases del plan y las cuentas arrancan de cero
+            sim = simulator_from_args(args)
+            server = sim.serve()
+            try:
+                result = run_app(app, concurrency, args, sim.base_url)
+            finally:
+                server.shutdown()
+            seen = (f"{sim.stats['requests']} requests, {sim.stats['throttled']} 429, "
+                    f"{sim.stats['errors']} 5xx, {sim.stats['timeouts']} hung")
+            for i, (name, stats) in enumerate(result['operations'].items()):
+                print(f"{app:<9} {concurrency:>5} {name:<15} {stats['calls']:>6} {stats['errors']:>7} "
+                      f"{stats['calls'] / result['seconds']:>8.2f} {stats['p50']:>7.3f} {stats['p95']:>7.3f}"
+                      f"   {seen if i == 0 else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import re
+import zlib
+import random
+import logging
+from array import array
+
+# Similitud de Jaccard (estimada) a partir de la cual una página se considera casi duplicada
+NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', 0.9))
+
+# Permutaciones de MinHash y palabras por shingle
+NEAR_DUP_PERMUTATIONS = int(os.getenv('NEAR_DUP_PERMUTATIONS', 128))
+NEAR_DUP_SHINGLE_WORDS = int(os.getenv('NEAR_DUP_SHINGLE_WORDS', 5))
+
+# Páginas con menos shingles no se comparan: en textos muy cortos cualquier parecido es casualidad
+MIN_SHINGLES = 8
+
+MERSENNE_PRIME = (1 << 61) - 1
+# Semilla fija: las firmas tienen que coincidir entre corridas para poder reanudar
+SEED = 1
+
+WORD_RE = re.compile(r'\w+')
+
+def shingles(text, size=NEAR_DUP_SHINGLE_WORDS):
+    """Hashes de 32 bits de las secuencias de `size` palabras del texto (sin mayúsculas ni puntuación)."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+# Las bandas se calculan para un umbral algo más bajo que el pedido: así una
+# página por encima del umbral casi nunca se pierde, y los candidatos de más se
+# descartan comparando las firmas completas
+LSH_MARGIN = 0.1
+
+def lsh_params(threshold, num_perm):
+    """Bandas y filas por banda: las filas más largas cuyo umbral (1/b)^(1/r) no pasa `threshold - LSH_MARGIN`."""
+    target = max(threshold - LSH_MARGIN, 0.05)
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) > target:
+            break
+        best = (bands, rows)
+    return best
+
+class NearDuplicateIndex:
+    """Índice MinHash + LSH de las páginas ya mandadas a CodeGPT.
+
+    `check` devuelve la página ya vista que se parece a la nueva o la agrega
+    al índice si no hay ninguna. Las firmas se pueden guardar y volver a
+    cargar con `add` para reanudar un crawl.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, num_perm=NEAR_DUP_PERMUTATIONS,
+                 shingle_words=NEAR_DUP_SHINGLE_WORDS):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        rng = random.Random(SEED)
+        self.permutations = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+                             for _ in range(num_perm)]
+        self.buckets = [{} for _ in range(self.bands)]
+        self.signatures = {}
+        self.stats = {'checked': 0, 'duplicates': 0, 'too_short': 0}
+
+    def signature(self, text):
+        """Firma MinHash del texto, o None si es demasiado corto para compararlo."""
+        hashes = shingles(text, self.shingle_words)
+        if len(hashes) < MIN_SHINGLES:
+            return None
+        hashes = list(hashes)
+        return array('Q', [min([(a * h + b) % MERSENNE_PRIME for h in hashes]) for a, b in self.permutations])
+
+    def band_keys(self, signature):
+        rows = self.rows
+        return [signature[i * rows:(i + 1) * rows].tobytes() for i in range(self.bands)]
+
+    def similarity(self, a, b):
+        return sum(x == y for x, y in zip(a, b)) / self.num_perm
+
+    def query(self, signature):
+        """Página indexada más parecida con similitud estimada >= umbral, o None."""
+        candidates = set()
+        for bucket, key in zip(self.buckets, self.band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            score = self.similarity(signature, self.signatures[candidate])
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def add(self, key, signature):
+        if isinstance(signature, (bytes, bytearray)):
+            signature = array('Q', signature)
+        self.signatures[key] = signature
+        for bucket, band in zip(self.buckets, self.band_keys(signature)):
+            bucket.setdefault(band, []).append(key)
+
+    def check(self, key, signature):
+        """Devolver la página casi duplicada de `key` o, si no hay, indexarla y devolver None."""
+        if signature is None:
+            self.stats['too_short'] += 1
+            return None
+        self.stats['checked'] += 1
+        match = self.query(signature)
+        if match is not None:
+            self.stats['duplicates'] += 1
+            return match
+        self.add(key, signature)
+        return None
+
+    def log_stats(self):
+        logging.info(f"Near-duplicate index: {self.stats['duplicates']} LLM calls avoided out of "
+                     f"{self.stats['checked']} pages checked (threshold {self.threshold}, "
+                     f"{self.bands} bands x {self.rows} rows), {self.stats['too_short']} too short to compare")
@@ -0,0 +1,72 @@
+import os
+from http_session import get_session, DEFAULT_TIMEOUT
+
+# Tipos de contenido que vale la pena parsear y mandar a CodeGPT
+ALLOWED_CONTENT_TYPES = tuple(
+    os.getenv('ALLOWED_CONTENT_TYPES', 'text/html,application/xhtml+xml').split(','))
+
+# Tamaño máximo del cuerpo ya descomprimido (bytes); la descarga se corta al superarlo
+MAX_BODY_BYTES = int(os.getenv('MAX_BODY_BYTES', 5 * 1024 * 1024))
+
+CHUNK_SIZE = 64 * 1024
+
+class SkipPage(Exception):
+    """La página no se descarga (o se corta) por una de las reglas de tamaño o tipo."""
+
+    def __init__(self, kind, detail):
+        super().__init__(f"{kind}: {detail}")
+        self.kind = kind
+        self.reason = f"{kind}: {detail}"
+
+def check_headers(response, allowed_types, max_bytes):
+    """Descartar por cabeceras antes de leer el cuerpo."""
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type and allowed_types and content_type not in allowed_types:
+        raise SkipPage('content-type', content_type)
+    length = response.headers.get('Content-Length')
+    # Content-Length es el tamaño comprimido: solo sirve para descartar antes
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise SkipPage('too-large', f"Content-Length {length}")
+
+def read_body(response, allowed_types, max_bytes):
+    """Leer el cuerpo por partes (gzip/deflate/br se decodifican al vuelo) sin pasar de `max_bytes`."""
+    check_headers(response, allowed_types, max_bytes)
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            response.close()
+            raise SkipPage('too-large', f"over {max_bytes} bytes")
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+def decode_body(body, encoding):
+    return body.decode(encoding or 'utf-8', errors='replace')
+
+def streaming_get(url, headers):
+    return get_session().get(url, headers=headers, stream=True, timeout=DEFAULT_TIMEOUT)
+
+def fetch_text(url, headers, http_cache=None, get=streaming_get, allowed_types=None, max_bytes=None,
+               modified_at=None):
+    """Descargar una página como texto aplicando los límites de tipo y tamaño.
+
+    Sin argumentos se usan ALLOWED_CONTENT_TYPES y MAX_BODY_BYTES del módulo.
+    `modified_at` es el lastmod conocido de la página (ver HTTPCache.get_text).
+    Lanza SkipPage si la página se descarta y requests.RequestException si falla.
+    """
+    allowed_types = ALLOWED_CONTENT_TYPES if allowed_types is None else allowed_types
+    max_bytes = MAX_BODY_BYTES if max_bytes is None else max_bytes
+
+    def read(response):
+        return read_body(response, allowed_types, max_bytes)
+
+    if http_cache is not None:
+        return http_cache.get_text(url, headers, get, read, modified_at)
+
+    response = get(url, headers=headers)
+    try:
+        response.raise_for_status()
+        return decode_body(read(response), response.encoding)
+    finally:
+        response.close()
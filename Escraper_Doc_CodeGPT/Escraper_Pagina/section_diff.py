@@ -0,0 +1,106 @@
+import json
+import hashlib
+import chunking
+from chunking import split_sections, estimate_tokens, HEADING_RE
+
+def section_fingerprint(section):
+    return hashlib.md5(section.strip().encode('utf-8')).hexdigest()
+
+def extras_digest(endpoints, tables):
+    """Hash de los endpoints y tablas de la página: si cambian, el registro se reescribe aunque el texto no."""
+    data = json.dumps([list(endpoints or []), tables or []], ensure_ascii=False, sort_keys=True)
+    return hashlib.md5(data.encode('utf-8')).hexdigest()
+
+def reusable_units(previous):
+    """Texto analizado por tupla de huellas: cada unidad completa y, si se pudo partir, cada sección suelta."""
+    reusable = {}
+    for fingerprints, analyzed in previous or ():
+        if analyzed is None:
+            continue
+        if isinstance(analyzed, list):
+            for fingerprint, text in zip(fingerprints, analyzed):
+                reusable.setdefault((fingerprint,), text)
+            analyzed = '\n'.join(analyzed)
+        reusable[tuple(fingerprints)] = analyzed
+    return reusable
+
+def pack_sections(sections, indices, budget):
+    """Agrupar secciones consecutivas cambiadas en unidades de hasta `budget` tokens estimados."""
+    if not indices:
+        return []
+    start, end = indices[0], indices[-1] + 1
+    # Si todo entra en una llamada, una sola unidad (igual que chunk_markdown con la página entera)
+    if estimate_tokens('\n'.join(sections[start:end])) <= budget:
+        return [(start, end, None)]
+    groups = []
+    size = 0
+    for i in indices:
+        tokens = estimate_tokens(sections[i])
+        if i > start and size + tokens > budget:
+            groups.append((start, i, None))
+            start, size = i, 0
+        size += tokens
+    groups.append((start, end, None))
+    return groups
+
+def plan_units(sections, previous=None, budget=None):
+    """Repartir las secciones de la página en unidades para CodeGPT.
+
+    Devuelve las huellas de las secciones y una lista de (inicio, fin,
+    analizado). Las unidades con texto analizado son secuencias de secciones
+    que no cambiaron desde la corrida anterior (`previous`, de
+    `unit_records`) y se reusan tal cual; las demás juntan secciones nuevas
+    o cambiadas consecutivas y son lo único que hay que mandar.
+    """
+    budget = budget or chunking.CHUNK_TOKENS
+    fingerprints = [section_fingerprint(section) for section in sections]
+    reusable = reusable_units(previous)
+    # Primero las coincidencias más largas: una página sin cambios reusa exactamente sus unidades
+    lengths = sorted({len(key) for key in reusable}, reverse=True)
+    units = []
+    changed = []
+    i = 0
+    while i < len(sections):
+        for n in lengths:
+            analyzed = reusable.get(tuple(fingerprints[i:i + n])) if i + n <= len(sections) else None
+            if analyzed is not None:
+                units.extend(pack_sections(sections, changed, budget))
+                changed = []
+                units.append((i, i + n, analyzed))
+                i += n
+                break
+        else:
+            changed.append(i)
+            i += 1
+    units.extend(pack_sections(sections, changed, budget))
+    return fingerprints, units
+
+def heading(section):
+    for line in section.split('\n'):
+        if line.strip():
+            return line.strip() if HEADING_RE.match(line) else ''
+    return ''
+
+def split_analyzed(sections, analyzed):
+    """El resultado de una unidad partido por sección si CodeGPT conservó los encabezados; si no, None."""
+    parts = split_sections(analyzed)
+    if len(parts) != len(sections):
+        return None
+    if any(heading(source) != heading(part) for source, part in zip(sections, parts)):
+        return None
+    return parts
+
+def unit_records(sections, fingerprints, units, results):
+    """Unidades para guardar: [huellas, analizado], con el analizado partido por sección cuando se puede.
+
+    Un resultado None (CodeGPT falló) se guarda igual para conservar la
+    estructura, pero no se reusa en la próxima corrida.
+    """
+    records = []
+    for (start, end, _), text in zip(units, results):
+        analyzed = text
+        if text is not None:
+            parts = split_analyzed(sections[start:end], text)
+            analyzed = parts if parts is not None else text
+        records.append([fingerprints[start:end], analyzed])
+    return records
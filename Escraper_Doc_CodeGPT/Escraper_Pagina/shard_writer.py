@@ -0,0 +1,166 @@
+import os
+import json
+import shutil
+import logging
+
+# Buffer de escritura de los archivos de salida y del manifiesto (bytes)
+WRITE_BUFFER = int(os.getenv('WRITE_BUFFER', 256 * 1024))
+
+def load_manifest(path):
+    """Entradas del manifiesto por URL: {'shard', 'offset', 'length'} (gana la última si una URL se repite)."""
+    entries = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry['url']] = entry
+    return entries
+
+def read_record(output_dir, entry):
+    """Leer el texto de una sola página a partir de su entrada del manifiesto."""
+    with open(os.path.join(output_dir, entry['shard']), 'rb') as f:
+        f.seek(entry['offset'])
+        return f.read(entry['length']).decode('utf-8')
+
+class ShardWriter:
+    """Salida de un crawl repartida en archivos `<empresa>_<n>.txt` de hasta `max_bytes`.
+
+    El archivo actual queda abierto con escritura en buffer. Cada página se
+    escribe como un único registro y se rota antes de un registro que no
+    entra, así que ningún archivo pasa del límite salvo que un solo registro
+    sea más grande. Al rotar se hace fsync. El manifiesto
+    `<empresa>_manifest.jsonl` dice en qué archivo, desde qué byte y con
+    qué largo quedó cada URL.
+    """
+
+    def __init__(self, output_dir, company_name, max_bytes, buffer_size=WRITE_BUFFER):
+        self.output_dir = output_dir
+        self.company_name = company_name
+        self.max_bytes = max_bytes
+        self.buffer_size = buffer_size
+        self.file_counter = 1
+        self.file = None
+        self.size = 0
+        self.manifest_path = os.path.join(output_dir, f"{company_name}_manifest.jsonl")
+        self.manifest = None
+        self.manifest_size = 0
+        # Hashes del contenido analizado ya guardado
+        self.content_hash = set()
+
+    def shard_name(self, counter=None):
+        return f"{self.company_name}_{counter or self.file_counter}.txt"
+
+    @property
+    def current_file(self):
+        return os.path.join(self.output_dir, self.shard_name())
+
+    def open(self):
+        if self.file is None:
+            # En modo append la posición inicial es el tamaño actual del archivo
+            self.file = open(self.current_file, 'ab', buffering=self.buffer_size)
+            self.size = self.file.tell()
+        if self.manifest is None:
+            self.manifest = open(self.manifest_path, 'ab', buffering=self.buffer_size)
+            self.manifest_size = self.manifest.tell()
+
+    def sync(self, f):
+        f.flush()
+        os.fsync(f.fileno())
+
+    def rotate(self):
+        self.sync(self.file)
+        self.file.close()
+        self.file = None
+        self.file_counter += 1
+        logging.info(f"Output shard full, continuing in {self.current_file}")
+        self.open()
+
+    def write(self, url, text):
+        """Agregar el registro de una página y su entrada en el manifiesto; devuelve los bytes del registro."""
+        data = text.encode('utf-8')
+        self.open()
+        if self.size and self.size + len(data) > self.max_bytes:
+            self.rotate()
+        entry = {'url': url, 'shard': self.shard_name(), 'offset': self.size, 'length': len(data)}
+        self.file.write(data)
+        self.size += len(data)
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        self.manifest.write(line)
+        self.manifest_size += len(line)
+        logging.info(f"Content for {url} saved to {self.current_file}")
+        return len(data)
+
+    def position(self):
+        """Punto de la salida para un checkpoint (lo escrito hasta acá, incluido lo que sigue en el buffer)."""
+        self.open()
+        return {'file_counter': self.file_counter, 'file_bytes': self.size, 'manifest_bytes': self.manifest_size}
+
+    def flush(self):
+        """Pasar los buffers al sistema operativo; se llama antes de confirmar un checkpoint."""
+        for f in (self.file, self.manifest):
+            if f is not None:
+                f.flush()
+
+    def restore(self, file_counter, file_bytes, manifest_bytes):
+        """Volver al punto de un checkpoint truncando lo escrito después."""
+        self.close()
+        self.file_counter = file_counter
+        for path, size in ((self.current_file, file_bytes), (self.manifest_path, manifest_bytes)):
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+        later = file_counter + 1
+        while True:
+            path = os.path.join(self.output_dir, self.shard_name(later))
+            if not os.path.exists(path):
+                break
+            logging.info(f"Removing shard written after the last checkpoint: {path}")
+            os.remove(path)
+            later += 1
+
+    def compact(self):
+        """Reescribir los archivos con solo el último registro de cada URL; devuelve True si había reemplazados.
+
+        Un recrawl incremental agrega al final la versión nueva de las páginas
+        que cambiaron. Los archivos compactados se escriben en un directorio
+        aparte y después reemplazan a los actuales.
+        """
+        self.close()
+        if not os.path.exists(self.manifest_path):
+            return False
+        latest = load_manifest(self.manifest_path)
+        with open(self.manifest_path, encoding='utf-8') as f:
+            total = sum(1 for line in f if line.strip())
+        if len(latest) == total:
+            return False
+        tmp_dir = os.path.join(self.output_dir, f".{self.company_name}_compact")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        compacted = ShardWriter(tmp_dir, self.company_name, self.max_bytes, self.buffer_size)
+        # En el orden de los archivos: la versión nueva de una página queda donde se escribió
+        for url, entry in sorted(latest.items(), key=lambda item: (self.shard_number(item[1]), item[1]['offset'])):
+            compacted.write(url, read_record(self.output_dir, entry))
+        compacted.close()
+        for counter in range(1, compacted.file_counter + 1):
+            os.replace(os.path.join(tmp_dir, self.shard_name(counter)),
+                       os.path.join(self.output_dir, self.shard_name(counter)))
+        later = compacted.file_counter + 1
+        while os.path.exists(os.path.join(self.output_dir, self.shard_name(later))):
+            os.remove(os.path.join(self.output_dir, self.shard_name(later)))
+            later += 1
+        os.replace(compacted.manifest_path, self.manifest_path)
+        os.rmdir(tmp_dir)
+        self.file_counter = compacted.file_counter
+        logging.info(f"Output compacted: dropped {total - len(latest)} replaced records")
+        return True
+
+    def shard_number(self, entry):
+        return int(entry['shard'][len(self.company_name) + 1:-len('.txt')])
+
+    def close(self):
+        for f in (self.file, self.manifest):
+            if f is not None:
+                self.sync(f)
+                f.close()
+        self.file = None
+        self.manifest = None
@@ -0,0 +1,120 @@
+import os
+import zlib
+import logging
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urljoin
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import XMLPullParser, ParseError
+import requests
+from http_session import get_session, DEFAULT_TIMEOUT
+
+# Máximo de archivos de sitemap (índices incluidos) que se leen por crawl
+SITEMAP_MAX_FILES = int(os.getenv('SITEMAP_MAX_FILES', 200))
+
+GZIP_MAGIC = b'\x1f\x8b'
+CHUNK_SIZE = 64 * 1024
+
+def parse_lastmod(value):
+    """Timestamp UTC de un <lastmod> en formato W3C (fecha sola o fecha y hora); None si no se entiende."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def fetch_robots(base_url, headers):
+    """robots.txt del host de `base_url` ya parseado; sin reglas si no existe o no se puede leer."""
+    parts = urlsplit(base_url)
+    robots = RobotFileParser(f"{parts.scheme}://{parts.netloc}/robots.txt")
+    try:
+        response = get_session().get(robots.url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        lines = response.text.splitlines() if response.status_code == 200 else []
+    except requests.RequestException as e:
+        logging.warning(f"Could not read {robots.url}: {e}")
+        lines = []
+    robots.parse(lines)
+    return robots
+
+def iter_sitemap(url, headers):
+    """Entradas de un sitemap o índice de sitemaps, leyendo el XML a medida que llega.
+
+    Devuelve tuplas (tipo, loc, lastmod) con tipo 'url' o 'sitemap'. Los
+    sitemaps comprimidos (.xml.gz) se reconocen por los bytes mágicos de
+    gzip y se descomprimen al vuelo.
+    """
+    parser = XMLPullParser(events=('end',))
+    fields = {}
+
+    def entries():
+        nonlocal fields
+        for _, element in parser.read_events():
+            tag = element.tag.rsplit('}', 1)[-1]
+            if tag in ('loc', 'lastmod'):
+                fields[tag] = (element.text or '').strip()
+            elif tag in ('url', 'sitemap'):
+                if fields.get('loc'):
+                    yield tag, fields['loc'], parse_lastmod(fields.get('lastmod'))
+                fields = {}
+                element.clear()
+
+    response = get_session().get(url, headers=headers, stream=True, timeout=DEFAULT_TIMEOUT)
+    try:
+        response.raise_for_status()
+        # iter_content ya deshace el Content-Encoding; el gzip del archivo en sí se detecta acá
+        decompressor = None
+        for i, chunk in enumerate(response.iter_content(CHUNK_SIZE)):
+            if i == 0 and chunk[:2] == GZIP_MAGIC:
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+            yield from entries()
+        parser.close()
+        yield from entries()
+    finally:
+        response.close()
+
+def discover(base_url, accept, headers, sitemap_urls=None, max_files=None):
+    """Sembrar el crawl desde robots.txt y los sitemaps del sitio.
+
+    Se leen los sitemaps pedidos o, si no hay, los que declara robots.txt
+    (y /sitemap.xml como último recurso), siguiendo los índices. Devuelve
+    (urls, lastmods, crawl_delay): las URLs que `accept` deja pasar en el
+    orden del sitemap, su lastmod (timestamp o None) y el Crawl-delay de
+    robots.txt para `headers['User-Agent']` (o None).
+    """
+    max_files = max_files or SITEMAP_MAX_FILES
+    robots = fetch_robots(base_url, headers)
+    user_agent = headers.get('User-Agent', '*')
+    crawl_delay = robots.crawl_delay(user_agent)
+
+    parts = urlsplit(base_url)
+    pending = list(sitemap_urls or robots.site_maps() or [f"{parts.scheme}://{parts.netloc}/sitemap.xml"])
+    visited = set()
+    urls = []
+    lastmods = {}
+    while pending and len(visited) < max_files:
+        sitemap_url = pending.pop(0)
+        if sitemap_url in visited:
+            continue
+        visited.add(sitemap_url)
+        try:
+            for kind, loc, lastmod in iter_sitemap(sitemap_url, headers):
+                loc = urljoin(sitemap_url, loc)
+                if kind == 'sitemap':
+                    pending.append(loc)
+                elif accept(loc) and loc not in lastmods:
+                    urls.append(loc)
+                    lastmods[loc] = lastmod
+        except (requests.RequestException, ParseError, zlib.error) as e:
+            logging.warning(f"Could not read sitemap {sitemap_url}: {e}")
+    if pending:
+        logging.warning(f"Stopped after {max_files} sitemap files, {len(pending)} not read")
+    logging.info(f"Sitemap seeding: {len(urls)} URLs from {len(visited)} sitemap files"
+                 f"{f', crawl-delay {crawl_delay} s' if crawl_delay else ''}")
+    return urls, lastmods, float(crawl_delay) if crawl_delay else None
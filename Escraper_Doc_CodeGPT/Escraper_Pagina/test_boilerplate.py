@@ -0,0 +1,43 @@
+from boilerplate import BoilerplateLearner, fingerprint, split_fingerprints
+
+NAV = 'Inicio | Productos | Precios | Contacto'
+FOOTER = '© 2024 Ejemplo S.A. Todos los derechos reservados.'
+
+def page(n):
+    return ['# Guía', NAV, f'Contenido propio de la página {n}.', FOOTER]
+
+def test_block_repeated_across_pages_is_learned_as_boilerplate():
+    learner = BoilerplateLearner(min_pages=3, min_ratio=0.5)
+    kept = [learner.filter(page(n))[0] for n in range(5)]
+
+    # Las dos primeras páginas todavía no alcanzan min_pages
+    assert kept[0] == page(0)
+    assert kept[1] == page(1)
+    # Desde la tercera, la navegación y el pie se quitan; el encabezado y el contenido quedan
+    for n in range(2, 5):
+        assert kept[n] == ['# Guía', f'Contenido propio de la página {n}.']
+    assert learner.stats['blocks_removed'] == 6
+
+def test_block_in_few_pages_is_kept():
+    learner = BoilerplateLearner(min_pages=3, min_ratio=0.5)
+    for n in range(3):
+        learner.filter(page(n))
+    # Un bloque compartido por solo dos de las páginas no llega al mínimo
+    learner.filter(['Aviso de mantenimiento', 'Texto A'])
+    kept, _ = learner.filter(['Aviso de mantenimiento', 'Texto B'])
+    assert kept == ['Aviso de mantenimiento', 'Texto B']
+
+def test_fingerprint_ignores_whitespace_and_case():
+    assert fingerprint('Inicio  |\nPRODUCTOS') == fingerprint('inicio | productos')
+
+def test_replay_restores_the_counts():
+    learner = BoilerplateLearner(min_pages=3, min_ratio=0.5)
+    blobs = [learner.filter(page(n))[1] for n in range(3)]
+    assert len(split_fingerprints(blobs[0])) == 4
+
+    # Al reanudar, las huellas guardadas dejan el mismo estado que haber visto las páginas
+    resumed = BoilerplateLearner(min_pages=3, min_ratio=0.5)
+    for blob in blobs:
+        resumed.replay(blob)
+    assert resumed.counts == learner.counts
+    assert resumed.filter(page(3))[0] == learner.filter(page(3))[0]
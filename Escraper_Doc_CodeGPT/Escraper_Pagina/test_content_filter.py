@@ -0,0 +1,57 @@
+import re
+import random
+from content_filter import ContentFilter, FilterRules, DEFAULT_EXCLUDE, trie_pattern
+
+# Frases con prefijos comunes y algunas que son prefijo de otras
+PHRASES = DEFAULT_EXCLUDE + (
+    "aviso", "aviso de cookies", "política", "política de cookies", "cookies", "cookie",
+    "términos", "términos de uso", "mejorar", "centro", "a.b", "(beta)",
+)
+
+def alternation(phrases):
+    return re.compile('|'.join(re.escape(phrase) for phrase in phrases))
+
+def sample_texts():
+    rng = random.Random(7)
+    words = ["usamos", "cookies", "cookie", "aviso", "legal", "de", "política", "privacidad", "términos",
+             "uso", "centro", "mejorar", "tu", "experiencia", "a.b", "axb", "(beta)", "beta", "texto"]
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(0, 8))) for _ in range(500)]
+
+def test_trie_pattern_matches_like_a_plain_alternation():
+    trie, plain = trie_pattern(PHRASES), alternation(PHRASES)
+    for text in sample_texts():
+        trie_match, plain_match = trie.search(text), plain.search(text)
+        assert (trie_match is None) == (plain_match is None), text
+        if trie_match:
+            assert trie_match.start() == plain_match.start(), text
+
+def test_trie_pattern_escapes_special_characters():
+    pattern = trie_pattern(["a.b", "(beta)"])
+    assert pattern.search("x a.b y")
+    assert not pattern.search("axb")
+    assert pattern.search("versión (beta)")
+    assert not pattern.search("versión beta")
+
+def test_trie_pattern_without_phrases():
+    assert trie_pattern([]) is None
+    assert trie_pattern([""]) is None
+
+def test_filter_batch_matches_each_element_on_its_own():
+    content_filter = ContentFilter(PHRASES, include=["documentación"])
+    texts = sample_texts() + ["Usamos COOKIES", "aviso legal de la documentación", ""]
+    plain = alternation(content_filter.exclude)
+    expected = [bool(plain.search(text.lower())) and 'documentación' not in text.lower() for text in texts]
+    assert content_filter.filter_batch(texts) == expected
+
+def test_phrase_does_not_match_across_elements():
+    content_filter = ContentFilter(["aviso legal"])
+    assert content_filter.filter_batch(["aviso", "legal"]) == [False, False]
+
+def test_site_rules_apply_to_subdomains():
+    rules = FilterRules({"sites": {"ejemplo.com": {"exclude": ["suscribite"]},
+                                   "docs.ejemplo.com": {"exclude": ["beta"], "inherit": False}}})
+    assert rules.for_url("https://www.ejemplo.com/a")("Suscribite al boletín")
+    assert rules.for_url("https://www.ejemplo.com/a")("Usamos cookies")
+    assert rules.for_url("https://docs.ejemplo.com/a")("Versión beta")
+    assert not rules.for_url("https://docs.ejemplo.com/a")("Usamos cookies")
+    assert not rules.for_url("https://otro.com/a")("Suscribite al boletín")
@@ -0,0 +1,116 @@
+import os
+import re
+import csv
+import sqlite3
+
+os.environ.setdefault('CODEGPT_API_KEY', 'test')
+os.environ.setdefault('AGENT_ID', 'test')
+
+import pytest
+import documentacion
+from codegpt_sim import CodeGPTSimulator
+from fixture_site import FixtureSite
+from record_store import RecordReader, record_path
+
+# Páginas con el mismo contenido que la 1 pero sus propios enlaces: sus hijas
+# solo se descubren si se siguen los enlaces de un duplicado exacto
+DUPLICATES = {2, 5}
+
+class DuplicateSite(FixtureSite):
+    def page(self, n):
+        html = super().page(n)
+        if n not in DUPLICATES:
+            return html
+        own_links = html[html.rindex('<ul>'):html.rindex('</main>')]
+        original = super().page(1)
+        return original[:original.rindex('<ul>')] + own_links + original[original.rindex('</main>'):]
+
+class ChangingSite(FixtureSite):
+    """La página 3 puede cambiar de texto y quedarse sin tablas entre corridas."""
+
+    changed = False
+
+    def page(self, n):
+        html = super().page(n)
+        if self.changed and n == 3:
+            html = re.sub(r'<h3>Table .*?</table>', '', html).replace('</p>', ' Updated paragraph.</p>', 1)
+        return html
+
+@pytest.fixture(scope='module')
+def servers():
+    site = DuplicateSite(pages=40, fanout=3, page_bytes=3000, tables=1, cross_links=0)
+    site_server = site.serve()
+    sim = CodeGPTSimulator(latency=0)
+    sim_server = sim.serve()
+    yield site, sim
+    site_server.shutdown()
+    sim_server.shutdown()
+
+def crawl(site, sim, output_dir, async_crawl, monkeypatch, incremental=False):
+    monkeypatch.setattr(documentacion, 'CODEGPT_API_URL', sim.url)
+    monkeypatch.setattr(documentacion, 'REQUEST_DELAY', 0)
+    monkeypatch.setattr(documentacion, 'MAX_DEPTH', 100)
+    documentacion.main(site.base_url + site.path(0), str(output_dir), 'fixture', async_crawl=async_crawl,
+                       rate_limit=1000, http_cache_dir=None, llm_cache_path=None, use_sitemap=False,
+                       near_dup_threshold=None, boilerplate_min_pages=None, output_format='jsonl',
+                       incremental=incremental)
+    with RecordReader(record_path(str(output_dir), 'fixture')) as reader:
+        records = {record['url']: record['markdown'] for record in reader}
+    conn = sqlite3.connect(os.path.join(output_dir, 'fixture_crawl_state.db'))
+    urls = dict(conn.execute("SELECT url, status FROM urls"))
+    conn.close()
+    return records, urls
+
+def test_sync_and_async_follow_links_of_duplicate_pages(servers, tmp_path, monkeypatch):
+    site, sim = servers
+    sync_records, sync_urls = crawl(site, sim, tmp_path / 'sync', False, monkeypatch)
+    async_records, async_urls = crawl(site, sim, tmp_path / 'async', True, monkeypatch)
+
+    assert sync_urls == async_urls
+    assert sync_records == async_records
+    # Se llegó a todas las páginas, incluidas las hijas de los duplicados
+    assert len(sync_urls) == site.pages
+    assert set(sync_urls.values()) == {'done'}
+    # Los duplicados no tienen registro propio
+    assert len(sync_records) == site.pages - len(DUPLICATES)
+
+def sidecar_rows(output_dir):
+    with open(os.path.join(output_dir, 'fixture_tables.csv'), encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+@pytest.mark.parametrize('async_crawl', [False, True], ids=['sync', 'async'])
+def test_incremental_crawls_finish_every_page(async_crawl, tmp_path, monkeypatch):
+    site = ChangingSite(pages=15, fanout=3, page_bytes=3000, tables=1, cross_links=0)
+    site_server = site.serve()
+    sim = CodeGPTSimulator(latency=0)
+    sim_server = sim.serve()
+    changed_url = site.base_url + site.path(3)
+    try:
+        crawl(site, sim, tmp_path, async_crawl, monkeypatch)
+        assert any(row['url'] == changed_url for row in sidecar_rows(tmp_path))
+
+        # Sin cambios: ninguna página se reescribe, pero todas quedan terminadas
+        requests = sim.stats['requests']
+        _, urls = crawl(site, sim, tmp_path, async_crawl, monkeypatch, incremental=True)
+        assert sim.stats['requests'] == requests
+        assert list(urls.values()) == ['done'] * site.pages
+
+        ChangingSite.changed = True
+        _, urls = crawl(site, sim, tmp_path, async_crawl, monkeypatch, incremental=True)
+        assert list(urls.values()) == ['done'] * site.pages
+    finally:
+        ChangingSite.changed = False
+        site_server.shutdown()
+        sim_server.shutdown()
+
+    # La salida tiene un solo registro por página, el nuevo para la que cambió
+    with RecordReader(record_path(str(tmp_path), 'fixture')) as reader:
+        assert len(reader.entries) == site.pages
+        assert 'Updated paragraph.' in reader.get(changed_url)['markdown']
+
+    # La página cambiada ya no tiene tablas: sus filas viejas no quedan en el sidecar
+    rows = sidecar_rows(tmp_path)
+    assert rows
+    assert not any(row['url'] == changed_url for row in rows)
+    cells = [(row['url'], row['table'], row['row'], row['column']) for row in rows]
+    assert len(cells) == len(set(cells))
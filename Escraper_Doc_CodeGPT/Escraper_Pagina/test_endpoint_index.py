@@ -0,0 +1,61 @@
+from endpoint_index import EndpointIndex, parse_routes, template_segments
+
+def test_path_parameters_are_normalized():
+    assert template_segments('/v1/users/{userId}/orders/:orderId') == ['v1', 'users', '{userId}', 'orders', '{orderId}']
+    assert template_segments('/items/<int:item_id>/tags/<tag>') == ['items', '{item_id}', 'tags', '{tag}']
+    assert template_segments('/files/${fileId}') == ['files', '{fileId}']
+    # Valores concretos en lugar del nombre del parámetro
+    assert template_segments('/v1/payments/12345/refunds/') == ['v1', 'payments', '{id}', 'refunds']
+    assert template_segments('/orders/3f2b8c1e-4a5d-4e6f-8a9b-0c1d2e3f4a5b.') == ['orders', '{id}']
+
+def test_parse_routes_with_methods_and_hosts():
+    text = 'Use GET /v1/users/{id} or POST https://api.ejemplo.com/v1/users; and/or 1/2 are not routes, nor is /2024.'
+    assert parse_routes(text) == [
+        ('GET', '', '/v1/users/{id}'),
+        ('POST', 'https://api.ejemplo.com', '/v1/users'),
+    ]
+
+def test_table_method_cells_apply_to_the_row():
+    table = {'columns': ['Método', 'Ruta'], 'types': ['string', 'string'],
+             'rows': [['DELETE', '/v1/users/:id'], ['', '/v1/status']]}
+    assert EndpointIndex.parse(['GET /v1/users/{id}', '/v1/users/{id}'], [table]) == [
+        ['', '', '/v1/status'],
+        ['DELETE', '', '/v1/users/{id}'],
+        ['GET', '', '/v1/users/{id}'],
+    ]
+
+def build_index():
+    index = EndpointIndex()
+    index.add('https://docs/a', [['GET', '', '/v1/users/{id}'], ['POST', '', '/v1/users']])
+    # La misma ruta con otra sintaxis de parámetro cae en el mismo nodo
+    index.add('https://docs/b', [['DELETE', 'https://api.ejemplo.com', '/v1/users/:id'],
+                                 ['GET', '', '/v1/users/{id}/orders/{orderId}'],
+                                 ['GET', '', '/v2/health']])
+    return index
+
+def test_routes_with_parameters_share_a_node():
+    index = build_index()
+    assert index.routes == 4
+    assert index.lookup('/v1/users/{id}')[0] == {
+        'route': '/v1/users/{id}', 'methods': ['DELETE', 'GET'], 'hosts': ['https://api.ejemplo.com'],
+        'sources': ['https://docs/a', 'https://docs/b'],
+    }
+
+def test_lookup_by_prefix():
+    index = build_index()
+    assert [entry['route'] for entry in index.lookup('/v1/users/')] == [
+        '/v1/users', '/v1/users/{id}', '/v1/users/{id}/orders/{orderId}']
+    # El último segmento puede estar incompleto
+    assert [entry['route'] for entry in index.lookup('/v1/us')] == [
+        '/v1/users', '/v1/users/{id}', '/v1/users/{id}/orders/{orderId}']
+    assert [entry['route'] for entry in index.lookup('/v1/users/:id/orders')] == ['/v1/users/{id}/orders/{orderId}']
+    assert index.lookup('/v3') == []
+    assert len(index.lookup()) == 4
+
+def test_save_and_load(tmp_path):
+    index = build_index()
+    path = str(tmp_path / 'endpoints.json')
+    index.save(path)
+    loaded = EndpointIndex.load(path)
+    assert loaded.to_dict() == index.to_dict()
+    assert loaded.routes == index.routes
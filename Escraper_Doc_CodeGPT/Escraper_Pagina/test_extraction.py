@@ -0,0 +1,50 @@
+import pytest
+from extraction import extract_all
+from fixture_site import FixtureSite
+from html_backend import BACKEND_MODULES, backend_available
+
+# Página con script/style/template dentro de elementos de contenido y de tablas
+PAGE = """<html><head><title>Pagos</title><style>body { color: red }</style></head>
+<body>
+<nav><a href="/developers/es/docs/inicio">Inicio</a></nav>
+<h2>Crear un pago <script>trackHeading('pago')</script></h2>
+<p>Envía una solicitud <style>.x { display: none }</style>a <strong>https://api.ejemplo.com/v1/payments</strong>.</p>
+<pre><code>curl -X POST https://api.ejemplo.com/v1/payments<script>copyButton()</script></code></pre>
+<template><p>Texto de plantilla</p></template>
+<table>
+  <thead><tr><th>Método</th><th>Ruta</th></tr></thead>
+  <tr><td>POST</td><td>/v1/payments<script>var x = 1;</script></td></tr>
+  <tr><td rowspan="2">GET</td><td>/v1/payments/{id}</td></tr>
+  <tr><td>/v1/payments/search</td></tr>
+</table>
+<p>Ver <a href="/developers/es/docs/api/reembolsos">reembolsos</a>.</p>
+<script>window.dataLayer = [];</script>
+</body></html>"""
+
+BASE_URL = "https://www.ejemplo.com/developers/es/docs/api/pagos"
+
+BACKENDS = [pytest.param(backend, marks=pytest.mark.skipif(not backend_available(backend),
+                                                            reason=f"{backend} is not installed"))
+            for backend in BACKEND_MODULES if backend != 'html.parser']
+
+def extract(html, backend):
+    return extract_all(html, BASE_URL, should_filter=None, backend=backend, structured_tables=True)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backend_matches_html_parser(backend):
+    assert extract(PAGE, backend) == extract(PAGE, 'html.parser')
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backend_matches_html_parser_on_fixture_site(backend):
+    site = FixtureSite(20, page_bytes=8000, tables=2, seed=7)
+    for n in range(20):
+        assert extract(site.page(n), backend) == extract(site.page(n), 'html.parser')
+
+def test_script_and_style_text_is_not_content():
+    content, endpoints, tables, links = extract(PAGE, 'html.parser')
+    for text in ('trackHeading', 'display: none', 'copyButton', 'var x', 'dataLayer', 'Texto de plantilla'):
+        assert text not in content
+        assert text not in str(tables)
+    assert '## Crear un pago' in content
+    assert tables[0]['rows'][0] == ['POST', '/v1/payments']
+    assert tables[0]['rows'][2] == ['GET', '/v1/payments/search']
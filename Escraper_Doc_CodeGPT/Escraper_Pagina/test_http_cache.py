@@ -0,0 +1,59 @@
+import os
+from http_cache import HTTPCache
+
+class FakeResponse:
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers or {}
+        self.encoding = 'utf-8'
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+class FakeServer:
+    """Responde 304 a las solicitudes condicionales y la página entera a las demás."""
+
+    def __init__(self, body):
+        self.body = body
+        self.requests = []
+
+    def get(self, url, headers):
+        self.requests.append(headers)
+        if 'If-None-Match' in headers:
+            return FakeResponse(304)
+        return FakeResponse(200, self.body, {'ETag': '"v1"'})
+
+def remove_objects(cache):
+    for directory, _, files in os.walk(os.path.join(cache.cache_dir, 'objects')):
+        for name in files:
+            os.remove(os.path.join(directory, name))
+
+def test_revalidated_copy_missing_on_disk_is_refetched(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    server = FakeServer(b'<p>hola</p>')
+    assert cache.get_text('https://ejemplo.com/a', {}, server.get) == '<p>hola</p>'
+
+    # El objeto se expulsa después de que lookup encontró la entrada
+    entry = cache.lookup('https://ejemplo.com/a')
+    cache.lookup = lambda url: entry
+    remove_objects(cache)
+
+    assert cache.get_text('https://ejemplo.com/a', {}, server.get) == '<p>hola</p>'
+    assert 'If-None-Match' in server.requests[1]
+    assert 'If-None-Match' not in server.requests[2]
+    assert cache.total_bytes == len(b'<p>hola</p>')
+
+def test_unchanged_copy_missing_on_disk_is_refetched(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    server = FakeServer(b'<p>hola</p>')
+    cache.get_text('https://ejemplo.com/a', {}, server.get)
+    entry = cache.lookup('https://ejemplo.com/a')
+    cache.lookup = lambda url: entry
+    remove_objects(cache)
+
+    assert cache.get_text('https://ejemplo.com/a', {}, server.get, modified_at=1) == '<p>hola</p>'
+    assert 'If-None-Match' not in server.requests[1]
@@ -0,0 +1,155 @@
+import pytest
+import http_session
+import llm_limiter
+from email.utils import formatdate
+from llm_limiter import AIMDLimiter, backoff_delay, parse_retry_after
+
+class FakeClock:
+    """Reemplaza al módulo time del limitador: el tiempo solo avanza con sleep o advance."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_limiter, 'time', clock)
+    return clock
+
+def test_throttled_response_halves_the_limit_once_per_window(clock):
+    limiter = AIMDLimiter(max_concurrency=16, start_concurrency=8)
+    first = limiter.acquire()
+    second = limiter.acquire()
+    clock.advance(1)
+
+    limiter.release(first, throttled=True)
+    assert limiter.limit == 4
+    # La otra llamada ya estaba en curso cuando se redujo: no vuelve a reducirlo
+    limiter.release(second, throttled=True)
+    assert limiter.limit == 4
+    assert limiter.stats['throttled'] == 2
+
+    # Una llamada que empezó después de la reducción sí lo reduce
+    third = limiter.acquire()
+    limiter.release(third, throttled=True)
+    assert limiter.limit == 2
+
+def test_limit_never_goes_below_the_minimum(clock):
+    limiter = AIMDLimiter(max_concurrency=16, start_concurrency=1)
+    for _ in range(3):
+        clock.advance(1)
+        limiter.release(limiter.acquire(), throttled=True)
+    assert limiter.limit == 1
+
+def test_successful_responses_raise_the_limit_additively(clock):
+    limiter = AIMDLimiter(max_concurrency=6, start_concurrency=4)
+    limiter.release(limiter.acquire())
+    assert limiter.limit == pytest.approx(4.25)
+
+    # Una ventana completa de respuestas correctas suma alrededor de un lugar
+    for _ in range(3):
+        limiter.release(limiter.acquire())
+    assert 4.9 < limiter.limit < 5
+
+    for _ in range(50):
+        limiter.release(limiter.acquire())
+    assert limiter.limit == 6
+
+def test_in_flight_calls_are_capped_by_the_limit(clock):
+    limiter = AIMDLimiter(max_concurrency=16, start_concurrency=2)
+    tickets = [limiter.acquire(), limiter.acquire()]
+    assert limiter._try_acquire(0, clock.monotonic()) == (False, None)
+    limiter.release(tickets.pop())
+    assert limiter._try_acquire(0, clock.monotonic())[0]
+
+def test_retry_after_pauses_every_caller(clock):
+    limiter = AIMDLimiter(max_concurrency=16, start_concurrency=4)
+    limiter.release(limiter.acquire(), throttled=True, retry_after=10)
+
+    clock.advance(4)
+    assert limiter._try_acquire(0, clock.monotonic()) == (False, 6)
+    clock.advance(6)
+    assert limiter._try_acquire(0, clock.monotonic())[0]
+
+def test_parse_retry_after(clock):
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('3') == 3
+    assert parse_retry_after('-5') == 0
+    assert parse_retry_after(formatdate(clock.time() + 30, usegmt=True)) == pytest.approx(30)
+    assert parse_retry_after('pronto') is None
+
+def test_tpm_budget_blocks_until_the_bucket_refills(clock):
+    # 600 tokens por minuto: se recargan 10 por segundo
+    limiter = AIMDLimiter(max_concurrency=16, start_concurrency=16, tpm=600)
+    limiter.acquire(500)
+
+    acquired, wait = limiter._try_acquire(300, clock.monotonic())
+    assert not acquired
+    assert wait == pytest.approx(20)
+    clock.advance(20)
+    assert limiter._try_acquire(300, clock.monotonic())[0]
+    assert limiter.tokens == pytest.approx(0)
+
+def test_request_larger_than_the_budget_needs_a_full_bucket(clock):
+    limiter = AIMDLimiter(max_concurrency=16, start_concurrency=16, tpm=600)
+    limiter.acquire(100)
+
+    acquired, wait = limiter._try_acquire(5000, clock.monotonic())
+    assert not acquired
+    assert wait == pytest.approx(10)
+    clock.advance(10)
+    assert limiter._try_acquire(5000, clock.monotonic())[0]
+
+def test_backoff_delay_uses_full_jitter(monkeypatch):
+    monkeypatch.setattr(llm_limiter, 'LLM_BACKOFF_MAX', 8.0)
+    # uniform(a, b) devuelve el extremo superior para ver el techo de cada intento
+    monkeypatch.setattr(llm_limiter.random, 'uniform', lambda low, high: high)
+    assert [backoff_delay(attempt, base=1.0) for attempt in range(5)] == [1, 2, 4, 8, 8]
+    assert backoff_delay(0, retry_after=5) == 6
+
+    monkeypatch.setattr(llm_limiter.random, 'uniform', lambda low, high: low)
+    assert backoff_delay(3, base=1.0) == 0
+    assert backoff_delay(0, retry_after=5) == 5
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+def test_request_retries_throttled_responses_after_retry_after(clock, monkeypatch):
+    session = FakeSession([FakeResponse(429, {'Retry-After': '7'}), FakeResponse(200)])
+    monkeypatch.setattr(http_session, 'get_session', lambda retries=True: session)
+    limiter = AIMDLimiter(max_concurrency=16, start_concurrency=4)
+
+    response = limiter.post('https://codegpt.test/v1/chat', json={'prompt': 'hola'})
+    assert response.status_code == 200
+    assert session.calls == 2
+    assert 7 <= clock.sleeps[0] <= 8
+    assert limiter.stats == {'requests': 2, 'throttled': 1, 'retries': 1, 'waited': 0.0}
+    assert limiter.in_flight == 0
@@ -0,0 +1,53 @@
+import random
+from near_dup import NearDuplicateIndex, shingles, lsh_params
+
+WORDS = [f"palabra{i}" for i in range(500)]
+
+def text(seed, words=300):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+def test_near_duplicate_page_matches_the_indexed_one():
+    index = NearDuplicateIndex(threshold=0.9)
+    original = text(1)
+    # Una sola palabra distinta en 300: casi todos los shingles coinciden
+    words = original.split()
+    words[150] = 'cambiada'
+    edited = ' '.join(words)
+
+    assert index.check('a', index.signature(original)) is None
+    assert index.check('b', index.signature(edited)) == 'a'
+    assert index.stats == {'checked': 2, 'duplicates': 1, 'too_short': 0}
+    # El duplicado no se agrega al índice
+    assert list(index.signatures) == ['a']
+
+def test_distinct_pages_are_both_indexed():
+    index = NearDuplicateIndex(threshold=0.9)
+    assert index.check('a', index.signature(text(1))) is None
+    assert index.check('b', index.signature(text(2))) is None
+    assert sorted(index.signatures) == ['a', 'b']
+    assert index.stats['duplicates'] == 0
+
+def test_signatures_are_stable_and_survive_a_round_trip():
+    first, second = NearDuplicateIndex(), NearDuplicateIndex()
+    signature = first.signature(text(3))
+    assert signature == second.signature(text(3))
+
+    # Como al reanudar: la firma se guarda como bytes y se vuelve a cargar
+    second.add('a', signature.tobytes())
+    assert second.query(signature) == 'a'
+
+def test_short_pages_are_not_compared():
+    index = NearDuplicateIndex()
+    assert index.signature('Inicio Contacto') is None
+    assert index.check('a', None) is None
+    assert index.stats['too_short'] == 1
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingles('Uno, dos. Tres cuatro cinco', 5) == shingles('uno dos tres CUATRO cinco', 5)
+    assert len(shingles('a b c d e f', 5)) == 2
+
+def test_lsh_params_use_every_permutation_row():
+    bands, rows = lsh_params(0.9, 128)
+    assert bands * rows <= 128
+    assert (1 / bands) ** (1 / rows) <= 0.8
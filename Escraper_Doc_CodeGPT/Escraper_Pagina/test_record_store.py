@@ -0,0 +1,45 @@
+import gzip
+import json
+from record_store import RecordWriter, RecordReader, record_path
+
+def write_records(path, records, frame_bytes=64):
+    writer = RecordWriter(path, 'gzip', frame_bytes)
+    for record in records:
+        writer.write(record['url'], record)
+    writer.close()
+
+def test_iteration_yields_only_the_latest_record_of_each_url(tmp_path):
+    path = record_path(str(tmp_path), 'crawl', 'gzip')
+    write_records(path, [{'url': 'a', 'markdown': 'vieja'}, {'url': 'b', 'markdown': 'b'}])
+    # Un recrawl incremental agrega la versión nueva al final
+    write_records(path, [{'url': 'a', 'markdown': 'nueva'}])
+
+    with RecordReader(path) as reader:
+        assert [record['markdown'] for record in reader] == ['b', 'nueva']
+        assert reader.urls() == ['b', 'a']
+        assert len(reader) == 2
+        assert reader.get('a')['markdown'] == 'nueva'
+
+def test_compact_drops_replaced_records(tmp_path):
+    path = record_path(str(tmp_path), 'crawl', 'gzip')
+    write_records(path, [{'url': f'u{i}', 'markdown': f'v1 {i}'} for i in range(10)])
+    write_records(path, [{'url': 'u3', 'markdown': 'v2 3'}, {'url': 'u7', 'markdown': 'v2 7'}])
+
+    writer = RecordWriter(path, 'gzip', 64)
+    assert writer.compact()
+    assert not writer.compact()
+
+    # El archivo entero (como con zcat) ya no tiene las versiones viejas
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 10
+    assert {'v1 3', 'v1 7'}.isdisjoint(record['markdown'] for record in lines)
+    with RecordReader(path) as reader:
+        assert len(reader.entries) == 10
+        assert reader.get('u3')['markdown'] == 'v2 3'
+        assert reader.get('u0')['markdown'] == 'v1 0'
+
+    # Después de compactar se puede seguir escribiendo al final
+    write_records(path, [{'url': 'u10', 'markdown': 'v1 10'}])
+    with RecordReader(path) as reader:
+        assert len(reader) == 11
@@ -0,0 +1,65 @@
+from chunking import split_sections
+from section_diff import plan_units, unit_records
+
+def analyze(sections):
+    """Resultado simulado de CodeGPT: conserva el encabezado de cada sección."""
+    return '\n'.join(section.split('\n')[0] + '\nResumen de ' + section.split('\n')[0][3:] for section in sections)
+
+def run(sections, previous=None, budget=None):
+    fingerprints, units = plan_units(sections, previous, budget)
+    results = [analyzed if analyzed is not None else analyze(sections[start:end])
+               for start, end, analyzed in units]
+    return units, unit_records(sections, fingerprints, units, results)
+
+def page(*titles, changed=()):
+    return split_sections('\n'.join(
+        f"## {title}\nTexto de {title}." + (' Cambiado.' if title in changed else '') for title in titles))
+
+def test_unchanged_page_reuses_its_units():
+    sections = page('A', 'B', 'C')
+    units, records = run(sections)
+    assert units == [(0, 3, None)]
+    # Con el resultado partido por sección
+    assert len(records[0][1]) == 3
+
+    units, _ = run(sections, records)
+    assert units == [(0, 3, analyze(sections))]
+
+def test_added_removed_and_modified_sections():
+    _, records = run(page('A', 'B', 'C', 'D'))
+
+    # B cambia, C se quita y E se agrega
+    sections = page('A', 'B', 'D', 'E', changed={'B'})
+    units, _ = run(sections, records)
+    assert units == [
+        (0, 1, analyze(sections[0:1])),
+        (1, 2, None),
+        (2, 3, analyze(sections[2:3])),
+        (3, 4, None),
+    ]
+
+def test_consecutive_changed_sections_are_packed_by_budget():
+    sections = page('A', 'B', 'C', 'D')
+    units, _ = run(sections, budget=8)
+    assert all(analyzed is None for _, _, analyzed in units)
+    # Cada unidad empieza donde terminó la anterior y se cubren todas las secciones
+    assert units[0][0] == 0 and units[-1][1] == len(sections)
+    assert all(a[1] == b[0] for a, b in zip(units, units[1:]))
+    assert len(units) > 1
+
+def test_failed_units_are_not_reused():
+    sections = page('A', 'B')
+    fingerprints, units = plan_units(sections)
+    records = unit_records(sections, fingerprints, units, [None])
+    assert records == [[fingerprints, None]]
+    assert plan_units(sections, records)[1] == [(0, 2, None)]
+
+def test_result_without_headings_is_reused_only_as_a_whole():
+    sections = page('A', 'B')
+    fingerprints, units = plan_units(sections)
+    records = unit_records(sections, fingerprints, units, ['Resumen sin encabezados'])
+    assert records == [[fingerprints, 'Resumen sin encabezados']]
+
+    assert plan_units(sections, records)[1] == [(0, 2, 'Resumen sin encabezados')]
+    # Si cambia una de las secciones no hay nada que reusar
+    assert plan_units(page('A', 'B', changed={'B'}), records)[1] == [(0, 2, None)]
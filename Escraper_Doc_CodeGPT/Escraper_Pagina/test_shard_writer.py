@@ -0,0 +1,37 @@
+import os
+from shard_writer import ShardWriter, load_manifest, read_record
+
+def shards(output_dir):
+    return sorted(name for name in os.listdir(output_dir) if name.endswith('.txt'))
+
+def test_compact_keeps_the_latest_record_of_each_url(tmp_path):
+    output_dir = str(tmp_path)
+    writer = ShardWriter(output_dir, 'crawl', max_bytes=100)
+    for i in range(8):
+        writer.write(f"u{i}", f"page {i} version 1 " * 2)
+    writer.close()
+    # Un recrawl incremental sigue en el último archivo y agrega al final las versiones nuevas
+    writer = ShardWriter(output_dir, 'crawl', max_bytes=100)
+    writer.file_counter = len(shards(output_dir))
+    writer.write("u2", "page 2 version 2")
+    writer.write("u5", "page 5 version 2")
+    writer.close()
+    before = shards(output_dir)
+
+    assert writer.compact()
+    assert not writer.compact()
+
+    entries = load_manifest(writer.manifest_path)
+    with open(writer.manifest_path, encoding='utf-8') as f:
+        assert sum(1 for line in f if line.strip()) == 8
+    assert read_record(output_dir, entries['u2']) == "page 2 version 2"
+    assert read_record(output_dir, entries['u0']) == "page 0 version 1 " * 2
+    text = "".join(open(os.path.join(output_dir, name), encoding='utf-8').read() for name in shards(output_dir))
+    assert "page 2 version 1" not in text and "page 5 version 1" not in text
+    assert len(shards(output_dir)) <= len(before)
+    assert not os.path.exists(os.path.join(output_dir, '.crawl_compact'))
+
+    # La escritura sigue en el último archivo compactado
+    writer.write("u8", "page 8 version 1")
+    writer.close()
+    assert read_record(output_dir, load_manifest(writer.manifest_path)['u8']) == "page 8 version 1"
@@ -0,0 +1,66 @@
+import csv
+from tables import TableSink, build_grid, span, structure_table, MAX_SPAN
+
+def test_rowspan_and_colspan_fill_every_position_they_cover():
+    rows = [
+        [('A', 3, 1), ('B', 2, 2)],
+        [('C', 1, 1)],
+        [('D', 1, 1), ('E', 1, 1)],
+        [('F', 1, 3)],
+    ]
+    assert build_grid(rows) == [
+        ['A', 'B', 'B', ''],
+        ['A', 'B', 'B', 'C'],
+        ['A', 'D', 'E', ''],
+        ['F', 'F', 'F', ''],
+    ]
+
+def test_cells_skip_positions_taken_by_rowspans_from_above():
+    rows = [
+        [('x', 1, 1), ('tall', 2, 1), ('y', 1, 1)],
+        [('left', 1, 1), ('right', 1, 1)],
+        [],
+        [('only', 1, 1)],
+    ]
+    # La fila vacía se descarta
+    assert build_grid(rows) == [
+        ['x', 'tall', 'y'],
+        ['left', 'tall', 'right'],
+        ['only', '', ''],
+    ]
+
+def test_span_values_are_clamped():
+    assert [span(value) for value in ('2', ' 3 ', '0', '', None, 'x', '-4')] == [2, 3, 1, 1, 1, 1, 1]
+    assert span('100000') == MAX_SPAN
+
+def test_structure_table_detects_header_and_types():
+    grid = [['Plan', 'Precio', 'Desde'], ['Básico', '10', '2024-01-01'], ['Pro', '12,5', '2024-02-01']]
+    assert structure_table(grid) == {
+        'columns': ['Plan', 'Precio', 'Desde'],
+        'types': ['string', 'number', 'date'],
+        'rows': grid[1:],
+    }
+
+def test_grouped_header_names_join_the_header_rows():
+    grid = build_grid([
+        [('Plan', 2, 1), ('Precio', 1, 2)],
+        [('Mensual', 1, 1), ('Anual', 1, 1)],
+        [('Pro', 1, 1), ('10', 1, 1), ('100', 1, 1)],
+    ])
+    assert structure_table(grid, header_rows=2)['columns'] == ['Plan', 'Precio / Mensual', 'Precio / Anual']
+
+def sidecar(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return [(row['url'], row['value']) for row in csv.DictReader(f)]
+
+def test_compact_drops_old_rows_of_rewritten_pages(tmp_path):
+    table = structure_table([['Nombre'], ['uno']], header_rows=1)
+    sink = TableSink(str(tmp_path), 'tablas')
+    sink.write('a', [table])
+    sink.write('b', [table])
+    sink.start_run()
+    # En la corrida nueva `a` cambia y `b` se guarda de nuevo sin tablas
+    sink.write('a', [structure_table([['Nombre'], ['dos']], header_rows=1)])
+    assert sink.compact({'a', 'b'})
+    sink.close()
+    assert sidecar(sink.path) == [('a', 'dos')]
@@ -1,6 +1,8 @@
 import streamlit as st
 import os
-from escrapeador import scrape_url, analyze_content, analyze_with_codegpt, extract_api_endpoints, extract_tables
+import requests
+from escrapeador import scrape_url, extract_page, stream_analysis
+from codegpt_stream import StreamMetrics
 
 # Configuración de la página de Streamlit
 st.set_page_config(page_title="Web Content Analyzer", page_icon="🌐", layout="wide")
@@ -11,6 +13,7 @@ st.markdown("Esta aplicación analiza el contenido de una página web, elimina e
 
 # Input para la URL
 url = st.text_input("Ingrese la URL de la página web a analizar:")
+bypass_cache = st.checkbox("Ignorar respuestas guardadas en caché", value=False)
 
 if st.button("Analizar"):
     if url:
@@ -18,26 +21,40 @@ if st.button("Analizar"):
             # Proceso de análisis
             html_content = scrape_url(url)
             if html_content:
-                filtered_content = analyze_content(html_content)
-                analyzed_content = analyze_with_codegpt(filtered_content)
+                filtered_content, api_endpoints, tables = extract_page(html_content, url)
+
+                # La respuesta se muestra a medida que llega
+                st.subheader("Contenido Analizado:")
+                live_output = st.empty()
+                metrics = StreamMetrics("app")
+                analyzed_content = ""
+                interrupted = False
+                try:
+                    for text in metrics.track(stream_analysis(filtered_content, bypass_cache=bypass_cache)):
+                        analyzed_content += text
+                        live_output.markdown(analyzed_content)
+                except requests.exceptions.RequestException:
+                    interrupted = True
                 
-                if analyzed_content:
+                if interrupted:
+                    # Lo que llegó queda a la vista, pero no se ofrece como resultado
+                    st.error("La respuesta de CodeGPT se interrumpió y el análisis quedó incompleto. "
+                             "Por favor, intente nuevamente.")
+                elif analyzed_content:
                     # Mostrar resultados
                     st.success("Análisis completado con éxito!")
+                    st.caption(f"Primer token en {metrics.ttfb:.2f} s, respuesta completa en {metrics.total:.2f} s")
                     
                     # Contenido principal
-                    st.subheader("Contenido Analizado:")
-                    st.text_area("", value=analyzed_content, height=300)
+                    live_output.text_area("", value=analyzed_content, height=300)
                     
                     # API Endpoints
-                    api_endpoints = extract_api_endpoints(html_content)
                     if api_endpoints:
                         st.subheader("API Endpoints:")
                         for endpoint in api_endpoints:
                             st.text(endpoint)
                     
                     # Tablas
-                    tables = extract_tables(html_content)
                     if tables:
                         st.subheader("Tablas Extraídas:")
                         for i, table in enumerate(tables, 1):
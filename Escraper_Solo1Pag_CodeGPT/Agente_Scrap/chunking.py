@@ -0,0 +1,114 @@
+import os
+import re
+
+# Presupuesto de tokens (estimados) por llamada a CodeGPT y llamadas en paralelo por página
+CHUNK_TOKENS = int(os.getenv('CHUNK_TOKENS', 3000))
+CHUNK_WORKERS = int(os.getenv('CHUNK_WORKERS', 4))
+
+# Aproximación sin tokenizer: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+HEADING_RE = re.compile(r'^#{1,6} ')
+FENCE = '```'
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def split_sections(markdown):
+    """Cortar el markdown en secciones que empiezan en cada encabezado.
+
+    Las líneas con '#' dentro de bloques de código no cuentan como encabezados.
+    """
+    sections = []
+    current = []
+    in_code = False
+    for line in markdown.split('\n'):
+        if line.strip().startswith(FENCE):
+            in_code = not in_code
+        elif not in_code and HEADING_RE.match(line) and any(part.strip() for part in current):
+            sections.append('\n'.join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append('\n'.join(current))
+    return sections
+
+def split_blocks(section):
+    """Bloques separados por líneas en blanco, sin partir bloques de código."""
+    blocks = []
+    current = []
+    in_code = False
+    for line in section.split('\n'):
+        if line.strip().startswith(FENCE):
+            in_code = not in_code
+        current.append(line)
+        if not in_code and not line.strip():
+            blocks.append('\n'.join(current))
+            current = []
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+def split_lines(block, budget):
+    """Último recurso para un bloque más grande que el presupuesto: cortar por líneas.
+
+    Si el corte cae dentro de un bloque de código, se cierra y se vuelve a abrir.
+    """
+    pieces = []
+    current = []
+    size = 0
+    in_code = False
+    for line in block.split('\n'):
+        line_tokens = estimate_tokens(line)
+        if current and size + line_tokens > budget:
+            if in_code:
+                current.append(FENCE)
+            pieces.append('\n'.join(current))
+            current = [FENCE] if in_code else []
+            size = 0
+        if line.strip().startswith(FENCE):
+            in_code = not in_code
+        current.append(line)
+        size += line_tokens
+    if current:
+        pieces.append('\n'.join(current))
+    return pieces
+
+def pack(parts, budget, separator):
+    """Juntar partes consecutivas mientras entren en el presupuesto."""
+    chunks = []
+    current = []
+    size = 0
+    for part in parts:
+        part_tokens = estimate_tokens(part)
+        if current and size + part_tokens > budget:
+            chunks.append(separator.join(current))
+            current = []
+            size = 0
+        current.append(part)
+        size += part_tokens
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+def chunk_markdown(markdown, budget=None):
+    """Partir el markdown en trozos de hasta `budget` tokens estimados, cortando en los encabezados.
+
+    Las secciones chicas se agrupan; una sección demasiado grande se corta por
+    párrafos y, si hace falta, por líneas. Unir los trozos con '\\n' devuelve el
+    texto original (salvo las vallas ``` agregadas al cortar un bloque de código).
+    """
+    budget = budget or CHUNK_TOKENS
+    if estimate_tokens(markdown) <= budget:
+        return [markdown]
+    parts = []
+    for section in split_sections(markdown):
+        if estimate_tokens(section) <= budget:
+            parts.append(section)
+            continue
+        for block in pack(split_blocks(section), budget, '\n'):
+            if estimate_tokens(block) <= budget:
+                parts.append(block)
+            else:
+                parts.extend(split_lines(block, budget))
+    return pack(parts, budget, '\n')
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from llm_limiter import (limiter, estimate_tokens, parse_retry_after, backoff_delay,
+                         THROTTLE_STATUSES, LLM_MAX_ATTEMPTS, LLM_READ_TIMEOUT)
+
+# Cuántas mediciones de llamadas en streaming se guardan en memoria
+STREAM_METRICS_HISTORY = int(os.getenv('STREAM_METRICS_HISTORY', 200))
+
+# Mediciones de las últimas llamadas, de la más vieja a la más nueva
+call_metrics = deque(maxlen=STREAM_METRICS_HISTORY)
+
+class StreamMetrics:
+    """Tiempo hasta el primer token (TTFB) y tiempo total de una respuesta, en segundos."""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.start = time.monotonic()
+        self.ttfb = None
+        self.total = None
+        self.pieces = 0
+        self.chars = 0
+
+    def token(self, text):
+        if self.ttfb is None:
+            self.ttfb = time.monotonic() - self.start
+        self.pieces += 1
+        self.chars += len(text)
+
+    def finish(self):
+        self.total = time.monotonic() - self.start
+        if self.ttfb is None:
+            self.ttfb = self.total
+
+    def track(self, pieces):
+        """Pasar los trozos de texto midiendo el primero y el final."""
+        for text in pieces:
+            self.token(text)
+            yield text
+        self.finish()
+
+    def summary(self):
+        return f"TTFB {self.ttfb:.2f} s, total {self.total:.2f} s"
+
+    def as_dict(self):
+        return {'label': self.label, 'ttfb': self.ttfb, 'total': self.total,
+                'pieces': self.pieces, 'chars': self.chars}
+
+def record(metrics):
+    call_metrics.append(metrics)
+    logging.info(f"CodeGPT stream{f' ({metrics.label})' if metrics.label else ''}: {metrics.summary()}, "
+                 f"{metrics.chars} chars in {metrics.pieces} pieces")
+
+class SSEParser:
+    """Parser incremental de server-sent events: se alimenta línea por línea."""
+
+    def __init__(self):
+        self.data = []
+
+    def feed(self, line):
+        """Procesar una línea (sin el salto); devuelve los datos del evento cuando una línea en blanco lo cierra."""
+        if not line:
+            data, self.data = self.data, []
+            return '\n'.join(data) if data else None
+        if line.startswith(':'):
+            return None
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'data':
+            self.data.append(value)
+        return None
+
+def choice_text(event):
+    """Texto de una respuesta o evento de CodeGPT (delta de chat, mensaje o completion)."""
+    if not isinstance(event, dict):
+        return ''
+    choice = (event.get('choices') or [{}])[0]
+    message = choice.get('delta') or choice.get('message') or {}
+    return message.get('content') or message.get('completion') or choice.get('text') or ''
+
+def event_text(data):
+    """Texto nuevo de un evento SSE; los datos que no son JSON se toman como texto."""
+    try:
+        return choice_text(json.loads(data))
+    except json.JSONDecodeError:
+        return data
+
+def is_done(data):
+    return data.strip() == '[DONE]'
+
+def response_pieces(response):
+    """Texto de una respuesta de requests a medida que llega (SSE, JSON completo o texto plano)."""
+    content_type = response.headers.get('Content-Type', '')
+    if 'text/event-stream' in content_type:
+        parser = SSEParser()
+        # SSE siempre es UTF-8; sin esto requests supone ISO-8859-1
+        response.encoding = 'utf-8'
+        for line in response.iter_lines(decode_unicode=True):
+            data = parser.feed(line)
+            if data is None:
+                continue
+            if is_done(data):
+                return
+            text = event_text(data)
+            if text:
+                yield text
+    elif 'application/json' in content_type:
+        # El servidor ignoró "stream": llega todo junto
+        text = choice_text(response.json())
+        if text:
+            yield text
+    else:
+        response.encoding = response.encoding or 'utf-8'
+        for text in response.iter_content(chunk_size=None, decode_unicode=True):
+            if text:
+                yield text
+
+async def async_response_pieces(response):
+    """Igual que `response_pieces` para una respuesta de aiohttp."""
+    content_type = response.headers.get('Content-Type', '')
+    if 'text/event-stream' in content_type:
+        parser = SSEParser()
+        async for raw in response.content:
+            data = parser.feed(raw.decode('utf-8').rstrip('\r\n'))
+            if data is None:
+                continue
+            if is_done(data):
+                return
+            text = event_text(data)
+            if text:
+                yield text
+    elif 'application/json' in content_type:
+        text = choice_text(await response.json(content_type=None))
+        if text:
+            yield text
+    else:
+        async for raw in response.content.iter_any():
+            text = raw.decode('utf-8', errors='replace')
+            if text:
+                yield text
+
+def stream_completion(url, headers, payload, label=None, max_attempts=None, timeout=None, metrics=None):
+    """Pedir una respuesta en streaming y entregar el texto a medida que llega.
+
+    La llamada ocupa un lugar del limitador compartido hasta terminar de
+    leerse. Los 429/5xx y errores de red antes de la respuesta se reintentan;
+    si no se puede, se lanza requests.RequestException. Los tiempos quedan en
+    `metrics` (si se pasa) y en `call_metrics`.
+    """
+    # Importados acá para que los llamadores asíncronos (aiohttp) no necesiten requests
+    import requests
+    from http_session import get_session, DEFAULT_TIMEOUT
+
+    payload = dict(payload, stream=True)
+    tokens = estimate_tokens(payload)
+    timeout = timeout or (DEFAULT_TIMEOUT[0], LLM_READ_TIMEOUT)
+    attempts = max_attempts or LLM_MAX_ATTEMPTS
+    metrics = metrics or StreamMetrics(label)
+    for attempt in range(attempts):
+        ticket = limiter.acquire(tokens)
+        try:
+            response = get_session(retries=False).post(url, headers=headers, json=payload, stream=True, timeout=timeout)
+        except requests.RequestException:
+            limiter.release(ticket, throttled=True)
+            if attempt == attempts - 1:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+        throttled = response.status_code in THROTTLE_STATUSES
+        if throttled and attempt < attempts - 1:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            response.close()
+            limiter.release(ticket, throttled=True, retry_after=retry_after)
+            time.sleep(backoff_delay(attempt, retry_after))
+            continue
+        try:
+            response.raise_for_status()
+            yield from metrics.track(response_pieces(response))
+        finally:
+            response.close()
+            limiter.release(ticket, throttled)
+        record(metrics)
+        return
+
+async def stream_completion_async(session, url, headers, payload, label=None, max_attempts=None, timeout=None,
+                                  metrics=None):
+    """Igual que `stream_completion` con una sesión de aiohttp; lanza aiohttp.ClientError si no se puede."""
+    import aiohttp
+
+    payload = dict(payload, stream=True)
+    tokens = estimate_tokens(payload)
+    timeout = timeout or aiohttp.ClientTimeout(sock_connect=10, sock_read=LLM_READ_TIMEOUT)
+    attempts = max_attempts or LLM_MAX_ATTEMPTS
+    metrics = metrics or StreamMetrics(label)
+    for attempt in range(attempts):
+        ticket = await limiter.acquire_async(tokens)
+        try:
+            response = await session.post(url, headers=headers, json=payload, timeout=timeout)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            limiter.release(ticket, throttled=True)
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        throttled = response.status in THROTTLE_STATUSES
+        if throttled and attempt < attempts - 1:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            response.release()
+            limiter.release(ticket, throttled=True, retry_after=retry_after)
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+            continue
+        try:
+            response.raise_for_status()
+            async for text in async_response_pieces(response):
+                metrics.token(text)
+                yield text
+            metrics.finish()
+        finally:
+            response.release()
+            limiter.release(ticket, throttled)
+        record(metrics)
+        return
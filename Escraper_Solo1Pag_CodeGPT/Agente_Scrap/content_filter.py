@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import logging
+from bisect import bisect_right
+from urllib.parse import urlparse
+
+# Archivo JSON con las reglas de filtrado por sitio (si no existe se usan las frases por defecto)
+FILTER_RULES = os.getenv('FILTER_RULES', 'filter_rules.json')
+
+# Frases que marcan un elemento como no-contenido (avisos de cookies, legales...)
+DEFAULT_EXCLUDE = (
+    "usamos cookies",
+    "mejorar tu experiencia",
+    "centro de privacidad",
+    "política de privacidad",
+    "términos y condiciones",
+    "aviso legal",
+)
+
+# Separa los textos de un lote; ninguna frase lo contiene, así que nada matchea entre dos elementos
+SEPARATOR = '\x00'
+
+def trie_pattern(phrases):
+    """Regex que reconoce cualquiera de las frases, armada como un trie.
+
+    Las frases que comparten prefijo comparten también el camino en la
+    regex, así que en cada posición del texto se prueba un carácter por
+    nivel en vez de cada frase por separado y el costo casi no crece con la
+    cantidad de reglas.
+    """
+    trie = {}
+    for phrase in phrases:
+        if not phrase:
+            continue
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return re.compile(build(trie)) if trie else None
+
+class ContentFilter:
+    """Decide qué elementos de una página se descartan por las frases que contienen.
+
+    Un elemento se descarta si contiene alguna frase de `exclude` (sin
+    importar mayúsculas) y ninguna de `include`. Las frases se compilan una
+    sola vez; `filter_batch` recorre todos los elementos de la página en una
+    pasada. Se puede usar directamente como `should_filter` de un texto.
+    """
+
+    def __init__(self, exclude=DEFAULT_EXCLUDE, include=()):
+        self.exclude = tuple(dict.fromkeys(phrase.lower() for phrase in exclude))
+        self.include = tuple(dict.fromkeys(phrase.lower() for phrase in include))
+        self.exclude_pattern = trie_pattern(self.exclude)
+        self.include_pattern = trie_pattern(self.include)
+
+    def __call__(self, text):
+        return self.filter_batch([text])[0]
+
+    def filter_batch(self, texts):
+        """Para cada texto, True si hay que descartarlo."""
+        if self.exclude_pattern is None or not texts:
+            return [False] * len(texts)
+        lowered = [text.lower() for text in texts]
+        dropped = set(matching_elements(self.exclude_pattern, lowered))
+        if dropped and self.include_pattern is not None:
+            dropped = {i for i in dropped if not self.include_pattern.search(lowered[i])}
+        return [i in dropped for i in range(len(texts))]
+
+def matching_elements(pattern, texts):
+    """Índices de los textos donde aparece el patrón, con una sola búsqueda sobre el lote unido."""
+    joined = SEPARATOR.join(texts)
+    starts = []
+    position = 0
+    for text in texts:
+        starts.append(position)
+        position += len(text) + 1
+    found = []
+    position = 0
+    while True:
+        match = pattern.search(joined, position)
+        if match is None:
+            break
+        i = bisect_right(starts, match.start()) - 1
+        found.append(i)
+        # Un match alcanza: se sigue desde el elemento siguiente
+        if i + 1 == len(starts):
+            break
+        position = starts[i + 1]
+    return found
+
+class FilterRules:
+    """Reglas de filtrado por sitio, compiladas una vez por host.
+
+    Formato del archivo (todas las claves son opcionales):
+
+        {"default": {"exclude": ["usamos cookies", ...], "include": []},
+         "sites": {"mercadopago.com.ar": {"exclude": ["..."], "include": ["..."], "inherit": true}}}
+
+    Un sitio se aplica a su host y a sus subdominios; con `inherit` (por
+    defecto) sus frases se suman a las de `default`.
+    """
+
+    def __init__(self, rules=None):
+        rules = rules or {}
+        default = rules.get('default', {})
+        self.exclude = list(default.get('exclude', DEFAULT_EXCLUDE))
+        self.include = list(default.get('include', []))
+        self.sites = {host.lower(): site for host, site in rules.get('sites', {}).items()}
+        self.filters = {}
+
+    def site_rules(self, host):
+        host = (host or '').lower()
+        for site in sorted(self.sites, key=len, reverse=True):
+            if host == site or host.endswith('.' + site):
+                return self.sites[site]
+        return None
+
+    def for_host(self, host):
+        if host not in self.filters:
+            site = self.site_rules(host)
+            exclude, include = self.exclude, self.include
+            if site is not None:
+                inherit = site.get('inherit', True)
+                exclude = (exclude if inherit else []) + list(site.get('exclude', []))
+                include = (include if inherit else []) + list(site.get('include', []))
+            self.filters[host] = ContentFilter(exclude, include)
+        return self.filters[host]
+
+    def for_url(self, url):
+        return self.for_host(urlparse(url).netloc if url else None)
+
+def load_rules(path=None):
+    """Reglas del archivo `path` (o FILTER_RULES); si no existe, las frases por defecto."""
+    path = path or FILTER_RULES
+    if not os.path.exists(path):
+        if path != FILTER_RULES or 'FILTER_RULES' in os.environ:
+            logging.warning(f"Filter rules file {path} not found, using the default phrases")
+        return FilterRules()
+    try:
+        with open(path, encoding='utf-8') as f:
+            rules = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not read filter rules from {path}: {e}, using the default phrases")
+        return FilterRules()
+    logging.info(f"Filter rules loaded from {path} ({len(rules.get('sites', {}))} sites)")
+    return FilterRules(rules)
@@ -1,11 +1,19 @@
 import os
-from bs4 import BeautifulSoup
 import logging
-import re
 import requests
-import time
 import json
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from http_cache import HTTPCache
+from page_fetch import SkipPage, fetch_text
+from llm_limiter import limiter
+from codegpt_stream import stream_completion
+from chunking import chunk_markdown, CHUNK_WORKERS
+from llm_cache import LLMCache, cache_key
+from content_filter import load_rules
+from record_store import RecordWriter, record_path, page_record, timed
+from extraction import (parse_html, run_extractors, extract_all,
+                        ContentExtractor, EndpointExtractor, TableExtractor)
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,10 +25,29 @@ load_dotenv()
 CODEGPT_API_KEY = os.getenv('CODEGPT_API_KEY')
 AGENT_ID = os.getenv('AGENT_ID')
 
-def clean_text(text):
-    text = text.strip()
-    text = re.sub(r'\s+', ' ', text)
-    return text
+# Se puede apuntar a un servidor local (por ejemplo codegpt_sim) con CODEGPT_API_BASE o con la URL completa
+CODEGPT_API_BASE = os.getenv('CODEGPT_API_BASE', "https://api.codegpt.co")
+CODEGPT_API_URL = os.getenv('CODEGPT_API_URL', f"{CODEGPT_API_BASE}/api/v1/chat/completions")
+
+# Formato de los resultados: resultados_analisis.txt (text) o un registro por página
+# en resultados_analisis.jsonl.gz/.zst con su índice (jsonl, ver OUTPUT_COMPRESSION)
+OUTPUT_FORMAT = os.getenv('OUTPUT_FORMAT', 'text')
+RESULTS_NAME = "resultados_analisis"
+
+# Hilos para mandar en paralelo los trozos de una página grande
+chunk_executor = ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="chunk")
+
+# Caché HTTP en disco con revalidación (USE_HTTP_CACHE=0 para desactivarla)
+http_cache = HTTPCache() if os.getenv('USE_HTTP_CACHE', '1') != '0' else None
+
+# Caché de respuestas de CodeGPT (USE_LLM_CACHE=0 para desactivarla)
+llm_cache = LLMCache() if os.getenv('USE_LLM_CACHE', '1') != '0' else None
+
+# Frases que descartan elementos de la página, por sitio (ver FILTER_RULES en content_filter)
+filter_rules = load_rules()
+
+def should_filter_text(text, url=None):
+    return filter_rules.for_url(url)(text)
 
 def scrape_url(url):
     try:
@@ -28,59 +55,32 @@ def scrape_url(url):
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+        text = fetch_text(url, headers, http_cache)
+        if http_cache is not None:
+            http_cache.log_stats()
         logging.info("Successfully scraped URL")
-        return response.text
+        return text
+    except SkipPage as e:
+        logging.error(f"Skipping URL: {e.reason}")
+        return ""
     except requests.exceptions.RequestException as e:
         logging.error(f"Error scraping URL: {e}")
         return ""
 
 def analyze_content(html_content):
     logging.info("Analyzing HTML content")
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Eliminar elementos no deseados
-    for tag in soup(['header', 'footer', 'nav', 'script', 'style', 'meta', 'link', 'noscript', 'iframe', 'object', 'embed']):
-        tag.decompose()
-    
-    # Lista de frases o palabras clave a filtrar
-    phrases_to_filter = [
-        "usamos cookies",
-        "mejorar tu experiencia",
-        "centro de privacidad",
-        "política de privacidad",
-        "términos y condiciones",
-        "aviso legal",
-    ]
-    
-    content = []
-    for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'pre', 'code']):
-        text = element.text.strip()
-        
-        # Verificar si el texto contiene alguna de las frases a filtrar
-        if not any(phrase in text.lower() for phrase in phrases_to_filter):
-            if element.name.startswith('h'):
-                level = int(element.name[1])
-                prefix = '#' * level
-                content.append(f"\n{prefix} {text}\n")
-            elif element.name in ['pre', 'code']:
-                content.append(f"\n```\n{text}\n```\n")
-            else:
-                content.append(clean_text(text))
-   
-    text_content = "\n".join(content)
-   
+    text_content = run_extractors(parse_html(html_content), [ContentExtractor(filter_rules.for_url(None))])[0]
     logging.info("Finished analyzing HTML content")
     return text_content
 
-def analyze_with_codegpt(content):
-    headers = {
+def codegpt_headers():
+    return {
         "Authorization": f"Bearer {CODEGPT_API_KEY}",
         "Content-Type": "application/json"
     }
-   
-    prompt = (
+
+def build_prompt(content):
+    return (
         "Extract and return only the main content from the following text. "
         "Preserve all headings, subheadings, and their hierarchy exactly as they appear. "
         "Keep all technical details, examples, and code snippets intact. "
@@ -88,97 +88,178 @@ def analyze_with_codegpt(content):
         "Do not summarize, translate, or alter any information, including headings and code examples:\n\n"
         + content
     )
+
+def analyze_chunk_with_codegpt(content, bypass_cache=False):
+    headers = codegpt_headers()
+    prompt = build_prompt(content)
+
+    key = None
+    if llm_cache is not None:
+        key = cache_key(CODEGPT_API_URL, AGENT_ID, None, prompt)
+        cached = None if bypass_cache else llm_cache.get(key)
+        if cached is not None:
+            logging.info("CodeGPT response served from cache")
+            return cached
    
-    for attempt in range(3):
+    try:
+        logging.info("Analyzing with CodeGPT")
+        # Reintentos, backoff y concurrencia quedan a cargo del limitador compartido
+        response = limiter.post(
+            CODEGPT_API_URL,
+            headers=headers,
+            json={
+                "agent": AGENT_ID,
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ]
+            }
+        )
+       
+        response.raise_for_status()
+       
+        if not response.text.strip():
+            return ""
+       
         try:
-            logging.info(f"Attempt {attempt + 1} to analyze with CodeGPT")
-            response = requests.post(
-                "https://api.codegpt.co/api/v1/chat/completions",
-                headers=headers,
-                json={
-                    "agent": AGENT_ID,
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ]
-                }
-            )
-           
-            response.raise_for_status()
-           
-            if not response.text.strip():
-                return ""
-           
-            try:
-                json_response = response.json()
-                analyzed_content = json_response['choices'][0]['message']['content']
-            except json.JSONDecodeError:
-                analyzed_content = response.text
-           
-            if not analyzed_content.strip():
-                return ""
-           
-            return analyzed_content
+            json_response = response.json()
+            analyzed_content = json_response['choices'][0]['message']['content']
+        except json.JSONDecodeError:
+            analyzed_content = response.text
        
-        except requests.exceptions.RequestException:
-            if attempt < 2:
-                time.sleep(2)
-            else:
-                return ""
-        except KeyError:
+        if not analyzed_content.strip():
             return ""
+
+        if key is not None:
+            llm_cache.put(key, analyzed_content)
+        return analyzed_content
    
-    return ""
+    except requests.exceptions.RequestException:
+        return ""
+    except KeyError:
+        return ""
+
+def analyze_with_codegpt(content, bypass_cache=False):
+    """Analizar el contenido con CodeGPT, por secciones y en paralelo si no entra en una llamada."""
+    chunks = chunk_markdown(content)
+    if len(chunks) == 1:
+        return analyze_chunk_with_codegpt(content, bypass_cache)
+
+    logging.info(f"Content split into {len(chunks)} chunks for CodeGPT")
+    results = list(chunk_executor.map(lambda chunk: analyze_chunk_with_codegpt(chunk, bypass_cache), chunks))
+    if not any(results):
+        return ""
+    analyzed = []
+    for i, (chunk, result) in enumerate(zip(chunks, results), 1):
+        if not result:
+            logging.warning(f"Chunk {i}/{len(chunks)} could not be analyzed, keeping its original text")
+            result = chunk
+        analyzed.append(result)
+    return "\n\n".join(analyzed)
+
+def stream_chunk_with_codegpt(content, bypass_cache=False):
+    """Texto de la respuesta de CodeGPT para un trozo, a medida que llega.
+
+    Si la llamada falla antes del primer texto no se entrega nada; si se
+    corta después, se lanza la excepción para que la respuesta parcial no
+    pase por completa. Solo una respuesta terminada se guarda en la caché.
+    """
+    prompt = build_prompt(content)
+    key = None
+    if llm_cache is not None:
+        key = cache_key(CODEGPT_API_URL, AGENT_ID, None, prompt)
+        cached = None if bypass_cache else llm_cache.get(key)
+        if cached is not None:
+            logging.info("CodeGPT response served from cache")
+            yield cached
+            return
+
+    pieces = []
+    try:
+        for text in stream_completion(CODEGPT_API_URL, codegpt_headers(),
+                                      {"agent": AGENT_ID, "messages": [{"role": "user", "content": prompt}]},
+                                      label="escrapeador"):
+            pieces.append(text)
+            yield text
+    except requests.exceptions.RequestException as e:
+        logging.error(f"CodeGPT streaming failed: {e}")
+        if pieces:
+            raise
+        return
+
+    analyzed_content = "".join(pieces)
+    if key is not None and analyzed_content.strip():
+        llm_cache.put(key, analyzed_content)
+
+def stream_analysis(content, bypass_cache=False):
+    """Como analyze_with_codegpt, pero entregando el texto a medida que llega.
+
+    El primer trozo se transmite en vivo mientras los siguientes se analizan
+    en paralelo; se entregan en orden al terminar el anterior. Si el primer
+    trozo se corta a mitad de la respuesta se lanza
+    requests.RequestException y los demás se cancelan.
+    """
+    chunks = chunk_markdown(content)
+    rest = [chunk_executor.submit(analyze_chunk_with_codegpt, chunk, bypass_cache) for chunk in chunks[1:]]
+
+    streamed = False
+    try:
+        for text in stream_chunk_with_codegpt(chunks[0], bypass_cache):
+            streamed = True
+            yield text
+    except requests.exceptions.RequestException:
+        for future in rest:
+            future.cancel()
+        raise
+    if not streamed and rest:
+        logging.warning(f"Chunk 1/{len(chunks)} could not be analyzed, keeping its original text")
+        yield chunks[0]
+
+    for i, (chunk, future) in enumerate(zip(chunks[1:], rest), 2):
+        result = future.result()
+        if not result:
+            logging.warning(f"Chunk {i}/{len(chunks)} could not be analyzed, keeping its original text")
+            result = chunk
+        yield "\n\n" + result
 
 def extract_api_endpoints(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    endpoints = []
-    # Buscar endpoints en elementos <strong>
-    strong_tags = soup.find_all('strong')
-    for tag in strong_tags:
-        if re.search(r'https?://api\.', tag.text):
-            endpoints.append(tag.text.strip())
-    # Buscar endpoints en celdas de tabla
-    tables = soup.find_all('table')
-    for table in tables:
-        rows = table.find_all('tr')
-        for row in rows:
-            cells = row.find_all('td')
-            for cell in cells:
-                if re.search(r'/[a-zA-Z0-9_/]+', cell.text):
-                    endpoints.append(cell.text.strip())
-    return endpoints
+    return run_extractors(parse_html(html_content), [EndpointExtractor()])[0]
 
 def extract_tables(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    tables = soup.find_all('table')
-    extracted_tables = []
-    for table in tables:
-        table_data = []
-        rows = table.find_all('tr')
-        for row in rows:
-            cells = row.find_all(['th', 'td'])
-            row_data = [cell.text.strip() for cell in cells]
-            table_data.append(row_data)
-        extracted_tables.append(table_data)
-    return extracted_tables
+    return run_extractors(parse_html(html_content), [TableExtractor()])[0]
+
+def extract_page(html_content, url=None):
+    """Contenido filtrado (con las reglas del sitio de `url`), endpoints y tablas con un único parseo del HTML."""
+    logging.info("Analyzing HTML content")
+    filtered_content, api_endpoints, tables, _ = extract_all(html_content, should_filter=filter_rules.for_url(url))
+    logging.info("Finished analyzing HTML content")
+    return filtered_content, api_endpoints, tables
+
+def save_record(url, analyzed_content, api_endpoints, tables, source=None, timings=None):
+    """Agregar el resultado de la página al JSONL comprimido de resultados; devuelve su ruta."""
+    writer = RecordWriter(record_path(".", RESULTS_NAME))
+    writer.write(url, page_record(url, analyzed_content, api_endpoints, tables, source, timings))
+    writer.close()
+    return writer.path
 
 def analyze_webpage(url):
-    html_content = scrape_url(url)
+    timings = {}
+    html_content = timed(timings, 'fetch', scrape_url, url)
     if html_content:
-        filtered_content = analyze_content(html_content)
-        analyzed_content = analyze_with_codegpt(filtered_content)
+        filtered_content, api_endpoints, tables = timed(timings, 'extract', extract_page, html_content, url)
+        analyzed_content = timed(timings, 'llm', analyze_with_codegpt, filtered_content)
         
-        if analyzed_content:
+        if analyzed_content and OUTPUT_FORMAT == 'jsonl':
+            path = save_record(url, analyzed_content, api_endpoints, tables, filtered_content, timings)
+            logging.info(f"Resultados guardados en '{path}'")
+        elif analyzed_content:
             result = analyzed_content + "\n\n"
             
-            api_endpoints = extract_api_endpoints(html_content)
             if api_endpoints:
                 result += "API Endpoints:\n"
                 for endpoint in api_endpoints:
                     result += endpoint + "\n"
                 result += "\n"
             
-            tables = extract_tables(html_content)
             if tables:
                 result += "Tablas Extraídas:\n"
                 for i, table in enumerate(tables, 1):
@@ -0,0 +1,273 @@
+import re
+from urllib.parse import urljoin
+from bs4 import Tag
+from html_backend import resolve_backend, make_soup
+from tables import span, build_grid, structure_table
+
+# Etiquetas cuyo contenido no forma parte del texto principal de la página
+REMOVED_TAGS = {'header', 'footer', 'nav', 'script', 'style', 'meta', 'link', 'noscript', 'iframe', 'object', 'embed'}
+
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+# Etiquetas que se quitan del árbol antes de extraer: su texto no es contenido ni dentro de otro
+# elemento, y no todos los backends lo excluyen del texto (html5lib y selectolax lo incluyen)
+STRIPPED_TAGS = ('script', 'style', 'template')
+
+def clean_text(text):
+    # Eliminar espacios en blanco extra al principio y al final
+    text = text.strip()
+    # Reemplazar múltiples espacios en blanco con un solo espacio
+    text = re.sub(r'\s+', ' ', text)
+    return text
+
+class ContentExtractor:
+    """Texto principal en markdown: encabezados, párrafos y bloques de código.
+
+    `should_filter` descarta elementos por su texto: una función que recibe
+    un texto o un objeto con `filter_batch` (como content_filter.ContentFilter),
+    que decide sobre todos los elementos de la página de una vez. Con
+    `as_blocks=True` el resultado es la lista de bloques sin unir.
+    """
+
+    tags = HEADING_TAGS | {'p', 'pre', 'code'}
+    leave_tags = set()
+
+    def __init__(self, should_filter=None, as_blocks=False):
+        self.should_filter = should_filter
+        self.as_blocks = as_blocks
+        self.elements = []
+
+    def enter(self, element, removed):
+        # Lo que está dentro de header/nav/footer/... no es contenido
+        if removed:
+            return
+        self.elements.append((element.name, element.text.strip()))
+
+    def filtered(self):
+        texts = [text for _, text in self.elements]
+        if not self.should_filter:
+            return [False] * len(texts)
+        if hasattr(self.should_filter, 'filter_batch'):
+            return self.should_filter.filter_batch(texts)
+        return [self.should_filter(text) for text in texts]
+
+    def result(self):
+        content = []
+        for (name, text), drop in zip(self.elements, self.filtered()):
+            if drop:
+                continue
+            if name in HEADING_TAGS:
+                prefix = '#' * int(name[1])
+                content.append(f"\n{prefix} {text}\n")
+            elif name in ('pre', 'code'):
+                content.append(f"\n```\n{text}\n```\n")
+            else:
+                content.append(clean_text(text))
+        if self.as_blocks:
+            return content
+        return "\n".join(content)
+
+class EndpointExtractor:
+    """URLs de API en <strong> y rutas en celdas <td> de tablas."""
+
+    tags = {'strong', 'td', 'table'}
+    leave_tags = {'table'}
+
+    def __init__(self):
+        self.strong = []
+        self.cells = []
+        self.open_tables = 0
+
+    def enter(self, element, removed):
+        if element.name == 'table':
+            self.open_tables += 1
+        elif element.name == 'strong':
+            if re.search(r'https?://api\.', element.text):
+                self.strong.append(element.text.strip())
+        elif self.open_tables and re.search(r'/[a-zA-Z0-9_/]+', element.text):
+            self.cells.append(element.text.strip())
+
+    def leave(self, element):
+        self.open_tables -= 1
+
+    def result(self):
+        return self.strong + self.cells
+
+class TableExtractor:
+    """Cada <table> como grilla de filas con el texto de sus celdas.
+
+    Las celdas con rowspan/colspan se repiten en cada posición que cubren.
+    Con `structured` cada tabla es un dict de tables.structure_table, con
+    las filas de encabezado separadas y el tipo inferido de cada columna.
+    """
+
+    tags = {'table', 'thead', 'tr', 'th', 'td'}
+    leave_tags = {'table', 'thead'}
+
+    def __init__(self, structured=False):
+        self.structured = structured
+        self.tables = []
+        self.stack = []
+
+    def enter(self, element, removed):
+        if element.name == 'table':
+            table = {'rows': [], 'head': [], 'thead': 0}
+            self.tables.append(table)
+            self.stack.append(table)
+        elif not self.stack:
+            return
+        elif element.name == 'thead':
+            self.stack[-1]['thead'] += 1
+        elif element.name == 'tr':
+            table = self.stack[-1]
+            table['rows'].append([])
+            table['head'].append(bool(table['thead']))
+        elif self.stack[-1]['rows']:
+            # Las filas y celdas pertenecen a la tabla más interna que las contiene
+            table = self.stack[-1]
+            table['rows'][-1].append((element.text.strip(), span(element.get('rowspan', 1)),
+                                      span(element.get('colspan', 1))))
+            if element.name == 'td':
+                table['head'][-1] = table['head'][-1] and table['thead'] > 0
+            elif len(table['rows'][-1]) == 1 and not table['thead']:
+                # Una fila que empieza con <th> es de encabezado mientras no aparezca un <td>
+                table['head'][-1] = True
+
+    def leave(self, element):
+        if element.name == 'thead':
+            self.stack[-1]['thead'] -= 1
+        else:
+            self.stack.pop()
+
+    def header_rows(self, table):
+        count = 0
+        for cells, head in zip(table['rows'], table['head']):
+            if not head:
+                break
+            count += bool(cells)
+        return count
+
+    def result(self):
+        tables = []
+        for table in self.tables:
+            grid = build_grid(table['rows'])
+            tables.append(structure_table(grid, self.header_rows(table)) if self.structured else grid)
+        return tables
+
+class LinkExtractor:
+    """Enlaces absolutos que acepta `accept(url)` (todos si no se indica)."""
+
+    tags = {'a'}
+    leave_tags = set()
+
+    def __init__(self, base_url, accept=None):
+        self.base_url = base_url
+        self.accept = accept
+        self.links = []
+
+    def enter(self, element, removed):
+        # Los enlaces de header/nav también cuentan para descubrir páginas
+        href = element.get('href')
+        if href is None:
+            return
+        full_url = urljoin(self.base_url, href)
+        if self.accept is None or self.accept(full_url):
+            self.links.append(full_url)
+
+    def result(self):
+        return self.links
+
+class LexborElement:
+    """Nodo de selectolax con la parte de la interfaz de Tag que usan los extractores."""
+
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def name(self):
+        return self.node.tag
+
+    @property
+    def text(self):
+        return self.node.text(deep=True)
+
+    def get(self, attribute, default=None):
+        return self.node.attributes.get(attribute, default)
+
+def parse_html(html_content, backend=None):
+    """Árbol de la página con el backend configurado en html_backend.HTML_PARSER, sin STRIPPED_TAGS."""
+    backend = resolve_backend(backend)
+    if backend == 'selectolax':
+        from selectolax.lexbor import LexborHTMLParser
+        tree = LexborHTMLParser(html_content)
+        tree.strip_tags(list(STRIPPED_TAGS))
+        return tree
+    soup = make_soup(html_content, backend)
+    for tag in soup.find_all(STRIPPED_TAGS):
+        tag.decompose()
+    return soup
+
+def run_extractors(document, extractors):
+    """Recorrer el árbol una sola vez, en orden de documento, pasando cada etiqueta a sus extractores.
+
+    El árbol no se modifica: los extractores reciben `removed=True` dentro de
+    las etiquetas de REMOVED_TAGS y deciden si las ignoran.
+    """
+    by_tag = {}
+    for extractor in extractors:
+        for name in extractor.tags:
+            by_tag.setdefault(name, []).append(extractor)
+    leave_tags = set().union(*(extractor.leave_tags for extractor in extractors))
+
+    if isinstance(document, Tag):
+        def tag_name(node):
+            return node.name
+        def children(node):
+            return [child for child in node.contents if isinstance(child, Tag)]
+        def wrap(node):
+            return node
+        roots = children(document)
+    else:
+        # selectolax: los nodos se envuelven solo si algún extractor los pide
+        def tag_name(node):
+            return node.tag
+        def children(node):
+            return list(node.iter(include_text=False))
+        wrap = LexborElement
+        roots = [document.root] if document.root is not None else []
+
+    stack = [(root, tag_name(root) in REMOVED_TAGS) for root in reversed(roots)]
+    while stack:
+        node, removed = stack.pop()
+        name = tag_name(node)
+        if removed is None:
+            # Marca de salida de una etiqueta
+            element = wrap(node)
+            for extractor in by_tag[name]:
+                if name in extractor.leave_tags:
+                    extractor.leave(element)
+            continue
+        interested = by_tag.get(name)
+        if interested:
+            element = wrap(node)
+            for extractor in interested:
+                extractor.enter(element, removed)
+        if name in leave_tags:
+            stack.append((node, None))
+        for child in reversed(children(node)):
+            stack.append((child, removed or tag_name(child) in REMOVED_TAGS))
+    return [extractor.result() for extractor in extractors]
+
+def extract_all(html_content, base_url=None, accept_link=None, should_filter=None, backend=None, as_blocks=False,
+                structured_tables=False):
+    """Parsear una vez y obtener contenido, endpoints, tablas y enlaces de la página."""
+    soup = parse_html(html_content, backend)
+    extractors = [ContentExtractor(should_filter, as_blocks), EndpointExtractor(), TableExtractor(structured_tables)]
+    if base_url is not None:
+        extractors.append(LinkExtractor(base_url, accept_link))
+    results = run_extractors(soup, extractors)
+    if base_url is None:
+        results.append([])
+    return tuple(results)
@@ -0,0 +1,50 @@
+import os
+import logging
+import importlib.util
+from bs4 import BeautifulSoup
+
+# Backend de parseo HTML para todo el módulo: html.parser, lxml, html5lib o selectolax
+HTML_PARSER = os.getenv('HTML_PARSER', 'html.parser')
+
+# Backends de BeautifulSoup: sirven para extraer y también para modificar y serializar el árbol
+SOUP_BACKENDS = ('html.parser', 'lxml', 'html5lib')
+# Backends rápidos que solo sirven para extraer (no producen un árbol de BeautifulSoup)
+FAST_BACKENDS = ('selectolax',)
+
+BACKEND_MODULES = {
+    'html.parser': None,
+    'lxml': 'lxml',
+    'html5lib': 'html5lib',
+    'selectolax': 'selectolax.lexbor',
+}
+
+warned = set()
+
+def backend_available(backend):
+    if backend not in BACKEND_MODULES:
+        return False
+    module = BACKEND_MODULES[backend]
+    return module is None or importlib.util.find_spec(module.split('.')[0]) is not None
+
+def available_backends():
+    return [backend for backend in BACKEND_MODULES if backend_available(backend)]
+
+def resolve_backend(backend=None):
+    """Backend a usar: el pedido si está instalado, si no html.parser."""
+    backend = backend or HTML_PARSER
+    if not backend_available(backend):
+        if backend not in warned:
+            logging.warning(f"HTML parser backend '{backend}' is not available, using html.parser")
+            warned.add(backend)
+        return 'html.parser'
+    return backend
+
+def soup_backend(backend=None):
+    """Builder de BeautifulSoup para quien necesita modificar o serializar el árbol."""
+    backend = resolve_backend(backend)
+    if backend in FAST_BACKENDS:
+        return 'lxml' if backend_available('lxml') else 'html.parser'
+    return backend
+
+def make_soup(markup, backend=None):
+    return BeautifulSoup(markup, soup_backend(backend))
@@ -0,0 +1,77 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Conexiones keep-alive por host y cantidad de hosts con pool propio
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 16))
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 10))
+
+# Política única de reintentos: backoff exponencial (0.5 s, 1 s, 2 s...) respetando Retry-After
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', 0.5))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Timeout por defecto (conexión, lectura) en segundos
+DEFAULT_TIMEOUT = (10, 60)
+
+# Sesiones compartidas: con los reintentos de retry_policy (True) y sin reintentos de urllib3 (False)
+sessions = {}
+session_lock = threading.Lock()
+
+def retry_policy():
+    # Los errores de conexión se reintentan siempre (la solicitud no llegó a
+    # enviarse); los de estado y lectura solo en métodos idempotentes, así un
+    # POST a CodeGPT no se repite a ciegas
+    return Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=HTTP_RETRIES,
+        status=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+def create_session(pool_maxsize=HTTP_POOL_MAXSIZE, pool_connections=HTTP_POOL_CONNECTIONS, retries=True):
+    new_session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          max_retries=retry_policy() if retries else 0)
+    new_session.mount('http://', adapter)
+    new_session.mount('https://', adapter)
+    return new_session
+
+def get_session(retries=True):
+    """Sesión compartida por todos los hilos del proceso.
+
+    El pool de urllib3 es thread-safe; la sesión no se modifica después de
+    crearla (las cabeceras van en cada solicitud), así que los hilos de un
+    ThreadPoolExecutor pueden usarla a la vez. Con `retries=False` es la
+    sesión sin reintentos de urllib3, para las llamadas que ya reintenta el
+    limitador de CodeGPT: así cada 429/5xx y cada error de conexión le llega
+    y el backoff no se suma dos veces.
+    """
+    session = sessions.get(retries)
+    if session is None:
+        with session_lock:
+            session = sessions.get(retries)
+            if session is None:
+                session = sessions[retries] = create_session(HTTP_POOL_MAXSIZE, HTTP_POOL_CONNECTIONS, retries)
+    return session
+
+def configure(pool_maxsize=None, pool_connections=None):
+    """Cambiar el tamaño de los pools; se aplica a la próxima sesión creada."""
+    global HTTP_POOL_MAXSIZE, HTTP_POOL_CONNECTIONS
+    with session_lock:
+        if pool_maxsize:
+            HTTP_POOL_MAXSIZE = pool_maxsize
+        if pool_connections:
+            HTTP_POOL_CONNECTIONS = pool_connections
+        old = list(sessions.values())
+        for retries in sessions:
+            sessions[retries] = create_session(HTTP_POOL_MAXSIZE, HTTP_POOL_CONNECTIONS, retries)
+    for session in old:
+        session.close()
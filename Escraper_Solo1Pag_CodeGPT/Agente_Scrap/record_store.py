@@ -0,0 +1,256 @@
+import os
+import gzip
+import json
+import mmap
+import time
+import hashlib
+import logging
+import importlib.util
+from functools import lru_cache
+
+# Compresión de la salida estructurada: gzip (siempre disponible) o zstd (paquete zstandard)
+OUTPUT_COMPRESSION = os.getenv('OUTPUT_COMPRESSION', 'gzip')
+
+# Bytes de JSONL (sin comprimir) por frame: frames más grandes comprimen mejor,
+# más chicos hacen más barato leer un solo registro
+OUTPUT_FRAME_BYTES = int(os.getenv('OUTPUT_FRAME_BYTES', 256 * 1024))
+
+EXTENSIONS = {'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+warned = set()
+
+def compression_available(compression):
+    return compression == 'gzip' or (compression == 'zstd' and importlib.util.find_spec('zstandard') is not None)
+
+def resolve_compression(compression=None):
+    """Compresión a usar: la pedida si está instalada, si no gzip."""
+    compression = compression or OUTPUT_COMPRESSION
+    if not compression_available(compression):
+        if compression not in warned:
+            logging.warning(f"Output compression '{compression}' is not available, using gzip")
+            warned.add(compression)
+        return 'gzip'
+    return compression
+
+def record_path(output_dir, name, compression=None):
+    return os.path.join(output_dir, name + EXTENSIONS[resolve_compression(compression)])
+
+def index_path(path):
+    return path + '.idx'
+
+def compress(data, compression):
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor().compress(data)
+    # mtime fijo: la misma entrada produce exactamente los mismos bytes
+    return gzip.compress(data, mtime=0)
+
+def decompress(frame):
+    if frame.startswith(ZSTD_MAGIC):
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(frame)
+    return gzip.decompress(frame)
+
+def timed(timings, stage, func, *args):
+    """Llamar a `func` guardando cuánto tardó (segundos) en `timings[stage]`."""
+    start = time.monotonic()
+    try:
+        return func(*args)
+    finally:
+        timings[stage] = round(time.monotonic() - start, 3)
+
+def md5(text):
+    return hashlib.md5(text.encode()).hexdigest() if text else None
+
+def page_record(url, markdown, endpoints, tables, source=None, timings=None):
+    """Registro de una página: resultado de CodeGPT, endpoints, tablas, hashes y duraciones por etapa."""
+    return {
+        'url': url,
+        'markdown': markdown or '',
+        'endpoints': list(endpoints or []),
+        'tables': tables or [],
+        'hashes': {'markdown_md5': md5(markdown), 'source_md5': md5(source)},
+        'timings': timings or {},
+    }
+
+class RecordWriter:
+    """JSONL comprimido en frames independientes, con un índice para leer cada registro por separado.
+
+    Los registros se juntan hasta `frame_bytes` y cada grupo se comprime como
+    un frame aparte (un miembro gzip o un frame zstd), así que el archivo
+    completo también se puede leer con `zcat`/`zstdcat`. El índice
+    `<archivo>.idx` es JSONL con, por registro, la URL, el frame (offset y
+    largo comprimido) y la posición del registro dentro del frame.
+
+    Tiene la misma interfaz que ShardWriter para los checkpoints del crawl:
+    `flush` cierra el frame en curso, de modo que `position` siempre apunta
+    a un límite de frame.
+    """
+
+    def __init__(self, path, compression=None, frame_bytes=OUTPUT_FRAME_BYTES):
+        self.path = path
+        self.index_path = index_path(path)
+        self.compression = resolve_compression(compression)
+        self.frame_bytes = frame_bytes
+        self.file = None
+        self.index = None
+        self.size = 0
+        self.index_size = 0
+        self.buffer = []
+        self.buffer_size = 0
+        self.pending = []
+        # Hashes del contenido analizado ya guardado
+        self.content_hash = set()
+
+    def open(self):
+        if self.file is None:
+            self.file = open(self.path, 'ab')
+            self.size = self.file.tell()
+        if self.index is None:
+            self.index = open(self.index_path, 'ab')
+            self.index_size = self.index.tell()
+
+    def write(self, url, record):
+        """Agregar un registro (dict serializable a JSON); se escribe al completarse el frame.
+
+        Devuelve los bytes del registro sin comprimir.
+        """
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        self.pending.append({'url': url, 'start': self.buffer_size, 'length': len(line)})
+        self.buffer.append(line)
+        self.buffer_size += len(line)
+        if self.buffer_size >= self.frame_bytes:
+            self.write_frame()
+        return len(line)
+
+    def write_frame(self):
+        if not self.buffer:
+            return
+        self.open()
+        frame = compress(b''.join(self.buffer), self.compression)
+        self.file.write(frame)
+        lines = []
+        for entry in self.pending:
+            entry.update(frame=self.size, frame_length=len(frame))
+            lines.append(json.dumps(entry, ensure_ascii=False) + '\n')
+        data = ''.join(lines).encode('utf-8')
+        self.index.write(data)
+        self.size += len(frame)
+        self.index_size += len(data)
+        logging.info(f"{len(self.pending)} records saved to {self.path}")
+        self.buffer, self.buffer_size, self.pending = [], 0, []
+
+    def position(self):
+        """Punto de la salida para un checkpoint (solo cuenta frames ya escritos)."""
+        self.open()
+        return {'file_counter': 1, 'file_bytes': self.size, 'manifest_bytes': self.index_size}
+
+    def flush(self):
+        self.write_frame()
+        for f in (self.file, self.index):
+            if f is not None:
+                f.flush()
+
+    def restore(self, file_counter, file_bytes, manifest_bytes):
+        """Volver al punto de un checkpoint truncando lo escrito después (`file_counter` no se usa)."""
+        self.buffer, self.buffer_size, self.pending = [], 0, []
+        self.close()
+        for path, size in ((self.path, file_bytes), (self.index_path, manifest_bytes)):
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def compact(self):
+        """Reescribir el archivo con solo el último registro de cada URL; devuelve True si había reemplazados.
+
+        Un recrawl incremental agrega al final la versión nueva de las páginas
+        que cambiaron; después de compactar, leer el archivo entero (o con
+        zcat) ya no devuelve las versiones viejas.
+        """
+        self.close()
+        if not os.path.exists(self.index_path):
+            return False
+        tmp_path = f"{self.path}.compact"
+        with RecordReader(self.path) as reader:
+            if len(reader.latest) == len(reader.entries):
+                return False
+            for path in (tmp_path, index_path(tmp_path)):
+                if os.path.exists(path):
+                    os.remove(path)
+            compacted = RecordWriter(tmp_path, self.compression, self.frame_bytes)
+            for entry in reader.latest:
+                compacted.write(entry['url'], reader.record(entry))
+            compacted.close()
+            replaced = len(reader.entries) - len(reader.latest)
+        os.replace(tmp_path, self.path)
+        os.replace(index_path(tmp_path), self.index_path)
+        logging.info(f"Output compacted: dropped {replaced} replaced records from {self.path}")
+        return True
+
+    def close(self):
+        self.write_frame()
+        for f in (self.file, self.index):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+        self.file = None
+        self.index = None
+
+class RecordReader:
+    """Lectura de un archivo de RecordWriter con mmap y su índice.
+
+    `get(url)` descomprime solo el frame del registro pedido; iterar recorre
+    los frames en orden y descomprime uno a la vez. Si una URL se repite (un
+    recrawl incremental sin compactar) solo cuenta su último registro.
+    """
+
+    def __init__(self, path, frame_cache=8):
+        self.path = path
+        self.entries = []
+        with open(index_path(path), encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    self.entries.append(json.loads(line))
+        self.by_url = {entry['url']: entry for entry in self.entries}
+        # Entradas vigentes, en el orden del archivo
+        self.latest = [entry for entry in self.entries if self.by_url[entry['url']] is entry]
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        # mmap no acepta archivos vacíos
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.frame = lru_cache(maxsize=frame_cache)(self.read_frame)
+
+    def read_frame(self, offset, length):
+        return decompress(self.data[offset:offset + length])
+
+    def record(self, entry):
+        frame = self.frame(entry['frame'], entry['frame_length'])
+        return json.loads(frame[entry['start']:entry['start'] + entry['length']])
+
+    def get(self, url):
+        """Registro de una URL, o None si no está (gana el último si la URL se repite)."""
+        entry = self.by_url.get(url)
+        return self.record(entry) if entry else None
+
+    def urls(self):
+        return [entry['url'] for entry in self.latest]
+
+    def __len__(self):
+        return len(self.latest)
+
+    def __iter__(self):
+        for entry in self.latest:
+            yield self.record(entry)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
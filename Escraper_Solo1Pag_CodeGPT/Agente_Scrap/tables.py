@@ -0,0 +1,285 @@
+import io
+import os
+import re
+import csv
+import shutil
+import logging
+import importlib.util
+
+# Sidecar con las celdas de las tablas del crawl: none, csv o parquet (CSV más un .parquet al cerrar; necesita pyarrow)
+TABLE_SIDECAR = os.getenv('TABLE_SIDECAR', 'csv')
+SIDECAR_FORMATS = ('none', 'csv', 'parquet')
+
+# Columnas del sidecar: una fila por celda no vacía del cuerpo de cada tabla
+SIDECAR_COLUMNS = ('url', 'table', 'row', 'column', 'name', 'type', 'value')
+
+# Filas del CSV por lote al convertirlo a Parquet
+PARQUET_BATCH_ROWS = 64 * 1024
+
+# Tope de rowspan/colspan: algunos sitios ponen valores absurdos
+MAX_SPAN = 1000
+
+INTEGER_RE = re.compile(r'^[-+]?\d+$')
+NUMBER_RE = re.compile(r'^[-+]?(?:\d+(?:[.,]\d+)?|[.,]\d+)(?:[eE][-+]?\d+)?$')
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?)?')
+BOOLEAN_VALUES = {'true', 'false', 'yes', 'no', 'sí', 'si'}
+NUMERIC_TYPES = ('integer', 'number')
+
+warned = set()
+
+def span(value):
+    """rowspan/colspan como entero entre 1 y MAX_SPAN (0, vacío o inválido cuentan como 1)."""
+    try:
+        return min(MAX_SPAN, max(1, int(str(value).strip())))
+    except (TypeError, ValueError):
+        return 1
+
+def build_grid(rows):
+    """Grilla rectangular a partir de las filas de celdas (texto, rowspan, colspan).
+
+    Una celda con rowspan/colspan se repite en cada posición que cubre, así
+    que cada columna queda alineada con su encabezado. Las filas sin celdas
+    se descartan y las cortas se completan con ''.
+    """
+    grid = []
+    carried = {}
+    for cells in rows:
+        row = {}
+        # Celdas que bajan desde filas anteriores por su rowspan
+        for column, (text, left) in list(carried.items()):
+            row[column] = text
+            if left > 1:
+                carried[column] = (text, left - 1)
+            else:
+                del carried[column]
+        column = 0
+        for text, rowspan, colspan in cells:
+            while column in row:
+                column += 1
+            for offset in range(colspan):
+                row[column + offset] = text
+                if rowspan > 1:
+                    carried[column + offset] = (text, rowspan - 1)
+            column += colspan
+        if row:
+            grid.append(row)
+    width = max((max(row) + 1 for row in grid), default=0)
+    return [[row.get(i, '') for i in range(width)] for row in grid]
+
+def value_type(value):
+    if INTEGER_RE.match(value):
+        return 'integer'
+    if NUMBER_RE.match(value):
+        return 'number'
+    if value.lower() in BOOLEAN_VALUES:
+        return 'boolean'
+    if DATE_RE.match(value):
+        return 'date'
+    return 'string'
+
+def infer_type(values):
+    """Tipo de una columna: integer, number, boolean, date o string (las celdas vacías no cuentan)."""
+    types = {value_type(value) for value in values if value}
+    if not types:
+        return 'string'
+    if types == {'integer'} or types == {'integer', 'number'}:
+        return 'number' if 'number' in types else 'integer'
+    return types.pop() if len(types) == 1 else 'string'
+
+def detect_header_rows(grid, marked):
+    """Filas de encabezado: las de <thead> o solo con <th> al principio (`marked`); si no hay,
+    la primera fila cuando es todo texto y debajo hay columnas de otro tipo."""
+    if marked or len(grid) < 2:
+        return marked
+    first = grid[0]
+    if not all(first) or any(value_type(value) != 'string' for value in first):
+        return 0
+    body_types = [infer_type(column) for column in zip(*grid[1:])]
+    return 1 if any(kind != 'string' for kind in body_types) else 0
+
+def column_names(header):
+    """Nombre de cada columna uniendo sus filas de encabezado (sin repetir lo que vino de un colspan)."""
+    names = []
+    for values in zip(*header):
+        parts = []
+        for value in values:
+            if value and (not parts or parts[-1] != value):
+                parts.append(value)
+        names.append(' / '.join(parts))
+    return names
+
+def structure_table(grid, header_rows=0):
+    """Tabla como {'columns', 'types', 'rows'}: nombres de columna, tipo inferido y filas del cuerpo."""
+    header_rows = detect_header_rows(grid, header_rows)
+    body = grid[header_rows:]
+    width = len(grid[0]) if grid else 0
+    return {
+        'columns': column_names(grid[:header_rows]) if header_rows else [],
+        'types': [infer_type(column) for column in zip(*body)] if body else ['string'] * width,
+        'rows': body,
+    }
+
+def table_rows(table):
+    """Filas de texto de una tabla (estructurada o lista de filas), con los encabezados primero."""
+    if isinstance(table, dict):
+        return ([table['columns']] if table['columns'] else []) + table['rows']
+    return table
+
+def to_number(value):
+    try:
+        return float(value.replace(',', '.'))
+    except ValueError:
+        return None
+
+def resolve_sidecar(sidecar=None):
+    """Formato del sidecar a usar: el pedido si está disponible; parquet sin pyarrow queda en csv."""
+    sidecar = sidecar or TABLE_SIDECAR
+    if sidecar == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        if sidecar not in warned:
+            logging.warning("Parquet table sidecar needs the pyarrow package, writing CSV only")
+            warned.add(sidecar)
+        return 'csv'
+    return sidecar
+
+def write_parquet(csv_path, parquet_path):
+    """Convertir el CSV del sidecar a Parquet por lotes, agregando la columna `number` para los valores numéricos."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([('url', pa.string()), ('table', pa.int32()), ('row', pa.int32()), ('column', pa.int32()),
+                        ('name', pa.string()), ('type', pa.string()), ('value', pa.string()),
+                        ('number', pa.float64())])
+    convert = pa_csv.ConvertOptions(column_types={name: schema.field(name).type for name in SIDECAR_COLUMNS},
+                                    strings_can_be_null=False)
+    reader = pa_csv.open_csv(csv_path, convert_options=convert,
+                             read_options=pa_csv.ReadOptions(block_size=PARQUET_BATCH_ROWS * 64))
+    tmp_path = f"{parquet_path}.tmp"
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for batch in reader:
+            columns = batch.to_pydict()
+            columns['number'] = [to_number(value) if kind in NUMERIC_TYPES else None
+                                 for kind, value in zip(columns['type'], columns['value'])]
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+    os.replace(tmp_path, parquet_path)
+    logging.info(f"Table sidecar converted to {parquet_path}")
+
+def read_lines(f, end):
+    """Líneas decodificadas de un archivo binario hasta el byte `end` (un límite entre filas)."""
+    while f.tell() < end:
+        line = f.readline()
+        if not line:
+            break
+        yield line.decode('utf-8')
+
+class TableSink:
+    """Sidecar de tablas: CSV en formato largo (una fila por celda) identificado por URL y número de tabla.
+
+    Se escribe a medida que se guardan las páginas, con la misma lógica de
+    checkpoints que la salida del crawl: `position` da los bytes escritos y
+    `restore` trunca lo que se escribió después. Un recrawl incremental
+    escribe al final (desde `run_start`) las tablas de las páginas que
+    cambiaron, y `compact` borra al terminar las filas anteriores de esas
+    URLs. Con formato parquet, al cerrar se genera además `<nombre>.parquet`
+    a partir del CSV.
+    """
+
+    def __init__(self, output_dir, name, sidecar=None):
+        self.sidecar = resolve_sidecar(sidecar)
+        self.path = os.path.join(output_dir, f"{name}.csv")
+        self.parquet_path = os.path.join(output_dir, f"{name}.parquet")
+        self.file = None
+        self.size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        # Donde empiezan las filas de esta corrida; 0 si no hay filas de una corrida anterior que reemplazar
+        self.run_start = 0
+
+    def open(self):
+        if self.file is None:
+            self.file = open(self.path, 'ab')
+            self.size = self.file.tell()
+            if not self.size:
+                self.write_rows([SIDECAR_COLUMNS])
+
+    def write_rows(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
+        data = buffer.getvalue().encode('utf-8')
+        self.file.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def write(self, url, tables):
+        """Agregar las celdas de las tablas (estructuradas) de una página; devuelve los bytes escritos."""
+        rows = []
+        for index, table in enumerate(tables, 1):
+            columns, types = table['columns'], table['types']
+            for row_number, row in enumerate(table['rows'], 1):
+                for column, value in enumerate(row):
+                    if value:
+                        name = columns[column] if column < len(columns) and columns[column] else f"column_{column + 1}"
+                        rows.append((url, index, row_number, column + 1, name, types[column], value))
+        if not rows:
+            return 0
+        self.open()
+        return self.write_rows(rows)
+
+    def position(self):
+        return {'tables_bytes': self.size, 'tables_run_start': self.run_start}
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def restore(self, tables_bytes, run_start=0):
+        """Volver al punto de un checkpoint truncando lo escrito después."""
+        self.close(convert=False)
+        if os.path.exists(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(tables_bytes)
+            self.size = os.path.getsize(self.path)
+        self.run_start = min(run_start, self.size)
+
+    def start_run(self):
+        """Empezar una corrida que sigue escribiendo al final: sus filas reemplazan a las anteriores de la misma URL."""
+        self.run_start = self.size
+
+    def compact(self, replaced):
+        """Quitar las filas anteriores a esta corrida de las URLs de `replaced` (las que se guardaron de nuevo).
+
+        Una página que se guardó de nuevo sin tablas pierde así las que tenía.
+        Devuelve True si cambió el archivo.
+        """
+        replaced = set(replaced)
+        if not self.run_start or not replaced:
+            self.run_start = 0
+            return False
+        self.close(convert=False)
+        with open(self.path, 'rb') as f:
+            tmp_path = f"{self.path}.tmp"
+            dropped = 0
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+                writer = csv.writer(out, lineterminator='\n')
+                for number, row in enumerate(csv.reader(read_lines(f, self.run_start))):
+                    # La primera fila es la de encabezados
+                    if number and row and row[0] in replaced:
+                        dropped += 1
+                        continue
+                    writer.writerow(row)
+                out.flush()
+                # Las filas de esta corrida se copian tal cual
+                f.seek(self.run_start)
+                shutil.copyfileobj(f, out.buffer)
+        os.replace(tmp_path, self.path)
+        self.size = os.path.getsize(self.path)
+        self.run_start = 0
+        logging.info(f"Table sidecar: dropped {dropped} old cells of {len(replaced)} rewritten pages")
+        return True
+
+    def close(self, convert=True):
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+        if convert and self.sidecar == 'parquet' and os.path.exists(self.path):
+            write_parquet(self.path, self.parquet_path)